@@ -1,8 +1,76 @@
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
 from markdownx.admin import MarkdownxModelAdmin
 
+from tasks.queue import enqueue
+
+from . import bulk
 from .models import Article, Bureau
 
+
+class CappedCountPaginator(Paginator):
+    # 記事が多い時にCOUNT(*)で全件を数えないよう、上限の件数までしか数えない
+    @cached_property
+    def count(self):
+        return self.object_list[: settings.ADMIN_COUNT_LIMIT].count()
+
+
 # Register your models here.
-admin.site.register(Article, MarkdownxModelAdmin)
+@admin.register(Article)
+class ArticleAdmin(MarkdownxModelAdmin):
+    list_display = ["title", "bureau", "is_published", "updated_at"]
+    # 絞り込みは公開ページ用の索引(is_published, updated_at)と
+    # (bureau, is_published, updated_at)、並び順は索引(updated_at, id)を使う
+    list_filter = ["is_published", "bureau"]
+    list_select_related = ["bureau"]
+    ordering = ["-updated_at"]
+    list_per_page = 50
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+    actions = ["publish", "unpublish", "rerender"]
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        if self.has_change_permission(request):
+            # 局ごとに「局を変更する」操作を追加する
+            for bureau in Bureau.objects.only("id", "name"):
+                name = f"move_to_bureau_{bureau.pk}"
+                description = f"選択した記事を「{bureau.name}」に移す"
+                actions[name] = (self.make_move_action(bureau.pk), name, description)
+        return actions
+
+    def make_move_action(self, bureau_id):
+        def move(modeladmin, request, queryset):
+            self.run_bulk(request, queryset, bulk.move_to_bureau, bureau_id)
+
+        return move
+
+    def run_bulk(self, request, queryset, func, *args):
+        # 選択した件数が多い時は、記事の更新をキューに入れる
+        # 記事はまだ変わっていないので、キャッシュはワーカーが更新し終えてから破棄する
+        article_ids = list(queryset.values_list("pk", flat=True))
+        if len(article_ids) > settings.ADMIN_BULK_QUEUE_THRESHOLD:
+            enqueue(func, article_ids, *args)
+            self.message_user(
+                request, f"{len(article_ids)}件の記事の更新をキューに入れました。"
+            )
+        else:
+            changed = func(article_ids, *args)
+            self.message_user(request, f"{changed}件の記事を更新しました。")
+
+    @admin.action(description="選択した記事を公開する", permissions=["change"])
+    def publish(self, request, queryset):
+        self.run_bulk(request, queryset, bulk.set_published, True)
+
+    @admin.action(description="選択した記事を非公開にする", permissions=["change"])
+    def unpublish(self, request, queryset):
+        self.run_bulk(request, queryset, bulk.set_published, False)
+
+    @admin.action(description="選択した記事の本文を変換し直す", permissions=["change"])
+    def rerender(self, request, queryset):
+        self.run_bulk(request, queryset, bulk.rerender)
+
+
 admin.site.register(Bureau)
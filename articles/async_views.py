@@ -0,0 +1,193 @@
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.db import models
+from django.http import Http404
+from django.template.response import TemplateResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views import generic
+
+from . import caches, views
+from .models import Article, Bureau
+from .pagination import apaginate_by_keyset
+
+# ASGIで動かす時に使う公開ページのビュー
+# 表示する内容、キャッシュ、ETagはviews.pyの同名のビューと同じにする
+
+
+class AsyncPublicPageView(generic.View):
+    template_name = None
+    cache_tags = []
+
+    def get_cache_tags(self):
+        return self.cache_tags
+
+    async def get_validators(self):
+        # (ETagの元になる値, 最終更新日時)を返す。対象がない時は(None, None)を返す
+        raise NotImplementedError
+
+    async def get_context_data(self):
+        raise NotImplementedError
+
+    async def get(self, request, *args, **kwargs):
+        # request.userはセッションをデータベースから読むので、同期処理として取得する
+        self.user = await sync_to_async(auth.get_user)(request)
+        key = None
+        if settings.PAGE_CACHE_TIMEOUT and not self.user.is_authenticated:
+            key = await caches.apage_cache_key(
+                request.get_full_path(), self.get_cache_tags()
+            )
+            cached = await caches.get_page_cache().aget(key)
+            if cached is not None:
+                return views.cached_page_response(request, cached)
+
+        source, last_modified = await self.get_validators()
+        if source is None:
+            raise Http404("ページが見つかりません")
+        etag = quote_etag(views.make_etag(source))
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            # テンプレートの描画はハンドラーがスレッドで行うので、ここでは問い合わせを済ませておく
+            context = await self.get_context_data()
+            response = TemplateResponse(request, self.template_name, context)
+            if key is not None:
+                response.add_post_render_callback(partial(views.store_page, key))
+        response.headers.setdefault("ETag", etag)
+        if last_modified:
+            response.headers.setdefault("Last-Modified", http_date(last_modified))
+        return response
+
+
+async def alist(queryset):
+    return [obj async for obj in queryset]
+
+
+async def aggregate_updates(queryset):
+    return await queryset.aaggregate(
+        latest=models.Max("updated_at"), count=models.Count("id")
+    )
+
+
+class IndexView(AsyncPublicPageView):
+    template_name = "articles/index.html"
+    cache_tags = [caches.ARTICLES_TAG, caches.BUREAUS_TAG]
+
+    async def get_validators(self):
+        articles = await aggregate_updates(Article.objects.published())
+        bureaus = await aggregate_updates(Bureau.objects.all())
+        return (
+            f"{articles['latest']}|{articles['count']}|"
+            f"{bureaus['latest']}|{bureaus['count']}",
+            views.latest(articles["latest"], bureaus["latest"]),
+        )
+
+    async def get_context_data(self):
+        new_articles = (
+            Article.objects.published().summaries().order_by("-updated_at", "-id")[:5]
+        )
+        bureaus = Bureau.objects.only("id", "name", "slug")
+        # 非同期のクエリもsync_to_asyncで1つのスレッドに渡されて順に実行されるので、
+        # asyncio.gatherで待っても並行にはならない。順に待つ
+        return {
+            "new_articles": await alist(new_articles),
+            "bureaus": await alist(bureaus),
+        }
+
+
+class ArticleListView(AsyncPublicPageView):
+    template_name = "articles/list.html"
+    cache_tags = [caches.ARTICLES_TAG]
+    paginate_by = 20
+
+    async def get_validators(self):
+        articles = await aggregate_updates(Article.objects.published())
+        return f"{articles['latest']}|{articles['count']}", articles["latest"]
+
+    async def get_context_data(self):
+        try:
+            page = await apaginate_by_keyset(
+                Article.objects.published().summaries(),
+                self.paginate_by,
+                after=self.request.GET.get("after"),
+                before=self.request.GET.get("before"),
+            )
+        except ValueError:
+            raise Http404("ページが見つかりません")
+        return {
+            "articles": page.object_list,
+            "page_obj": page,
+            "is_paginated": page.has_other_pages(),
+        }
+
+
+class ArticleDetailView(AsyncPublicPageView):
+    template_name = "articles/detail.html"
+
+    def get_cache_tags(self):
+        return [caches.article_tag(self.kwargs["article_id"]), caches.BUREAUS_TAG]
+
+    def get_queryset(self):
+        if self.user.is_staff:
+            return Article.objects.select_related("bureau")
+        return Article.objects.published().select_related("bureau")
+
+    async def get_validators(self):
+        row = (
+            await self.get_queryset()
+            .filter(pk=self.kwargs["article_id"])
+            .values_list("updated_at", "rendered_at", "bureau__updated_at")
+            .afirst()
+        )
+        if row is None:
+            return None, None
+        return "|".join(map(str, row)), views.latest(*row)
+
+    async def get_context_data(self):
+        try:
+            article = await self.get_queryset().aget(pk=self.kwargs["article_id"])
+        except Article.DoesNotExist:
+            raise Http404("記事が見つかりません")
+        return {"article": article, "object": article}
+
+
+class BureauDetailView(AsyncPublicPageView):
+    template_name = "articles/bureau.html"
+
+    def get_cache_tags(self):
+        return [caches.bureau_tag(self.kwargs["slug"])]
+
+    async def get_validators(self):
+        published = models.Q(article__is_published=True)
+        row = (
+            await Bureau.objects.filter(slug=self.kwargs["slug"])
+            .annotate(
+                articles_latest=models.Max("article__updated_at", filter=published),
+                articles_count=models.Count("article", filter=published),
+            )
+            .values_list(
+                "updated_at", "rendered_at", "articles_latest", "articles_count"
+            )
+            .afirst()
+        )
+        if row is None:
+            return None, None
+        return "|".join(map(str, row)), views.latest(*row[:3])
+
+    async def get_context_data(self):
+        try:
+            bureau = await Bureau.objects.aget(slug=self.kwargs["slug"])
+        except Bureau.DoesNotExist:
+            raise Http404("局が見つかりません")
+        articles = await alist(
+            Article.objects.published()
+            .summaries()
+            .filter(bureau=bureau)
+            .order_by("-updated_at", "-id")
+        )
+        return {"bureau": bureau, "object": bureau, "articles": articles}
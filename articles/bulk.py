@@ -0,0 +1,137 @@
+from functools import partial
+
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from tasks.queue import task
+
+from . import caches, content_images, search, static_site
+from .models import RENDERED_FIELDS, Article, Bureau
+
+# 一度に更新する記事の件数。1つのUPDATE文に渡すIDの数を抑える
+BATCH_SIZE = 500
+
+
+def batches(ids):
+    for i in range(0, len(ids), BATCH_SIZE):
+        yield ids[i : i + BATCH_SIZE]
+
+
+def invalidate_articles(article_ids, slugs):
+    # 記事のキャッシュを破棄し、書き出したページを削除する
+    # slugsは公開中か公開していた記事の局で、空でなければ一覧のページにも影響する
+    tags = {caches.article_tag(pk) for pk in article_ids}
+    urls = {reverse("articles:detail", kwargs={"article_id": pk}) for pk in article_ids}
+    slugs = set(slugs)
+    if slugs:
+        tags.add(caches.ARTICLES_TAG)
+        urls |= {reverse("articles:index"), reverse("articles:list")}
+    slugs.discard(None)
+    tags |= {caches.bureau_tag(slug) for slug in slugs}
+    urls |= {reverse("articles:bureau", kwargs={"slug": slug}) for slug in slugs}
+    # コミットする前に破棄すると、他のリクエストがコミット前の古い行を読んで
+    # 新しいバージョンでキャッシュしたり、書き出したりしてしまう
+    transaction.on_commit(partial(invalidate, tags, urls))
+
+
+def invalidate(tags, urls):
+    caches.bump_tags(tags)
+    static_site.discard(urls)
+
+
+def reindex(article_ids):
+    search.update_indexes(
+        list(
+            Article.objects.filter(pk__in=article_ids).only(
+                "id", "title", "content_html", "is_published"
+            )
+        )
+    )
+
+
+# 以下は管理画面の一括操作。記事ごとに保存せずUPDATE文で更新するので、保存時のシグナルは送られない
+# 代わりに、キャッシュの破棄などを最後にまとめて1回だけ行う
+@task
+def set_published(article_ids, is_published):
+    changed = []
+    slugs = set()
+    for ids in batches(article_ids):
+        with transaction.atomic():
+            rows = list(
+                Article.objects.filter(pk__in=ids)
+                .exclude(is_published=is_published)
+                .values_list("pk", "bureau__slug")
+            )
+            ids = [pk for pk, _ in rows]
+            Article.objects.filter(pk__in=ids).update(
+                is_published=is_published, updated_at=timezone.now()
+            )
+            reindex(ids)
+        changed += ids
+        slugs |= {slug for _, slug in rows}
+    invalidate_articles(changed, slugs)
+    return len(changed)
+
+
+@task
+def move_to_bureau(article_ids, bureau_id):
+    changed = []
+    slugs = set()
+    for ids in batches(article_ids):
+        rows = list(
+            Article.objects.filter(pk__in=ids)
+            .exclude(bureau_id=bureau_id)
+            .values_list("pk", "is_published", "bureau__slug")
+        )
+        ids = [pk for pk, _, _ in rows]
+        Article.objects.filter(pk__in=ids).update(
+            bureau_id=bureau_id, updated_at=timezone.now()
+        )
+        changed += ids
+        slugs |= {slug for _, is_published, slug in rows if is_published}
+    if slugs:
+        # 公開中の記事を移した時は、移した先の局のページも変わる
+        slugs.add(
+            Bureau.objects.filter(pk=bureau_id).values_list("slug", flat=True).first()
+        )
+    invalidate_articles(changed, slugs)
+    return len(changed)
+
+
+@task
+def rerender(article_ids):
+    # 変換の設定を変えた時などに、選んだ記事の本文を変換し直す
+    # bulk_updateはupdated_atを更新しないので、更新日時は変わらない
+    fields = RENDERED_FIELDS
+    changed = []
+    slugs = set()
+    for ids in batches(article_ids):
+        articles = list(
+            Article.objects.filter(pk__in=ids)
+            .select_related("bureau")
+            .only(
+                "id",
+                "title",
+                "content_with_markdown",
+                "is_published",
+                "bureau",
+                "bureau__slug",
+                *fields,
+            )
+        )
+        for article in articles:
+            article.render_content(force=True)
+        with transaction.atomic():
+            Article.objects.bulk_update(articles, fields)
+            search.update_indexes(articles)
+            for article in articles:
+                content_images.update_references(article)
+        changed += [article.pk for article in articles]
+        slugs |= {
+            article.bureau.slug if article.bureau else None
+            for article in articles
+            if article.is_published
+        }
+    invalidate_articles(changed, slugs)
+    return len(changed)
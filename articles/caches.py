@@ -0,0 +1,86 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from hosnakpub import routers
+
+# ページキャッシュのキーに含めるタグ
+# 記事や局が保存されるとタグのバージョンが上がり、そのタグを含むキャッシュは使われなくなる
+ARTICLES_TAG = "articles"
+BUREAUS_TAG = "bureaus"
+
+
+def article_tag(article_id):
+    return f"article:{article_id}"
+
+
+def bureau_tag(slug):
+    return f"bureau:{slug}"
+
+
+def get_page_cache():
+    return caches[settings.PAGE_CACHE_ALIAS]
+
+
+def tag_timeout():
+    # タグを使うキャッシュのうち、最も長く残るものより長く保持する
+    return max(
+        settings.PAGE_CACHE_TIMEOUT,
+        settings.FEED_CACHE_TIMEOUT,
+        settings.SITEMAP_CACHE_TIMEOUT,
+        settings.TEMPLATE_FRAGMENT_TIMEOUT,
+        60,
+    )
+
+
+def get_tag_versions(tags):
+    # タグがない時は、まだ使われたことのない値で作る
+    # 上限を超えて消されたタグを0などの決まった値に戻すと、以前その値で保存したキャッシュが使われてしまう
+    cache = get_page_cache()
+    keys = [f"tag:{tag}" for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            version = time.time_ns()
+            if not cache.add(key, version, timeout=tag_timeout()):
+                version = cache.get(key, version)
+            versions[key] = version
+    return [versions[key] for key in keys]
+
+
+async def aget_tag_versions(tags):
+    cache = get_page_cache()
+    keys = [f"tag:{tag}" for tag in tags]
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            version = time.time_ns()
+            if not await cache.aadd(key, version, timeout=tag_timeout()):
+                version = await cache.aget(key, version)
+            versions[key] = version
+    return [versions[key] for key in keys]
+
+
+def bump_tags(tags):
+    version = time.time_ns()
+    get_page_cache().set_many(
+        {f"tag:{tag}": version for tag in tags}, timeout=tag_timeout()
+    )
+    # 作り直すページを、書き込みがまだ届いていないレプリカから読まないようにする
+    routers.mark_recent_write()
+
+
+def page_cache_key(path, tags):
+    return make_page_cache_key(path, get_tag_versions(tags))
+
+
+async def apage_cache_key(path, tags):
+    return make_page_cache_key(path, await aget_tag_versions(tags))
+
+
+def make_page_cache_key(path, versions):
+    source = f"{settings.PAGE_VERSION}|{path}|{versions}"
+    digest = hashlib.md5(source.encode()).hexdigest()
+    return f"page:{digest}"
@@ -0,0 +1,31 @@
+from contents import images
+
+from .models import Article, Bureau, ContentImage
+
+
+def owner_field(obj):
+    return "article" if isinstance(obj, Article) else "bureau"
+
+
+def update_references(obj):
+    # 変換したHTMLで使っている画像を記録し、使わなくなった画像の記録を消す
+    field = owner_field(obj)
+    names = images.image_names(obj.content_html)
+    current = set(
+        ContentImage.objects.filter(**{field: obj}).values_list("name", flat=True)
+    )
+    if current - names:
+        ContentImage.objects.filter(**{field: obj}, name__in=current - names).delete()
+    if names - current:
+        ContentImage.objects.bulk_create(
+            [
+                ContentImage(name=name, **{field: obj})
+                for name in sorted(names - current)
+            ]
+        )
+
+
+def contents_with_image(name):
+    # 本文で画像を使っている局と記事。本文を検索せず、記録した画像の索引から探す
+    for model in (Bureau, Article):
+        yield from model.objects.filter(images__name=name).distinct()
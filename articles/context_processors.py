@@ -0,0 +1,13 @@
+from django.conf import settings
+
+from . import caches, static_site
+
+
+def fragment_cache(request):
+    # テンプレートの{% cache %}に渡すキャッシュの秒数とバージョン
+    # 局のバージョンは局の一覧を描画する時だけ読み込む
+    return {
+        "fragment_timeout": settings.TEMPLATE_FRAGMENT_TIMEOUT,
+        "chrome_version": static_site.get_version(),
+        "bureaus_version": lambda: caches.get_tag_versions([caches.BUREAUS_TAG])[0],
+    }
@@ -1,3 +1,4 @@
+import factory
 from factory.django import DjangoModelFactory
 
 from .models import Article, Bureau
@@ -17,5 +18,5 @@ class BureauFactory(DjangoModelFactory):
         model = Bureau
 
     name = "テスト局"
-    slug = "test"
+    slug = factory.Sequence(lambda n: f"test{n}")
     content_with_markdown = "テスト用の局です。"
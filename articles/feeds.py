@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from . import caches, views
+from .models import Article, Bureau
+
+SITE_TITLE = "ほしのなか政府"
+
+
+class ArticlesFeed(Feed):
+    title = f"{SITE_TITLE}の記事"
+    description = f"{SITE_TITLE}の新しい記事"
+
+    def link(self):
+        return reverse("articles:list")
+
+    def items(self):
+        # 記事一覧と同じ並びで、索引だけで新しい記事を取り出す
+        return (
+            Article.objects.published()
+            .select_related("bureau")
+            .order_by("-updated_at", "-id")[: settings.FEED_ITEMS]
+        )
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.get_content()
+
+    def item_link(self, item):
+        return reverse("articles:detail", kwargs={"article_id": item.pk})
+
+    def item_pubdate(self, item):
+        return item.created_at
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+    def item_author_name(self, item):
+        return item.bureau.name if item.bureau else None
+
+
+class AtomArticlesFeed(ArticlesFeed):
+    feed_type = Atom1Feed
+    subtitle = ArticlesFeed.description
+
+
+class BureauArticlesFeed(ArticlesFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Bureau, slug=slug)
+
+    def title(self, bureau):
+        return f"{SITE_TITLE} {bureau.name}の記事"
+
+    def description(self, bureau):
+        return f"{SITE_TITLE} {bureau.name}の新しい記事"
+
+    def link(self, bureau):
+        return reverse("articles:bureau", kwargs={"slug": bureau.slug})
+
+    def items(self, bureau):
+        return (
+            Article.objects.published()
+            .filter(bureau=bureau)
+            .select_related("bureau")
+            .order_by("-updated_at", "-id")[: settings.FEED_ITEMS]
+        )
+
+
+class AtomBureauArticlesFeed(BureauArticlesFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, bureau):
+        return self.description(bureau)
+
+
+def cached_feed(feed, get_tags):
+    # フィードは閲覧者によらず同じなので、ログインしていてもキャッシュを返す
+    # キーはタグのバージョンから作るので、キャッシュがあればデータベースに問い合わせずに304を返せる
+    def view(request, **kwargs):
+        if not settings.FEED_CACHE_TIMEOUT:
+            return feed(request, **kwargs)
+        key = caches.page_cache_key(views.absolute_url_key(request), get_tags(**kwargs))
+        cached = caches.get_page_cache().get(key)
+        if cached is None:
+            response = feed(request, **kwargs)
+            response["ETag"] = f'"{views.make_etag(key)}"'
+            # 保存できなかった時(値が大きすぎる時など)も、作った内容で返す
+            cached = views.page_entry(response)
+            caches.get_page_cache().set(key, cached, settings.FEED_CACHE_TIMEOUT)
+        return views.cached_page_response(request, cached)
+
+    return view
+
+
+def site_tags():
+    # 記事の作者として局の名前を出すので、局が変わった時も作り直す
+    return [caches.ARTICLES_TAG, caches.BUREAUS_TAG]
+
+
+def bureau_tags(slug):
+    return [caches.bureau_tag(slug)]
+
+
+rss_feed = cached_feed(ArticlesFeed(), site_tags)
+atom_feed = cached_feed(AtomArticlesFeed(), site_tags)
+bureau_rss_feed = cached_feed(BureauArticlesFeed(), bureau_tags)
+bureau_atom_feed = cached_feed(AtomBureauArticlesFeed(), bureau_tags)
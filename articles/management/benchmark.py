@@ -0,0 +1,35 @@
+import tempfile
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.test import override_settings
+from factory.django import mute_signals
+
+
+@contextmanager
+def isolated(**overrides):
+    # ベンチマークのデータは最後にロールバックするので、保存時のシグナルで
+    # 共有のキャッシュや書き出したページを変えないよう、一時的な場所を使わせる
+    with tempfile.TemporaryDirectory() as static_site_root, override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "benchmark",
+            }
+        },
+        STATIC_SITE_ROOT=static_site_root,
+        **overrides,
+    ):
+        try:
+            yield
+        finally:
+            # ロールバックしたデータのキャッシュを、次に実行した時に使わない
+            cache.clear()
+
+
+@contextmanager
+def without_receivers():
+    # 作成するデータの保存時に、キャッシュの破棄やタスクの登録をさせない
+    with mute_signals(pre_save, post_save, post_delete):
+        yield
@@ -0,0 +1,113 @@
+import re
+import time
+from io import StringIO
+
+import factory
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from articles import search
+from articles.factories import ArticleFactory, BureauFactory
+from articles.management import benchmark
+from articles.models import Article, Bureau
+from articles.pagination import encode_cursor, filter_after
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "記事を大量に作成して公開ページのクエリの実行計画と実行時間を確認します。"
+        "作成したデータは最後にロールバックします。"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows", type=int, default=100_000, help="作成する記事の件数です。"
+        )
+        parser.add_argument(
+            "--bureaus", type=int, default=10, help="作成する局の件数です。"
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=10, help="各クエリを実行する回数です。"
+        )
+
+    def handle(self, *args, **options):
+        full_scans = []
+        with benchmark.isolated():
+            try:
+                with transaction.atomic():
+                    self.seed(options["rows"], options["bureaus"])
+                    for name, queryset in self.get_querysets():
+                        plan, seconds = self.measure(queryset, options["repeat"])
+                        full_scan = self.is_full_scan(plan)
+                        if full_scan:
+                            full_scans.append(name)
+                        self.stdout.write(
+                            f"{name}: {seconds * 1000:.2f}ms"
+                            f"{' (FULL SCAN)' if full_scan else ''}\n{plan}\n"
+                        )
+                    raise Rollback
+            except Rollback:
+                pass
+        if full_scans:
+            raise CommandError(
+                f"索引を使っていないクエリがあります: {', '.join(full_scans)}"
+            )
+
+    def seed(self, rows, bureaus):
+        with benchmark.without_receivers():
+            bureaus = BureauFactory.create_batch(bureaus)
+            # 5件に1件を下書きにし、局は順に割り当てる
+            ArticleFactory.create_batch(
+                rows,
+                title=factory.Sequence(lambda n: f"記事{n}"),
+                bureau=factory.Iterator(bureaus),
+                is_published=factory.Iterator([True, True, True, True, False]),
+            )
+        # 保存時のシグナルの代わりに、検索用の索引をまとめて登録する
+        call_command("rebuild_search_index", stdout=StringIO())
+        if connection.vendor == "sqlite":
+            # 作成した件数をもとに実行計画を立てさせる
+            # MySQLのANALYZE TABLEは暗黙にコミットしてしまうので、InnoDBの統計の自動更新に任せる
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+    def get_querysets(self):
+        published = Article.objects.published().order_by("-updated_at", "-id")
+        bureau = Bureau.objects.first()
+        middle = published[published.count() // 2]
+        after = encode_cursor(middle)
+        return [
+            ("IndexView new_articles", published[:5]),
+            ("ArticleListView", published[:21]),
+            (f"ArticleListView after={after}", filter_after(published, after)[:21]),
+            ("ArticleDetailView", published.filter(pk=middle.pk)),
+            ("BureauDetailView bureau", Bureau.objects.filter(slug=bureau.slug)),
+            ("BureauDetailView articles", published.filter(bureau=bureau)),
+            ("SearchView", search.search(middle.title)[:21]),
+            (
+                "ArticleAdmin changelist",
+                Article.objects.order_by("-updated_at", "-pk")[:50],
+            ),
+        ]
+
+    def measure(self, queryset, repeat):
+        plan = queryset.explain()
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(queryset.all())
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return plan, best
+
+    def is_full_scan(self, plan):
+        if connection.vendor == "sqlite":
+            # 索引を使わない場合は"SCAN テーブル名"だけが出力される
+            return re.search(r"SCAN \w+$", plan, re.MULTILINE) is not None
+        # MySQLではtypeがALLの行がテーブルの全件走査を表す
+        return re.search(r"\bALL\b", plan) is not None
@@ -0,0 +1,84 @@
+import re
+import statistics
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from articles.factories import ArticleFactory, BureauFactory
+from articles.management import benchmark
+
+TEMPLATE_RE = re.compile(r"template;dur=([\d.]+)")
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "公開ページの1リクエストあたりのテンプレートの描画時間を、"
+        "テンプレートと断片をキャッシュしない場合とする場合で比べます。"
+        "作成したデータは最後にロールバックします。"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat", type=int, default=50, help="各ページを表示する回数です。"
+        )
+        parser.add_argument(
+            "--bureaus", type=int, default=20, help="作成する局の件数です。"
+        )
+
+    def handle(self, *args, **options):
+        # ページのキャッシュを使わず、毎回テンプレートを描画させる
+        with benchmark.isolated(PAGE_CACHE_TIMEOUT=0, SERVER_TIMING=True):
+            try:
+                with transaction.atomic():
+                    urls = self.seed(options["bureaus"])
+                    for label, overrides in self.get_configurations():
+                        with override_settings(**overrides):
+                            self.stdout.write(f"{label}:")
+                            for url in urls:
+                                milliseconds = self.measure(url, options["repeat"])
+                                self.stdout.write(f"  {url}: {milliseconds:.2f}ms")
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def seed(self, bureaus):
+        with benchmark.without_receivers():
+            bureaus = BureauFactory.create_batch(bureaus)
+            article = ArticleFactory(is_published=True, bureau=bureaus[0])
+        return [
+            reverse("articles:index"),
+            reverse("articles:list"),
+            reverse("articles:detail", kwargs={"article_id": article.id}),
+            reverse("articles:bureau", kwargs={"slug": bureaus[0].slug}),
+        ]
+
+    def get_configurations(self):
+        # テンプレートのローダーからキャッシュを外した設定と、現在の設定を比べる
+        (engine,) = settings.TEMPLATES
+        (_, loaders), *_ = engine["OPTIONS"]["loaders"]
+        uncached = {**engine, "OPTIONS": {**engine["OPTIONS"], "loaders": loaders}}
+        return [
+            ("before", {"TEMPLATES": [uncached], "TEMPLATE_FRAGMENT_TIMEOUT": 0}),
+            (
+                "after",
+                {"TEMPLATE_FRAGMENT_TIMEOUT": settings.TEMPLATE_FRAGMENT_TIMEOUT or 60},
+            ),
+        ]
+
+    def measure(self, url, repeat):
+        # Server-Timingヘッダのテンプレートの描画時間の中央値を返す
+        client = Client()
+        client.get(url)
+        durations = []
+        for _ in range(repeat):
+            timing = client.get(url)["Server-Timing"]
+            match = TEMPLATE_RE.search(timing)
+            durations.append(float(match.group(1)) if match else 0.0)
+        return statistics.median(durations)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from contents import css
+
+
+class Command(BaseCommand):
+    help = (
+        "contents/static/css以下のSCSSをコンパイルし、"
+        "ハッシュ値つきのファイル名のCSSと対応表を書き出します。"
+    )
+    # イメージのビルド時にデータベースなしで実行する
+    requires_system_checks = []
+
+    def handle(self, *args, **options):
+        manifest = css.build()
+        for source, name in manifest.items():
+            self.stdout.write(f"{source} -> {name}")
+        self.stdout.write(f"{len(manifest)}件のCSSを書き出しました。")
@@ -0,0 +1,46 @@
+import os
+import re
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from contents import images
+
+# build_variantsで作った画像と一覧のファイル名
+VARIANT_RE = re.compile(r"\.(\d+w|variants)$")
+
+
+class Command(BaseCommand):
+    help = "アップロードされた画像から、幅ごと、形式ごとの画像を作成します。"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="作成済みの画像も作り直します。",
+        )
+
+    def handle(self, *args, **options):
+        built = 0
+        # まだ画像がアップロードされていなければ、メディアのディレクトリもない
+        names = self.find_images("") if default_storage.exists("") else []
+        for name in names:
+            if not options["force"] and default_storage.exists(images.info_name(name)):
+                continue
+            # 作成後のシグナルで、画像を含む記事と局の本文も変換し直される
+            images.build_variants(name)
+            built += 1
+        self.stdout.write(f"{built}件の画像を変換しました。")
+
+    def find_images(self, path):
+        directories, files = default_storage.listdir(path)
+        for directory in sorted(directories):
+            yield from self.find_images(os.path.join(path, directory))
+        for file_name in sorted(files):
+            stem, extension = os.path.splitext(file_name)
+            if (
+                VARIANT_RE.search(stem)
+                or extension.lower() not in images.SOURCE_FORMATS
+            ):
+                continue
+            yield os.path.join(path, file_name)
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from articles import static_site
+
+
+class Command(BaseCommand):
+    help = (
+        "公開ページをHTMLファイルとして書き出します。"
+        "前回から変わったページだけを書き出します。"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="変更がなくても全ページを書き出します。",
+        )
+
+    def handle(self, *args, **options):
+        written, removed = static_site.export(force=options["force"])
+        self.stdout.write(
+            f"{settings.STATIC_SITE_ROOT}: {written}件を書き出し、{removed}件を削除しました。"
+        )
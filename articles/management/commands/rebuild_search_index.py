@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from articles import search
+from articles.models import Article, SearchToken
+
+
+class Command(BaseCommand):
+    help = "公開中の記事の検索用の索引を作成します。"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="索引を削除して全件を登録し直します。",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="一度に登録する記事の件数です。",
+        )
+
+    def handle(self, *args, **options):
+        queryset = Article.objects.published().only("id", "title", "content_html")
+        with transaction.atomic():
+            if options["force"]:
+                SearchToken.objects.all().delete()
+            else:
+                # 索引に登録されていない記事だけを登録する
+                queryset = queryset.filter(search_tokens__isnull=True)
+            indexed = 0
+            tokens = []
+            for article in queryset.iterator(chunk_size=options["batch_size"]):
+                tokens.extend(search.build_tokens(article))
+                indexed += 1
+                if indexed % options["batch_size"] == 0:
+                    SearchToken.objects.bulk_create(tokens)
+                    tokens = []
+            SearchToken.objects.bulk_create(tokens)
+        self.stdout.write(f"記事: {indexed}件を索引に登録しました。")
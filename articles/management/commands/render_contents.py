@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from articles import content_images
+from articles.models import RENDERED_FIELDS, Article, Bureau
+
+
+class Command(BaseCommand):
+    help = "局と記事のマークダウンをHTMLに変換し直して保存します。"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="ハッシュ値が一致していても全件を変換し直します。",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="一度に更新する件数です。",
+        )
+
+    def handle(self, *args, **options):
+        for model in (Bureau, Article):
+            rendered = self.render_all(model, options["force"], options["batch_size"])
+            self.stdout.write(
+                f"{model._meta.verbose_name}: {rendered}件を変換しました。"
+            )
+
+    def render_all(self, model, force, batch_size):
+        queryset = model.objects.only("id", "content_with_markdown", *RENDERED_FIELDS)
+        rendered = 0
+        batch = []
+        for obj in queryset.iterator(chunk_size=batch_size):
+            if obj.render_content(force=force):
+                batch.append(obj)
+            if len(batch) >= batch_size:
+                rendered += self.save_batch(model, batch)
+                batch = []
+        if batch:
+            rendered += self.save_batch(model, batch)
+        return rendered
+
+    def save_batch(self, model, batch):
+        # bulk_updateはupdated_atを更新しないので、再変換で更新日時は変わらない
+        # 保存時のシグナルも送られないので、本文の画像の記録はここで更新する
+        model.objects.bulk_update(batch, RENDERED_FIELDS)
+        for obj in batch:
+            content_images.update_references(obj)
+        return len(batch)
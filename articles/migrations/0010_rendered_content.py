@@ -0,0 +1,48 @@
+# Generated by Django 4.2 on 2026-10-18 09:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("articles", "0009_article_bureau"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="content_hash",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=64,
+                verbose_name="変換元のハッシュ値",
+            ),
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="content_html",
+            field=models.TextField(
+                blank=True, default="", editable=False, verbose_name="変換済みのHTML"
+            ),
+        ),
+        migrations.AddField(
+            model_name="bureau",
+            name="content_hash",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=64,
+                verbose_name="変換元のハッシュ値",
+            ),
+        ),
+        migrations.AddField(
+            model_name="bureau",
+            name="content_html",
+            field=models.TextField(
+                blank=True, default="", editable=False, verbose_name="変換済みのHTML"
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-18 09:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("articles", "0010_rendered_content"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="bureau",
+            name="slug",
+            field=models.SlugField(unique=True, verbose_name="slug"),
+        ),
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(
+                fields=["is_published", "updated_at"],
+                name="article_published_updated_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(
+                fields=["bureau", "is_published", "updated_at"],
+                name="article_bureau_published_idx",
+            ),
+        ),
+    ]
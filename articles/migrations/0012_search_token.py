@@ -0,0 +1,55 @@
+# Generated by Django 4.2 on 2026-10-18 10:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("articles", "0011_article_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("token", models.CharField(max_length=2, verbose_name="トークン")),
+                ("weight", models.PositiveIntegerField(verbose_name="重み")),
+                (
+                    "article",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_tokens",
+                        to="articles.article",
+                        verbose_name="記事",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "検索トークン",
+                "verbose_name_plural": "検索トークン",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="searchtoken",
+            index=models.Index(
+                fields=["token", "weight", "article"], name="searchtoken_token_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="searchtoken",
+            index=models.Index(
+                fields=["article", "token", "weight"], name="searchtoken_article_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 4.2 on 2026-10-18 11:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from contents import images
+
+
+def add_references(apps, schema_editor):
+    # 変換済みのHTMLで使っている画像を記録する
+    ContentImage = apps.get_model("articles", "ContentImage")
+    for field, model_name in (("bureau", "Bureau"), ("article", "Article")):
+        model = apps.get_model("articles", model_name)
+        references = []
+        for obj in model.objects.only("id", "content_html").iterator():
+            references += [
+                ContentImage(name=name, **{field: obj})
+                for name in sorted(images.image_names(obj.content_html))
+            ]
+        ContentImage.objects.bulk_create(references, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("articles", "0012_search_token"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="rendered_at",
+            field=models.DateTimeField(
+                blank=True, editable=False, null=True, verbose_name="変換日時"
+            ),
+        ),
+        migrations.AddField(
+            model_name="bureau",
+            name="rendered_at",
+            field=models.DateTimeField(
+                blank=True, editable=False, null=True, verbose_name="変換日時"
+            ),
+        ),
+        migrations.CreateModel(
+            name="ContentImage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, verbose_name="ファイル名")),
+                (
+                    "article",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="images",
+                        to="articles.article",
+                        verbose_name="記事",
+                    ),
+                ),
+                (
+                    "bureau",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="images",
+                        to="articles.bureau",
+                        verbose_name="局",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "本文の画像",
+                "verbose_name_plural": "本文の画像",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="contentimage",
+            index=models.Index(fields=["name"], name="contentimage_name_idx"),
+        ),
+        migrations.RunPython(add_references, migrations.RunPython.noop),
+    ]
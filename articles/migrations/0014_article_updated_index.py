@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 11:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("articles", "0013_content_images"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(fields=["updated_at", "id"], name="article_updated_idx"),
+        ),
+    ]
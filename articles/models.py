@@ -1,23 +1,87 @@
 import bleach
 from bleach_allowlist import markdown_attrs, markdown_tags
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from markdownx.models import MarkdownxField
 from markdownx.utils import markdownify
 
-from contents.utils import markdown_to_content
+from contents.utils import content_hash, markdown_to_content
+
+# 本文を変換した時に書き換わる列
+RENDERED_FIELDS = ["content_html", "content_hash", "rendered_at"]
+
+
+class RenderedContentModel(models.Model):
+    # content_with_markdownを変換したHTMLを保存しておき、表示のたびに変換しないようにする
+    content_html = models.TextField(
+        verbose_name="変換済みのHTML", blank=True, default="", editable=False
+    )
+    content_hash = models.CharField(
+        verbose_name="変換元のハッシュ値",
+        max_length=64,
+        blank=True,
+        default="",
+        editable=False,
+    )
+    # 本文を変換した日時。画像ができて変換し直した時は、updated_atを変えずにこの値だけが変わる
+    rendered_at = models.DateTimeField(
+        verbose_name="変換日時", null=True, blank=True, editable=False
+    )
+
+    def render_content(self, force=False):
+        # 変換元か変換の設定が変わっていたときだけ変換し直す
+        if self.content_with_markdown is None:
+            return False
+        new_hash = content_hash(self.content_with_markdown)
+        if not force and self.content_hash == new_hash:
+            return False
+        self.content_html = markdown_to_content(self.content_with_markdown)
+        self.content_hash = new_hash
+        self.rendered_at = timezone.now()
+        return True
+
+    def is_rendered(self):
+        return self.content_hash == content_hash(self.content_with_markdown)
+
+    def get_content(self):
+        # ワーカーが変換するまでは、表示する時に変換する
+        if self.is_rendered():
+            return self.content_html
+        return markdown_to_content(self.content_with_markdown)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        # タスクをワーカーで実行する時は、保存後のrender_contentタスクで変換する
+        rendered = settings.TASKS_ALWAYS_EAGER and self.render_content()
+        if rendered and update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, *RENDERED_FIELDS}
+        super().save(*args, **kwargs)
+
+    class Meta:
+        abstract = True
+
+
+class ArticleQuerySet(models.QuerySet):
+    def published(self):
+        # filter(is_published=True)はSQLiteでは「WHERE is_published」となり索引を使わないため、
+        # 真偽値と直接比較させる
+        return self.filter(is_published=models.Value(True))
+
+    def summaries(self):
+        # 一覧ではタイトルへのリンクしか表示しないので、本文の列は読み込まない
+        # updated_atはページ送りのカーソルに使う
+        return self.only("id", "title", "updated_at")
 
 
 # Create your models here.
-class Bureau(models.Model):
+class Bureau(RenderedContentModel):
     name = models.CharField(verbose_name="局名", max_length=10)
-    slug = models.SlugField(verbose_name="slug")
+    slug = models.SlugField(verbose_name="slug", unique=True)
     content_with_markdown = MarkdownxField(verbose_name="局紹介文のマークダウン記述")
     created_at = models.DateTimeField(verbose_name="作成日時", auto_now_add=True)
     updated_at = models.DateTimeField(verbose_name="最終更新日時", auto_now=True)
 
-    def get_content(self):
-        return markdown_to_content(self.content_with_markdown)
-
     def __str__(self):
         return self.name
 
@@ -26,7 +90,7 @@ class Bureau(models.Model):
         verbose_name_plural = "局"
 
 
-class Article(models.Model):
+class Article(RenderedContentModel):
     title = models.CharField(verbose_name="タイトル", max_length=255)
     content_with_markdown = MarkdownxField(verbose_name="内容のマークダウン記述")
     is_published = models.BooleanField(verbose_name="公開", default=False)
@@ -36,8 +100,7 @@ class Article(models.Model):
     created_at = models.DateTimeField(verbose_name="作成日時", auto_now_add=True)
     updated_at = models.DateTimeField(verbose_name="最終更新日時", auto_now=True)
 
-    def get_content(self):
-        return markdown_to_content(self.content_with_markdown)
+    objects = ArticleQuerySet.as_manager()
 
     def __str__(self):
         return self.title
@@ -45,3 +108,76 @@ class Article(models.Model):
     class Meta:
         verbose_name = "記事"
         verbose_name_plural = "記事"
+        # 公開ページの検索条件と並び順に合わせた索引
+        indexes = [
+            models.Index(
+                fields=["is_published", "updated_at"],
+                name="article_published_updated_idx",
+            ),
+            models.Index(
+                fields=["bureau", "is_published", "updated_at"],
+                name="article_bureau_published_idx",
+            ),
+            # 管理画面の一覧の並び順。Djangoが末尾に-pkを足すので、idも含める
+            models.Index(fields=["updated_at", "id"], name="article_updated_idx"),
+        ]
+
+
+class SearchToken(models.Model):
+    # 記事の検索に使う転置索引。公開中の記事だけを登録する
+    token = models.CharField(verbose_name="トークン", max_length=2)
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        verbose_name="記事",
+        related_name="search_tokens",
+        db_index=False,
+    )
+    weight = models.PositiveIntegerField(verbose_name="重み")
+
+    def __str__(self):
+        return self.token
+
+    class Meta:
+        verbose_name = "検索トークン"
+        verbose_name_plural = "検索トークン"
+        # トークンから重みの大きい順に記事を読む索引と、候補の記事のトークンを調べる索引
+        indexes = [
+            models.Index(
+                fields=["token", "weight", "article"],
+                name="searchtoken_token_idx",
+            ),
+            models.Index(
+                fields=["article", "token", "weight"],
+                name="searchtoken_article_idx",
+            ),
+        ]
+
+
+class ContentImage(models.Model):
+    # 本文で使っている/media/以下の画像。幅ごとの画像ができた時に、変換し直す本文を探す
+    name = models.CharField(verbose_name="ファイル名", max_length=255)
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        verbose_name="記事",
+        related_name="images",
+        null=True,
+        blank=True,
+    )
+    bureau = models.ForeignKey(
+        Bureau,
+        on_delete=models.CASCADE,
+        verbose_name="局",
+        related_name="images",
+        null=True,
+        blank=True,
+    )
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = "本文の画像"
+        verbose_name_plural = "本文の画像"
+        indexes = [models.Index(fields=["name"], name="contentimage_name_idx")]
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Q
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_cursor(article):
+    microseconds = (article.updated_at - EPOCH) // timedelta(microseconds=1)
+    return f"{microseconds}-{article.pk}"
+
+
+def decode_cursor(cursor):
+    # 不正な値の時はValueErrorを送出する
+    microseconds, pk = cursor.split("-")
+    try:
+        return EPOCH + timedelta(microseconds=int(microseconds)), int(pk)
+    except OverflowError as e:
+        raise ValueError(cursor) from e
+
+
+def filter_after(queryset, cursor):
+    # updated_atの範囲で索引をたどれるよう、updated_at <= カーソルの条件を先に置く
+    updated_at, pk = decode_cursor(cursor)
+    return queryset.filter(
+        Q(updated_at__lte=updated_at) & (Q(updated_at__lt=updated_at) | Q(id__lt=pk))
+    )
+
+
+def filter_before(queryset, cursor):
+    updated_at, pk = decode_cursor(cursor)
+    return queryset.filter(
+        Q(updated_at__gte=updated_at) & (Q(updated_at__gt=updated_at) | Q(id__gt=pk))
+    )
+
+
+class KeysetPage:
+    def __init__(self, object_list, has_previous, has_next):
+        self.object_list = object_list
+        self._has_previous = has_previous
+        self._has_next = has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_other_pages(self):
+        return self._has_previous or self._has_next
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return encode_cursor(self.object_list[0])
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return encode_cursor(self.object_list[-1])
+
+
+def keyset_queryset(queryset, page_size, after=None, before=None):
+    # (updated_at, id)の降順で並べ、OFFSETを使わずにカーソルの前後を取得する
+    # どのページでも索引をたどる件数はpage_size + 1件で済む
+    queryset = queryset.order_by("-updated_at", "-id")
+    if before is not None:
+        return filter_before(queryset, before).reverse()[: page_size + 1]
+    if after is not None:
+        queryset = filter_after(queryset, after)
+    return queryset[: page_size + 1]
+
+
+def keyset_page(rows, page_size, after=None, before=None):
+    if before is not None:
+        return KeysetPage(rows[:page_size][::-1], len(rows) > page_size, True)
+    return KeysetPage(rows[:page_size], after is not None, len(rows) > page_size)
+
+
+def paginate_by_keyset(queryset, page_size, after=None, before=None):
+    rows = list(keyset_queryset(queryset, page_size, after, before))
+    return keyset_page(rows, page_size, after, before)
+
+
+async def apaginate_by_keyset(queryset, page_size, after=None, before=None):
+    rows = [row async for row in keyset_queryset(queryset, page_size, after, before)]
+    return keyset_page(rows, page_size, after, before)
@@ -0,0 +1,165 @@
+import html
+import operator
+import re
+import unicodedata
+from collections import Counter
+from functools import reduce
+from itertools import chain
+
+from django.db import models, transaction
+from django.utils.html import escape, strip_tags
+from django.utils.safestring import mark_safe
+
+from .models import SearchToken
+
+# タイトルに含まれる語は本文の語より重く数える
+TITLE_WEIGHT = 10
+WORD_PATTERN = re.compile(r"\w+")
+# 候補の記事をすべて調べる上限と、それを超えた時に候補にする記事の件数
+MAX_CANDIDATES = 5000
+MAX_RESULTS = 1000
+MAX_COUNTED_TERMS = 8
+# 索引の更新が必要になる列
+INDEXED_FIELDS = {"title", "content_with_markdown", "content_html", "is_published"}
+
+
+def normalize(text):
+    # 全角英数字と半角カナをそろえ、大文字と小文字を区別しない
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def split_words(text):
+    return WORD_PATTERN.findall(normalize(text))
+
+
+def tokenize(text):
+    # 日本語は単語に区切れないので、連続する2文字ずつをトークンにする
+    # 1文字での検索のために、語の最後の1文字もトークンにする
+    for word in split_words(text):
+        for i in range(len(word) - 1):
+            yield word[i : i + 2]
+        yield word[-1]
+
+
+def plain_text(content_html):
+    return html.unescape(strip_tags(content_html))
+
+
+def build_tokens(article):
+    weights = Counter()
+    for token in tokenize(article.title):
+        weights[token] += TITLE_WEIGHT
+    for token in tokenize(plain_text(article.content_html)):
+        weights[token] += 1
+    return [
+        SearchToken(token=token, article=article, weight=weight)
+        for token, weight in weights.items()
+    ]
+
+
+def update_index(article):
+    with transaction.atomic():
+        SearchToken.objects.filter(article=article).delete()
+        if article.is_published:
+            SearchToken.objects.bulk_create(build_tokens(article))
+
+
+def update_indexes(articles):
+    # 複数の記事の索引を、記事ごとではなくまとめて削除して登録し直す
+    with transaction.atomic():
+        SearchToken.objects.filter(article__in=articles).delete()
+        SearchToken.objects.bulk_create(
+            chain.from_iterable(
+                build_tokens(article) for article in articles if article.is_published
+            )
+        )
+
+
+def starts_with(char):
+    # LIKEは索引を使わないデータベースがあるので、範囲で前方一致を調べる
+    return models.Q(token__range=(char, char + "\U0010ffff"))
+
+
+def parse_query(query):
+    # 2文字以上の語は2文字ずつ、1文字の語はその文字で始まるトークンを条件にする
+    terms = {}
+    for word in split_words(query):
+        if len(word) == 1:
+            terms[word] = starts_with(word)
+        for i in range(len(word) - 1):
+            terms[word[i : i + 2]] = models.Q(token=word[i : i + 2])
+    return list(terms.values())
+
+
+def search(query):
+    # 記事のIDとスコアを関連度の高い順に返す
+    terms = parse_query(query)
+    if not terms:
+        return SearchToken.objects.none().values("article")
+
+    # 該当するトークンが最も少ない条件で候補を絞り込み、残りの条件は候補の記事だけで調べる
+    # 長い検索語ではクエリが増えすぎないよう、先頭の条件だけを数える
+    counts = [
+        SearchToken.objects.filter(term)[: MAX_CANDIDATES + 1].count()
+        for term in terms[:MAX_COUNTED_TERMS]
+    ]
+    rarest = counts.index(min(counts))
+    candidates = SearchToken.objects.filter(terms[rarest]).values("article")
+    for i, term in enumerate(terms):
+        if i != rarest:
+            candidates = candidates.filter(
+                models.Exists(
+                    SearchToken.objects.filter(term, article=models.OuterRef("article"))
+                )
+            )
+    if min(counts) > MAX_CANDIDATES:
+        # どの条件にも該当する記事が多すぎる時は、重みの大きい記事から順に候補にする
+        # 索引の逆順に読むので並べ替えは起きない
+        candidates = list(
+            candidates.order_by("-token", "-weight", "-article").values_list(
+                "article", flat=True
+            )[:MAX_RESULTS]
+        )
+    return (
+        SearchToken.objects.filter(article__in=candidates)
+        .filter(reduce(operator.or_, terms))
+        .values("article")
+        .annotate(score=models.Sum("weight"))
+        .order_by("-score", "-article")
+    )
+
+
+def get_pattern(query):
+    words = sorted(set(split_words(query)), key=len, reverse=True)
+    if not words:
+        return None
+    return re.compile("|".join(map(re.escape, words)), re.IGNORECASE)
+
+
+def highlight(text, query):
+    # 一致した箇所を<mark>で囲む。それ以外の部分はエスケープする
+    pattern = get_pattern(query)
+    if pattern is None:
+        return escape(text)
+    parts = []
+    last = 0
+    for match in pattern.finditer(text):
+        parts.append(escape(text[last : match.start()]))
+        parts.append(f"<mark>{escape(match.group())}</mark>")
+        last = match.end()
+    parts.append(escape(text[last:]))
+    return mark_safe("".join(parts))
+
+
+def snippet(text, query, length=120):
+    # 最初に一致した箇所の周辺を切り出す
+    text = " ".join(text.split())
+    pattern = get_pattern(query)
+    match = pattern.search(text) if pattern else None
+    start = max(match.start() - length // 4, 0) if match else 0
+    result = text[start : start + length]
+    if start > 0:
+        result = "…" + result
+    if start + length < len(text):
+        result += "…"
+    return result
@@ -0,0 +1,98 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from contents import images
+from tasks.queue import enqueue
+
+from . import bulk, caches, content_images, search, tasks
+from .models import RENDERED_FIELDS, Article, Bureau
+
+
+def get_bureau_slug(bureau_id):
+    if bureau_id is None:
+        return None
+    return Bureau.objects.filter(pk=bureau_id).values_list("slug", flat=True).first()
+
+
+@receiver(pre_save, sender=Article)
+def remember_previous_article(sender, instance, **kwargs):
+    if instance.pk is None:
+        instance._previous = None
+        return
+    instance._previous = (
+        Article.objects.filter(pk=instance.pk)
+        .values_list("is_published", "bureau__slug")
+        .first()
+    )
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def invalidate_article_pages(sender, instance, **kwargs):
+    # 公開中か、公開していた記事だけが一覧や局のページに影響する
+    slugs = set()
+    previous = getattr(instance, "_previous", None)
+    if previous and previous[0]:
+        slugs.add(previous[1])
+    if instance.is_published:
+        slugs.add(get_bureau_slug(instance.bureau_id))
+    bulk.invalidate_articles([instance.pk], slugs)
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_save, sender=Bureau)
+def render_content_later(sender, instance, **kwargs):
+    # TASKS_ALWAYS_EAGERの時は保存する前に変換しているので、何もしない
+    if instance.content_with_markdown is None or instance.is_rendered():
+        return
+    enqueue(tasks.render_content, sender._meta.label, instance.pk)
+
+
+@receiver(post_save, sender=Article)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not search.INDEXED_FIELDS & set(update_fields):
+        return
+    enqueue(tasks.update_search_index, instance.pk)
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_save, sender=Bureau)
+def update_image_references(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "content_html" not in update_fields:
+        return
+    content_images.update_references(instance)
+
+
+@receiver(pre_save, sender=Bureau)
+def remember_previous_bureau(sender, instance, **kwargs):
+    instance._previous_slug = get_bureau_slug(instance.pk)
+
+
+@receiver(post_save, sender=Bureau)
+@receiver(post_delete, sender=Bureau)
+def invalidate_bureau_pages(sender, instance, **kwargs):
+    slugs = {instance.slug}
+    previous_slug = getattr(instance, "_previous_slug", None)
+    if previous_slug:
+        slugs.add(previous_slug)
+    # bulk.invalidate_articlesと同じく、コミットしてから破棄する
+    transaction.on_commit(partial(invalidate_bureau, instance.pk, sorted(slugs)))
+
+
+def invalidate_bureau(bureau_id, slugs):
+    caches.bump_tags({caches.BUREAUS_TAG} | {caches.bureau_tag(slug) for slug in slugs})
+    # 局の記事が多いと時間がかかるので、書き出したページの削除はワーカーで行う
+    enqueue(tasks.discard_bureau_pages, bureau_id, slugs)
+
+
+@receiver(images.variants_ready)
+def rerender_contents_with_image(sender, name, **kwargs):
+    # 幅ごとの画像ができる前に変換した本文を、picture要素を含むHTMLに変換し直す
+    # updated_atは変えず、rendered_atでETagとLast-Modifiedを変える
+    # 保存時のシグナルでキャッシュと書き出したページを破棄する
+    for obj in content_images.contents_with_image(name):
+        if obj.render_content(force=True):
+            obj.save(update_fields=RENDERED_FIELDS)
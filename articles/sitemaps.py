@@ -0,0 +1,166 @@
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+
+from . import caches
+from .models import Article, Bureau
+from .views import absolute_url_key, cached_page_response, make_etag
+
+CONTENT_TYPE = "application/xml; charset=utf-8"
+XMLNS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+# データベースから一度に読み込む行数と、一度に書き出すURLの数
+CHUNK_SIZE = 2000
+
+
+def lastmod(value):
+    return value.isoformat(timespec="seconds")
+
+
+def entry(tag, location, updated_at=None):
+    line = f"<{tag}><loc>{escape(location)}</loc>"
+    if updated_at is not None:
+        line += f"<lastmod>{lastmod(updated_at)}</lastmod>"
+    return f"{line}</{tag}>\n"
+
+
+def get_sections():
+    # 記事のサイトマップの区切り。[直前のファイルの最後の記事のID, 最終更新日時]のリスト
+    # 記事をモデルにせず、IDと更新日時だけを少しずつ読み込む
+    key = caches.page_cache_key("sitemap-sections", [caches.ARTICLES_TAG])
+    sections = caches.get_page_cache().get(key)
+    if sections is None:
+        sections = []
+        rows = (
+            Article.objects.published()
+            .order_by("id")
+            .values_list("id", "updated_at")
+            .iterator(chunk_size=CHUNK_SIZE)
+        )
+        after = 0
+        for i, (article_id, updated_at) in enumerate(rows):
+            if i % settings.SITEMAP_LIMIT == 0:
+                sections.append([after, updated_at])
+            sections[-1][1] = max(sections[-1][1], updated_at)
+            after = article_id
+        if settings.SITEMAP_CACHE_TIMEOUT:
+            caches.get_page_cache().set(key, sections, settings.SITEMAP_CACHE_TIMEOUT)
+    return sections
+
+
+def batched(lines):
+    # 1行ずつではなく、ある程度まとめて書き出す
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= CHUNK_SIZE:
+            yield "".join(batch)
+            batch = []
+    if batch:
+        yield "".join(batch)
+
+
+def store_after(key, etag, chunks):
+    # 流しながら内容を集め、最後まで書き出せた時だけキャッシュする
+    content = []
+    for chunk in chunks:
+        content.append(chunk.encode())
+        yield chunk
+    caches.get_page_cache().set(
+        key,
+        {
+            "content": b"".join(content),
+            "content_type": CONTENT_TYPE,
+            "ETag": etag,
+            "Last-Modified": None,
+        },
+        settings.SITEMAP_CACHE_TIMEOUT,
+    )
+
+
+def streamed_sitemap(request, tags, lines):
+    chunks = batched(lines)
+    if not settings.SITEMAP_CACHE_TIMEOUT:
+        return StreamingHttpResponse(chunks, content_type=CONTENT_TYPE)
+    key = caches.page_cache_key(absolute_url_key(request), tags)
+    cached = caches.get_page_cache().get(key)
+    if cached is not None:
+        return cached_page_response(request, cached)
+    etag = f'"{make_etag(key)}"'
+    response = StreamingHttpResponse(
+        store_after(key, etag, chunks), content_type=CONTENT_TYPE
+    )
+    response["ETag"] = etag
+    return response
+
+
+def index_lines(base_url, sections):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield f'<sitemapindex xmlns="{XMLNS}">\n'
+    yield entry("sitemap", base_url + reverse("articles:sitemap_bureaus"))
+    for page, (_, updated_at) in enumerate(sections, 1):
+        location = reverse("articles:sitemap_articles", kwargs={"page": page})
+        yield entry("sitemap", base_url + location, updated_at)
+    yield "</sitemapindex>\n"
+
+
+def bureau_lines(base_url):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield f'<urlset xmlns="{XMLNS}">\n'
+    yield entry("url", base_url + reverse("articles:index"))
+    yield entry("url", base_url + reverse("articles:list"))
+    rows = (
+        Bureau.objects.order_by("id")
+        .values_list("slug", "updated_at")
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    for slug, updated_at in rows:
+        location = reverse("articles:bureau", kwargs={"slug": slug})
+        yield entry("url", base_url + location, updated_at)
+    yield "</urlset>\n"
+
+
+def article_lines(base_url, after):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield f'<urlset xmlns="{XMLNS}">\n'
+    rows = (
+        Article.objects.published()
+        .filter(id__gt=after)
+        .order_by("id")
+        .values_list("id", "updated_at")[: settings.SITEMAP_LIMIT]
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    for article_id, updated_at in rows:
+        location = reverse("articles:detail", kwargs={"article_id": article_id})
+        yield entry("url", base_url + location, updated_at)
+    yield "</urlset>\n"
+
+
+def base_url(request):
+    # httpsかどうかは、nginxが渡すX-Forwarded-Proto(SECURE_PROXY_SSL_HEADER)で判断する
+    return request.build_absolute_uri("/").rstrip("/")
+
+
+def sitemap_index(request):
+    # 記事はSITEMAP_LIMIT件ごとに別のファイルに分ける
+    sections = get_sections()
+    return streamed_sitemap(
+        request, [caches.ARTICLES_TAG], index_lines(base_url(request), sections)
+    )
+
+
+def bureau_sitemap(request):
+    return streamed_sitemap(
+        request, [caches.BUREAUS_TAG], bureau_lines(base_url(request))
+    )
+
+
+def article_sitemap(request, page):
+    sections = get_sections()
+    if not 1 <= page <= len(sections):
+        raise Http404
+    after = sections[page - 1][0]
+    return streamed_sitemap(
+        request, [caches.ARTICLES_TAG], article_lines(base_url(request), after)
+    )
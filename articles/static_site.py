@@ -0,0 +1,134 @@
+import functools
+import json
+import os
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.db import models
+from django.test import RequestFactory
+from django.urls import URLResolver, reverse
+from django.urls.resolvers import RegexPattern
+
+from contents.storage import write_file
+
+from . import views
+from .models import Article, Bureau
+
+MANIFEST_NAME = ".manifest.json"
+
+
+def page_file(url):
+    # nginxのtry_files $uri.html $uri/index.htmlに合わせたファイル名
+    path = url.lstrip("/")
+    if not path or path.endswith("/"):
+        path += "index"
+    return os.path.join(settings.STATIC_SITE_ROOT, f"{path}.html")
+
+
+def discard(urls):
+    # 書き出したページを削除して、次に書き出すまではDjangoに表示させる
+    if not os.path.isdir(settings.STATIC_SITE_ROOT):
+        return
+    for url in urls:
+        try:
+            os.remove(page_file(url))
+        except FileNotFoundError:
+            pass
+
+
+def get_pages():
+    # 書き出すページのURLと、ページの内容が変わると変わる値
+    articles = Article.objects.published().aggregate(
+        latest=models.Max("updated_at"), count=models.Count("id")
+    )
+    bureaus = Bureau.objects.aggregate(
+        latest=models.Max("updated_at"), count=models.Count("id")
+    )
+    articles_stamp = f"{articles['latest']}|{articles['count']}"
+    pages = {
+        reverse("articles:index"): (
+            f"{articles_stamp}|{bureaus['latest']}|{bureaus['count']}"
+        ),
+        reverse("articles:list"): articles_stamp,
+    }
+    # 記事のページには局名を表示しているので、局の更新日時も含める
+    details = Article.objects.published().values_list(
+        "id", "updated_at", "rendered_at", "bureau__updated_at"
+    )
+    for pk, *stamp in details.iterator():
+        url = reverse("articles:detail", kwargs={"article_id": pk})
+        pages[url] = "|".join(map(str, stamp))
+    published = models.Q(article__is_published=True)
+    bureau_pages = Bureau.objects.annotate(
+        articles_latest=models.Max("article__updated_at", filter=published),
+        articles_count=models.Count("article", filter=published),
+    ).values_list(
+        "slug", "updated_at", "rendered_at", "articles_latest", "articles_count"
+    )
+    for slug, *stamp in bureau_pages:
+        url = reverse("articles:bureau", kwargs={"slug": slug})
+        pages[url] = "|".join(map(str, stamp))
+    return pages
+
+
+@functools.cache
+def get_resolver():
+    # ASGI=Trueの時も、公開ページは同期のビューで書き出す
+    from .urls import public_urlpatterns
+
+    return URLResolver(RegexPattern(r"^/"), public_urlpatterns(views))
+
+
+def render_page(url):
+    # ログインしていない閲覧者としてビューを呼び出す
+    request = RequestFactory().get(url)
+    request.user = AnonymousUser()
+    match = get_resolver().resolve(url)
+    response = match.func(request, *match.args, **match.kwargs)
+    if hasattr(response, "render"):
+        response.render()
+    return response
+
+
+def load_manifest():
+    try:
+        with open(os.path.join(settings.STATIC_SITE_ROOT, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def get_version():
+    # CSSなどが変わるとページ内の静的ファイルのURLも変わるので、全ページを書き出し直す
+    assets = getattr(staticfiles_storage, "manifest_hash", "")
+    return f"{settings.PAGE_VERSION}|{assets}"
+
+
+def export(force=False):
+    # 前回から変わったページだけを書き出し、公開されなくなったページを削除する
+    manifest = load_manifest()
+    version = get_version()
+    if manifest.get("version") != version:
+        force = True
+    previous = manifest.get("pages", {})
+    pages = get_pages()
+    written = 0
+    for url, stamp in list(pages.items()):
+        path = page_file(url)
+        if not force and previous.get(url) == stamp and os.path.exists(path):
+            continue
+        response = render_page(url)
+        if response.status_code != 200:
+            del pages[url]
+            continue
+        write_file(path, response.content)
+        written += 1
+    removed = previous.keys() - pages.keys()
+    discard(removed)
+    manifest = {"version": version, "pages": pages}
+    write_file(
+        os.path.join(settings.STATIC_SITE_ROOT, MANIFEST_NAME),
+        json.dumps(manifest, ensure_ascii=False).encode(),
+    )
+    return written, len(removed)
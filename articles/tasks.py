@@ -0,0 +1,47 @@
+from itertools import chain
+
+from django.apps import apps
+from django.urls import reverse
+
+from tasks.queue import task
+
+from . import search, static_site
+from .models import RENDERED_FIELDS, Article
+
+
+@task
+def render_content(model_label, pk):
+    # 保存の後でマークダウンを変換する。保存時のシグナルでキャッシュも破棄される
+    obj = apps.get_model(model_label).objects.filter(pk=pk).first()
+    if obj is not None and obj.render_content():
+        obj.save(update_fields=RENDERED_FIELDS)
+
+
+@task
+def update_search_index(article_id):
+    # 削除された記事のトークンは外部キーのCASCADEで削除される
+    article = Article.objects.filter(pk=article_id).first()
+    if article is not None:
+        search.update_index(article)
+
+
+@task
+def discard_bureau_pages(bureau_id, slugs):
+    # 記事のページにも局名を表示している
+    # 書き出したページがない時は記事を問い合わせないよう、ジェネレーターで渡す
+    articles = Article.objects.published().filter(bureau_id=bureau_id)
+    static_site.discard(
+        chain(
+            [reverse("articles:index")],
+            (reverse("articles:bureau", kwargs={"slug": slug}) for slug in slugs),
+            (
+                reverse("articles:detail", kwargs={"article_id": pk})
+                for pk in articles.values_list("pk", flat=True)
+            ),
+        )
+    )
+
+
+@task(max_attempts=1)
+def export_static_site():
+    static_site.export()
@@ -0,0 +1,17 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from contents import css
+
+register = template.Library()
+
+
+@register.simple_tag
+def css_src(source):
+    # sass_srcと違い、ビルド時に作った対応表からURLを引くだけで、ファイルを確かめない
+    return css.css_url(source)
+
+
+@register.simple_tag
+def inline_css(source):
+    return mark_safe(css.inline_css(source))
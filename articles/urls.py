@@ -1,12 +1,44 @@
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import async_views, feeds, sitemaps, views
 
 app_name = "articles"
 
-urlpatterns = [
-    path("", views.IndexView.as_view(), name="index"),
-    path("articles/", views.ArticleListView.as_view(), name="list"),
-    path("articles/<int:article_id>", views.ArticleDetailView.as_view(), name="detail"),
-    path("bureaus/<slug:slug>", views.BureauDetailView.as_view(), name="bureau"),
-]
+
+def public_urlpatterns(public_views):
+    return [
+        path("", public_views.IndexView.as_view(), name="index"),
+        path("articles/", public_views.ArticleListView.as_view(), name="list"),
+        path(
+            "articles/<int:article_id>",
+            public_views.ArticleDetailView.as_view(),
+            name="detail",
+        ),
+        path("search/", views.SearchView.as_view(), name="search"),
+        path(
+            "bureaus/<slug:slug>",
+            public_views.BureauDetailView.as_view(),
+            name="bureau",
+        ),
+        # フィードとサイトマップは閲覧者によらずキャッシュするので、ASGIでも同期のビューを使う
+        path("feeds/articles.xml", feeds.rss_feed, name="rss"),
+        path("feeds/articles.atom", feeds.atom_feed, name="atom"),
+        path("feeds/bureaus/<slug:slug>.xml", feeds.bureau_rss_feed, name="bureau_rss"),
+        path(
+            "feeds/bureaus/<slug:slug>.atom",
+            feeds.bureau_atom_feed,
+            name="bureau_atom",
+        ),
+        path("sitemap.xml", sitemaps.sitemap_index, name="sitemap"),
+        path("sitemap-bureaus.xml", sitemaps.bureau_sitemap, name="sitemap_bureaus"),
+        path(
+            "sitemap-articles-<int:page>.xml",
+            sitemaps.article_sitemap,
+            name="sitemap_articles",
+        ),
+    ]
+
+
+# ASGIで動かす時は公開ページに非同期のビューを使う
+urlpatterns = public_urlpatterns(async_views if settings.ASGI else views)
@@ -1,49 +1,304 @@
+import hashlib
+from functools import partial
 from typing import Any, Dict
 
+from django.conf import settings
 from django.db import models
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.functional import cached_property
+from django.utils.http import parse_http_date_safe, urlencode
 from django.views import generic
+from django.views.decorators.http import condition
 
+from . import caches, search
 from .models import Article, Bureau
+from .pagination import paginate_by_keyset
+
+
+def make_etag(source):
+    source = f"{settings.PAGE_VERSION}|{source}"
+    return hashlib.md5(source.encode()).hexdigest()
+
+
+def cached_page_response(request, cached):
+    response = HttpResponse(cached["content"], content_type=cached["content_type"])
+    # キャッシュした検証用のヘッダーで、データベースに問い合わせずに304を返す
+    for header in ("ETag", "Last-Modified"):
+        if cached.get(header):
+            response.headers[header] = cached[header]
+    return get_conditional_response(
+        request,
+        etag=response.get("ETag"),
+        last_modified=parse_http_date_safe(response.get("Last-Modified")),
+        response=response,
+    )
+
+
+def page_entry(response):
+    # キャッシュに保存する内容。cached_page_responseでレスポンスに戻す
+    return {
+        "content": response.content,
+        "content_type": response["Content-Type"],
+        "ETag": response.get("ETag"),
+        "Last-Modified": response.get("Last-Modified"),
+    }
+
+
+def store_page(key, response, timeout=None):
+    # 描画後のコールバックとして、正常に描画できたページをキャッシュする
+    caches.get_page_cache().set(
+        key,
+        page_entry(response),
+        settings.PAGE_CACHE_TIMEOUT if timeout is None else timeout,
+    )
+
+
+def absolute_url_key(request):
+    # フィードやサイトマップは絶対URLを含むので、スキームとホストごとにキャッシュを分ける
+    return request.build_absolute_uri(request.path)
+
+
+class AnonymousPageCacheMixin:
+    # ログインしていない閲覧者へのレスポンスをURLごとにキャッシュする
+    # キャッシュはcache_tagsのいずれかが更新されると使われなくなる
+    cache_tags = []
+
+    def get_cache_tags(self):
+        return self.cache_tags
+
+    def get_cache_path(self):
+        # キャッシュのキーにするパス。Noneを返した時はキャッシュしない
+        return self.request.get_full_path()
+
+    def should_cache(self, response):
+        return response.status_code == 200
+
+    def dispatch(self, request, *args, **kwargs):
+        path = self.get_cache_path()
+        if (
+            not settings.PAGE_CACHE_TIMEOUT
+            or request.method not in ("GET", "HEAD")
+            or request.user.is_authenticated
+            or path is None
+        ):
+            return super().dispatch(request, *args, **kwargs)
+
+        key = caches.page_cache_key(path, self.get_cache_tags())
+        cached = caches.get_page_cache().get(key)
+        if cached is not None:
+            return cached_page_response(request, cached)
+
+        response = super().dispatch(request, *args, **kwargs)
+        if self.should_cache(response):
+            response.add_post_render_callback(partial(store_page, key))
+        return response
+
+
+class ConditionalGetMixin:
+    # updated_atからETagとLast-Modifiedを作り、変更がなければ描画する前に304を返す
+    def get_validators(self):
+        # (ETagの元になる値, 最終更新日時)を返す。対象がない時は(None, None)を返す
+        raise NotImplementedError
+
+    @cached_property
+    def validators(self):
+        return self.get_validators()
+
+    def get_etag(self, request, *args, **kwargs):
+        source = self.validators[0]
+        if source is None:
+            return None
+        return make_etag(source)
+
+    def get_last_modified(self, request, *args, **kwargs):
+        return self.validators[1]
+
+    def dispatch(self, request, *args, **kwargs):
+        view = condition(
+            etag_func=self.get_etag, last_modified_func=self.get_last_modified
+        )(super().dispatch)
+        return view(request, *args, **kwargs)
+
+
+def latest(*values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
 
 
 # Create your views here.
-class IndexView(generic.TemplateView):
+class IndexView(AnonymousPageCacheMixin, ConditionalGetMixin, generic.TemplateView):
     template_name = "articles/index.html"
+    cache_tags = [caches.ARTICLES_TAG, caches.BUREAUS_TAG]
+
+    def get_validators(self):
+        articles = Article.objects.published().aggregate(
+            latest=models.Max("updated_at"), count=models.Count("id")
+        )
+        bureaus = Bureau.objects.aggregate(
+            latest=models.Max("updated_at"), count=models.Count("id")
+        )
+        return (
+            f"{articles['latest']}|{articles['count']}|"
+            f"{bureaus['latest']}|{bureaus['count']}",
+            latest(articles["latest"], bureaus["latest"]),
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["new_articles"] = Article.objects.filter(is_published=True).order_by(
-            "-updated_at"
-        )[:5]
-        context["bureaus"] = Bureau.objects.all()
+        context["new_articles"] = (
+            Article.objects.published().summaries().order_by("-updated_at", "-id")[:5]
+        )
+        context["bureaus"] = Bureau.objects.only("id", "name", "slug")
         return context
 
 
-class ArticleListView(generic.ListView):
-    queryset = Article.objects.filter(is_published=True).order_by("-updated_at")
+class ArticleListView(AnonymousPageCacheMixin, ConditionalGetMixin, generic.ListView):
+    cache_tags = [caches.ARTICLES_TAG]
+    queryset = Article.objects.published().summaries().order_by("-updated_at", "-id")
     template_name = "articles/list.html"
     context_object_name = "articles"
+    paginate_by = 20
+
+    def paginate_queryset(self, queryset, page_size):
+        # ?after=と?before=に前のページの端の記事のカーソルを受け取る
+        try:
+            page = paginate_by_keyset(
+                queryset,
+                page_size,
+                after=self.request.GET.get("after"),
+                before=self.request.GET.get("before"),
+            )
+        except ValueError:
+            raise Http404("ページが見つかりません")
+        return None, page, page.object_list, page.has_other_pages()
+
+    def get_validators(self):
+        articles = Article.objects.published().aggregate(
+            latest=models.Max("updated_at"), count=models.Count("id")
+        )
+        return f"{articles['latest']}|{articles['count']}", articles["latest"]
 
 
-class ArticleDetailView(generic.DetailView):
+class ArticleDetailView(
+    AnonymousPageCacheMixin, ConditionalGetMixin, generic.DetailView
+):
     template_name = "articles/detail.html"
     pk_url_kwarg = "article_id"
     context_object_name = "article"
 
+    def get_cache_tags(self):
+        # 記事の局名とslugを表示しているので、局の更新でも作り直す
+        return [caches.article_tag(self.kwargs["article_id"]), caches.BUREAUS_TAG]
+
     def get_queryset(self):
+        # テンプレートで局名とslugを表示するので、局もまとめて取得する
         if self.request.user.is_staff:
-            return Article.objects.all()
-        return Article.objects.filter(is_published=True)
+            return Article.objects.select_related("bureau")
+        return Article.objects.published().select_related("bureau")
+
+    def get_validators(self):
+        row = (
+            self.get_queryset()
+            .filter(pk=self.kwargs["article_id"])
+            .values_list("updated_at", "rendered_at", "bureau__updated_at")
+            .first()
+        )
+        if row is None:
+            return None, None
+        return "|".join(map(str, row)), latest(*row)
 
 
-class BureauDetailView(generic.DetailView):
+class BureauDetailView(
+    AnonymousPageCacheMixin, ConditionalGetMixin, generic.DetailView
+):
     template_name = "articles/bureau.html"
     context_object_name = "bureau"
     model = Bureau
 
+    def get_cache_tags(self):
+        return [caches.bureau_tag(self.kwargs["slug"])]
+
+    def get_validators(self):
+        published = models.Q(article__is_published=True)
+        row = (
+            Bureau.objects.filter(slug=self.kwargs["slug"])
+            .annotate(
+                articles_latest=models.Max("article__updated_at", filter=published),
+                articles_count=models.Count("article", filter=published),
+            )
+            .values_list(
+                "updated_at", "rendered_at", "articles_latest", "articles_count"
+            )
+            .first()
+        )
+        if row is None:
+            return None, None
+        return "|".join(map(str, row)), latest(*row[:3])
+
+    def get_context_data(self, **kwargs: Any):
+        context = super().get_context_data(**kwargs)
+        context["articles"] = (
+            Article.objects.published()
+            .summaries()
+            .filter(bureau=context["bureau"])
+            .order_by("-updated_at", "-id")
+        )
+        return context
+
+
+def normalize_query(query):
+    # 前後と連続する空白をまとめる。長すぎる検索語は切り詰める
+    return " ".join(query.split())[:100]
+
+
+class SearchView(AnonymousPageCacheMixin, generic.ListView):
+    # 検索結果は公開中の記事にだけ依存する
+    cache_tags = [caches.ARTICLES_TAG]
+    # 任意の検索語でキャッシュが埋まらないよう、短い検索語の結果だけをキャッシュする
+    cache_query_length = 20
+    template_name = "articles/search.html"
+    context_object_name = "results"
+    paginate_by = 20
+
+    def get_cache_path(self):
+        # 他のパラメーターや空白の違いで、同じ結果を別のキーにキャッシュしない
+        query = normalize_query(self.request.GET.get("q", ""))
+        page = self.request.GET.get("page", "1")
+        if not query or len(query) > self.cache_query_length or not page.isdigit():
+            return None
+        return f"{self.request.path}?{urlencode({'q': query, 'page': int(page)})}"
+
+    def should_cache(self, response):
+        # 該当する記事がない検索語はキャッシュしない
+        return super().should_cache(response) and bool(response.context_data["results"])
+
+    def get_queryset(self):
+        self.query = normalize_query(self.request.GET.get("q", ""))
+        return search.search(self.query)
+
     def get_context_data(self, **kwargs: Any):
         context = super().get_context_data(**kwargs)
-        context["articles"] = Article.objects.filter(
-            bureau=context["bureau"], is_published=True
+        ids = [row["article"] for row in context["results"]]
+        articles = (
+            Article.objects.published()
+            .only("id", "title", "updated_at", "content_html")
+            .in_bulk(ids)
         )
+        # 検索順を保ったまま、タイトルと本文の一致した箇所を強調する
+        context["results"] = [
+            {
+                "article": articles[pk],
+                "title": search.highlight(articles[pk].title, self.query),
+                "snippet": search.highlight(
+                    search.snippet(
+                        search.plain_text(articles[pk].content_html), self.query
+                    ),
+                    self.query,
+                ),
+            }
+            for pk in ids
+            if pk in articles
+        ]
+        context["query"] = self.query
         return context
@@ -0,0 +1,90 @@
+import functools
+import glob
+import hashlib
+import json
+import os
+
+import sass
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from sass_processor.processor import SassProcessor
+
+from .storage import write_file
+
+SOURCE_DIR = os.path.join(settings.BASE_DIR, "contents", "static")
+MANIFEST_NAME = "css-manifest.json"
+# ページに埋め込むCSSのファイル名の末尾
+CRITICAL_SUFFIX = ".critical.scss"
+
+
+def static_dir():
+    # ビルドしたCSSはcollectstaticでSTATIC_ROOTに集める
+    return os.path.join(settings.CSS_BUILD_DIR, "static")
+
+
+def compile_file(path):
+    return sass.compile(
+        filename=path,
+        output_style=settings.SASS_OUTPUT_STYLE,
+        precision=settings.SASS_PRECISION,
+    )
+
+
+def build():
+    # contents/static/css以下のSCSSをコンパイルし、内容のハッシュ値つきのファイル名で書き出す
+    # _で始まるファイルや変数だけのファイルのように、読み込まれるだけのものは書き出さない
+    manifest = {}
+    pattern = os.path.join(SOURCE_DIR, "css", "**", "*.scss")
+    for path in sorted(glob.glob(pattern, recursive=True)):
+        if os.path.basename(path).startswith("_"):
+            continue
+        css = compile_file(path).encode()
+        if not css.strip():
+            continue
+        source = os.path.relpath(path, SOURCE_DIR).replace(os.sep, "/")
+        digest = hashlib.md5(css).hexdigest()[:12]
+        name = f"{source.removesuffix('.scss')}.{digest}.css"
+        output = os.path.join(static_dir(), name)
+        write_file(output, css)
+        manifest[source] = name
+    manifest_path = os.path.join(settings.CSS_BUILD_DIR, MANIFEST_NAME)
+    write_file(manifest_path, json.dumps(manifest, indent=2).encode())
+    return manifest
+
+
+@functools.lru_cache(maxsize=None)
+def load():
+    # ビルド時に作った対応表を読み込み、URLと埋め込むCSSをプロセス内に保持する
+    try:
+        with open(os.path.join(settings.CSS_BUILD_DIR, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    entries = {}
+    for source, name in manifest.items():
+        entries[source] = {"url": staticfiles_storage.url(name)}
+        if source.endswith(CRITICAL_SUFFIX):
+            with open(os.path.join(static_dir(), name)) as f:
+                entries[source]["content"] = f.read()
+    return entries
+
+
+def use_manifest():
+    # 開発環境では、SCSSを変更するとすぐに反映されるよう表示する時にコンパイルする
+    return not settings.SASS_PROCESSOR_ENABLED
+
+
+def css_url(source):
+    entry = load().get(source) if use_manifest() else None
+    if entry is not None:
+        return entry["url"]
+    return SassProcessor.handle_simple(SassProcessor()(source))
+
+
+def inline_css(source):
+    # 最初の描画に必要な分だけのCSSを、スタイルシートを待たずに使えるようページに埋め込む
+    entry = load().get(source) if use_manifest() else None
+    if entry is not None:
+        return entry["content"]
+    return compile_file(finders.find(source))
@@ -0,0 +1,15 @@
+from markdownx import forms
+
+from contents import images
+from tasks.queue import enqueue
+
+
+class ImageForm(forms.ImageForm):
+    def _save(self, image, file_name, commit):
+        result = super()._save(image, file_name, commit)
+        if commit:
+            # アップロードのレスポンスを待たせないよう、幅ごとの画像はワーカーで作る
+            name = images.media_name(result)
+            if name is not None:
+                enqueue(images.build_variants, name)
+        return result
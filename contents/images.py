@@ -0,0 +1,194 @@
+import json
+import os
+import re
+from html import escape, unescape
+from io import BytesIO
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.dispatch import Signal
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from tasks.queue import task
+
+# アップロードされた画像のうち、幅ごとの画像を作るもの(GIFとSVGはそのまま使う)
+SOURCE_FORMATS = {".jpg": "JPEG", ".jpeg": "JPEG", ".png": "PNG", ".webp": "WEBP"}
+# 対応しているブラウザには、こちらを優先して返す
+MODERN_FORMATS = {"AVIF": "image/avif", "WEBP": "image/webp"}
+EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "AVIF": "avif"}
+SAVE_OPTIONS = {
+    "JPEG": {"quality": 75, "optimize": True, "progressive": True},
+    "PNG": {"optimize": True},
+    "WEBP": {"quality": 75},
+    "AVIF": {"quality": 50},
+}
+
+# 幅ごとの画像がそろうと送られる
+variants_ready = Signal()
+
+IMG_RE = re.compile(r"<img\b([^>]*?)/?>")
+ATTR_RE = re.compile(r'([\w-]+)="([^"]*)"')
+
+
+def media_name(url):
+    # /media/以下の画像のURLを、ストレージ上のファイル名に変換する
+    if not url.startswith(settings.MEDIA_URL):
+        return None
+    name = unquote(url[len(settings.MEDIA_URL) :])
+    if os.path.splitext(name)[1].lower() not in SOURCE_FORMATS:
+        return None
+    return name
+
+
+def variant_name(name, width, image_format):
+    stem = os.path.splitext(name)[0]
+    return f"{stem}.{width}w.{EXTENSIONS[image_format]}"
+
+
+def info_name(name):
+    return f"{os.path.splitext(name)[0]}.variants.json"
+
+
+def modern_formats():
+    # Pillowのビルドによっては、AVIFやWebPで保存できない
+    Image.init()
+    return [
+        image_format for image_format in MODERN_FORMATS if image_format in Image.SAVE
+    ]
+
+
+def save_image(image, name, image_format):
+    if image_format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    elif image_format != "JPEG" and image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+    output = BytesIO()
+    image.save(output, image_format, **SAVE_OPTIONS[image_format])
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    default_storage.save(name, ContentFile(output.getvalue()))
+
+
+@task
+def build_variants(name):
+    # 幅ごと、形式ごとの画像を作り、最後に一覧を書き出す
+    source_format = SOURCE_FORMATS[os.path.splitext(name)[1].lower()]
+    info = {"width": None, "height": None, "widths": [], "formats": []}
+    try:
+        with default_storage.open(name) as f:
+            image = ImageOps.exif_transpose(Image.open(f))
+            image.load()
+    except (OSError, UnidentifiedImageError):
+        # 読み込めない画像も、処理済みとして記録しておく
+        image = None
+    if image is not None:
+        width, height = image.size
+        widths = [w for w in settings.CONTENT_IMAGE_WIDTHS if w < width]
+        formats = [f for f in modern_formats() if f != source_format]
+        for w in widths:
+            resized = image.resize(
+                (w, round(height * w / width)), resample=Image.Resampling.LANCZOS
+            )
+            for image_format in [source_format, *formats]:
+                save_image(resized, variant_name(name, w, image_format), image_format)
+        # 元の大きさの画像も、新しい形式で保存しておく
+        for image_format in formats:
+            save_image(image, variant_name(name, width, image_format), image_format)
+        info = {"width": width, "height": height, "widths": widths, "formats": formats}
+    if default_storage.exists(info_name(name)):
+        default_storage.delete(info_name(name))
+    default_storage.save(info_name(name), ContentFile(json.dumps(info).encode()))
+    variants_ready.send(sender=None, name=name, url=default_storage.url(name))
+    return info
+
+
+def load_info(name):
+    try:
+        with default_storage.open(info_name(name)) as f:
+            return json.load(f)
+    except (OSError, SuspiciousFileOperation, ValueError):
+        return None
+
+
+def srcset(items):
+    return ", ".join(f"{escape(url)} {width}w" for url, width in items)
+
+
+def make_tag(name, attrs):
+    return "<{}{}>".format(
+        name, "".join(f' {key}="{value}"' for key, value in attrs.items())
+    )
+
+
+def file_exists(name):
+    try:
+        return default_storage.exists(name)
+    except SuspiciousFileOperation:
+        return False
+
+
+def render_img(attrs):
+    # 戻り値は書き換えたタグと、幅ごとの画像をまだ作っている途中かどうか
+    attrs.setdefault("loading", "lazy")
+    attrs.setdefault("decoding", "async")
+    name = media_name(unescape(attrs.get("src", "")))
+    if name is None:
+        return make_tag("img", attrs), False
+    info = load_info(name)
+    if info is None:
+        return make_tag("img", attrs), file_exists(name)
+    if info["width"] is None:
+        return make_tag("img", attrs), False
+    width, height = info["width"], info["height"]
+    # 読み込む前に表示する領域を確保して、レイアウトがずれないようにする
+    attrs.setdefault("width", str(width))
+    attrs.setdefault("height", str(height))
+    if not info["widths"] and not info["formats"]:
+        return make_tag("img", attrs), False
+    url = default_storage.url
+    sizes = escape(settings.CONTENT_IMAGE_SIZES)
+    sources = []
+    for image_format in info["formats"]:
+        items = [(url(variant_name(name, w, image_format)), w) for w in info["widths"]]
+        items.append((url(variant_name(name, width, image_format)), width))
+        sources.append(
+            f'<source type="{MODERN_FORMATS[image_format]}" '
+            f'srcset="{srcset(items)}" sizes="{sizes}">'
+        )
+    source_format = SOURCE_FORMATS[os.path.splitext(name)[1].lower()]
+    items = [(url(variant_name(name, w, source_format)), w) for w in info["widths"]]
+    items.append((url(name), width))
+    attrs["srcset"] = srcset(items)
+    attrs["sizes"] = sizes
+    return (
+        "<picture>{}{}</picture>".format("".join(sources), make_tag("img", attrs)),
+        False,
+    )
+
+
+def image_names(html):
+    # HTMLで使っている/media/以下の画像のファイル名
+    names = set()
+    for match in IMG_RE.finditer(html):
+        src = dict(ATTR_RE.findall(match.group(1))).get("src", "")
+        name = media_name(unescape(src))
+        if name is not None:
+            names.add(name)
+    return names
+
+
+def responsive_images(html):
+    # サニタイズ後のHTMLの画像を、幅ごとの画像から選ばせるタグに書き換える
+    # 戻り値は書き換えたHTMLと、幅ごとの画像をまだ作っている途中の画像があるかどうか
+    pending = False
+
+    def replace(match):
+        nonlocal pending
+        replaced, image_pending = render_img(dict(ATTR_RE.findall(match.group(1))))
+        pending = pending or image_pending
+        return replaced
+
+    return IMG_RE.sub(replace, html), pending
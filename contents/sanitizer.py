@@ -0,0 +1,62 @@
+import hashlib
+import threading
+from types import MappingProxyType
+
+import bleach
+from bleach_allowlist import markdown_attrs, markdown_tags
+from markdown import Markdown
+from markdownx import settings as markdownx_settings
+
+# bleach_allowlistのリストは書き換えず、コピーしてから表の要素などを追加する
+ALLOWED_TAGS = frozenset([*markdown_tags, "table", "thead", "tr", "th", "td", "tbody"])
+ALLOWED_ATTRIBUTES = MappingProxyType(
+    {
+        **{tag: tuple(attrs) for tag, attrs in markdown_attrs.items()},
+        "*": ("class", "id"),
+        "tr": ("style",),
+        "th": ("style",),
+        "td": ("style",),
+        "img": ("src", "alt", "title", "width", "height"),
+    }
+)
+
+# 許可しているタグと属性が変わると値が変わる
+POLICY_FINGERPRINT = hashlib.sha256(
+    repr(
+        (
+            sorted(ALLOWED_TAGS),
+            sorted(ALLOWED_ATTRIBUTES.items()),
+            markdownx_settings.MARKDOWNX_MARKDOWN_EXTENSIONS,
+            markdownx_settings.MARKDOWNX_MARKDOWN_EXTENSION_CONFIGS,
+        )
+    ).encode()
+).hexdigest()
+
+# MarkdownとCleanerのインスタンスはスレッドセーフではないので、スレッドごとに一度だけ作る
+_local = threading.local()
+
+
+def _get_markdown():
+    if not hasattr(_local, "markdown"):
+        _local.markdown = Markdown(
+            extensions=markdownx_settings.MARKDOWNX_MARKDOWN_EXTENSIONS,
+            extension_configs=markdownx_settings.MARKDOWNX_MARKDOWN_EXTENSION_CONFIGS,
+        )
+    return _local.markdown
+
+
+def _get_cleaner():
+    if not hasattr(_local, "cleaner"):
+        _local.cleaner = bleach.Cleaner(
+            tags=ALLOWED_TAGS,
+            attributes={tag: list(attrs) for tag, attrs in ALLOWED_ATTRIBUTES.items()},
+        )
+    return _local.cleaner
+
+
+def markdown_to_html(markdown_text):
+    return _get_markdown().reset().convert(markdown_text)
+
+
+def sanitize(html):
+    return _get_cleaner().clean(html)
@@ -0,0 +1,64 @@
+import gzip
+import os
+import tempfile
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 画像など、すでに圧縮されている形式は圧縮しない
+COMPRESSED_EXTENSIONS = (".css", ".js", ".map", ".svg", ".ico", ".json", ".txt")
+# これより小さいファイルは圧縮してもヘッダの分だけ大きくなりやすい
+MIN_SIZE = 256
+
+
+def compressors():
+    yield ".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield ".br", lambda data: brotli.compress(data, quality=11)
+
+
+def write_file(path, content):
+    # 書き込み中のファイルをnginxが返さないよう、別名で書いてから置き換える
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(content)
+    os.chmod(temp_path, 0o644)
+    os.replace(temp_path, path)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # ハッシュ値つきのファイル名で保存し、nginxのgzip_static、brotli_static用に
+    # 圧縮したファイルも隣に書き出す
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            self.compress(name)
+
+    def compress(self, name):
+        if not name.endswith(COMPRESSED_EXTENSIONS):
+            return []
+        path = self.path(name)
+        written = []
+        data = None
+        for suffix, compress in compressors():
+            # ファイル名に内容のハッシュ値が含まれているので、既にあれば作り直さない
+            if os.path.exists(path + suffix):
+                continue
+            if data is None:
+                with open(path, "rb") as f:
+                    data = f.read()
+                if len(data) < MIN_SIZE:
+                    return []
+            compressed = compress(data)
+            if len(compressed) >= len(data):
+                continue
+            write_file(path + suffix, compressed)
+            written.append(name + suffix)
+        return written
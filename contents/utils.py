@@ -1,15 +1,123 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
 import bleach
-from bleach_allowlist import markdown_attrs, markdown_tags
-from markdownx.utils import markdownify
+from django.conf import settings
+from django.core.cache import caches
+
+from contents import images, sanitizer
+from hosnakpub import metrics
+
+# マークダウンの変換処理を変更したときはこの値を上げて、保存済みのHTMLを再変換させる
+CONTENT_RENDERER_VERSION = 2
+
+
+def renderer_fingerprint():
+    # 変換結果に影響する設定をまとめたもの
+    return "|".join(
+        [
+            str(CONTENT_RENDERER_VERSION),
+            bleach.__version__,
+            sanitizer.POLICY_FINGERPRINT,
+        ]
+    )
+
+
+def content_hash(markdown_text):
+    source = f"{renderer_fingerprint()}\n{markdown_text}"
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+class RenderCache:
+    # 変換結果を件数と合計サイズの上限つきで保持するLRUキャッシュ
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        size = sys.getsizeof(value)
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= sys.getsizeof(self._entries.pop(key))
+            self._entries[key] = value
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= sys.getsizeof(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+
+render_cache = RenderCache(
+    settings.CONTENT_RENDER_CACHE_MAX_ENTRIES, settings.CONTENT_RENDER_CACHE_MAX_BYTES
+)
+
+
+def render_markdown(markdown_text):
+    # キャッシュを使わずに変換する。戻り値は変換したHTMLと、幅ごとの画像を作っている途中かどうか
+    raw_html = sanitizer.markdown_to_html(markdown_text)
+    return images.responsive_images(sanitizer.sanitize(raw_html))
+
+
+@metrics.measure("markdown")
+def markdown_preview(markdown_text):
+    # 編集画面のプレビュー。入力のたびに内容が変わるので、どちらのキャッシュにも保存しない
+    content, _ = render_markdown(markdown_text)
+    return content
 
 
+@metrics.measure("markdown")
 def markdown_to_content(markdown_text):
-    raw_html = markdownify(markdown_text)
-    tags = markdown_tags
-    tags += ["table", "thead", "tr", "th", "td", "tbody"]
-    markdown_attrs["*"] = ["class", "id"]
-    markdown_attrs["tr"] = ["style"]
-    markdown_attrs["th"] = ["style"]
-    markdown_attrs["td"] = ["style"]
-    markdown_attrs["img"] = ["src", "alt", "title", "width", "height"]
-    return bleach.clean(raw_html, tags=tags, attributes=markdown_attrs)
+    # 保存する本文の変換。同じ本文を何度も変換しないようキャッシュする
+    key = content_hash(markdown_text)
+    content = render_cache.get(key)
+    if content is not None:
+        return content
+    # 他のワーカーが変換済みであれば共有キャッシュから取得する
+    shared_cache = caches[settings.CONTENT_RENDER_CACHE_ALIAS]
+    shared_key = f"content:{key}"
+    content = shared_cache.get(shared_key)
+    if content is None:
+        content, pending = render_markdown(markdown_text)
+        # 幅ごとの画像を作っている途中の時は、そろってから変換し直せるよう保存しない
+        if pending:
+            return content
+        shared_cache.set(shared_key, content)
+    render_cache.set(key, content)
+    return content
@@ -1,13 +1,24 @@
 #!/bin/sh
 python manage.py migrate --noinput
+# CACHE_BACKEND=databaseの時に使うテーブルを作成します（それ以外では何もしません）
+python manage.py createcachetable
+# アップロードされた画像のうち、幅ごとの画像がないものを変換します
+python manage.py build_image_variants
+# 変換の設定が変わった記事と局のHTMLを変換し直します
+python manage.py render_contents
+# 検索用の索引に登録されていない公開中の記事を登録します
+python manage.py rebuild_search_index
 
 # 環境変数のDEBUGの値がTrueの時はrunserverを、Falseの時はgunicornを実行します
 if [ $DEBUG = "True" ]
 then
     python manage.py runserver 0.0.0.0:8000
 else
-    python manage.py compilescss
+    # SCSSはイメージのビルド時にコンパイル済み（build_css）なので、集めるだけにします
     python manage.py collectstatic --noinput
-    # gunicornを起動させる時はプロジェクト名を指定します
-    gunicorn hosnakpub.wsgi:application --bind 0.0.0.0:8000
+    # 公開ページを書き出して、nginxから直接返せるようにします
+    python manage.py export_static_site
+    # ワーカーの種類や数はgunicorn.conf.pyで環境変数から設定します
+    # ASGI=Trueの時はuvicornのワーカーで起動し、1つのプロセスで多くの遅いクライアントを扱えます
+    gunicorn -c gunicorn.conf.py
 fi
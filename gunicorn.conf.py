@@ -0,0 +1,70 @@
+# gunicornの設定
+# https://docs.gunicorn.org/en/stable/settings.html
+# settings.pyと同じく、環境変数で変更できるようにする
+import multiprocessing
+import os
+
+
+def env_int(name, default):
+    # 未指定か空の時は既定値を使う
+    return int(os.environ.get(name) or default)
+
+
+def env_bool(name, default):
+    return (os.environ.get(name) or str(default)) == "True"
+
+
+WORKER_CLASSES = {
+    "sync": "sync",
+    "gthread": "gthread",
+    "uvicorn": "uvicorn.workers.UvicornWorker",
+}
+
+bind = os.environ.get("GUNICORN_BIND") or "0.0.0.0:8000"
+
+# sync, gthread, uvicornのいずれか。ASGI=Trueの時の既定はuvicorn
+worker_type = os.environ.get("GUNICORN_WORKER_CLASS") or (
+    "uvicorn" if os.environ.get("ASGI") == "True" else "sync"
+)
+worker_class = WORKER_CLASSES[worker_type]
+if worker_type == "uvicorn":
+    wsgi_app = "hosnakpub.asgi:application"
+else:
+    wsgi_app = "hosnakpub.wsgi:application"
+
+# ワーカー数の既定はgunicornの推奨値(CPUのコア数 * 2 + 1)
+workers = env_int("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1)
+# gthreadの時のワーカーごとのスレッド数
+threads = env_int("GUNICORN_THREADS", 4 if worker_type == "gthread" else 1)
+
+# アプリケーションを親プロセスで読み込んでから子プロセスを作り、起動時間とメモリを節約する
+preload_app = env_bool("GUNICORN_PRELOAD", True)
+
+# メモリの増加に備えてワーカーを定期的に作り直す
+# 全ワーカーが同時に再起動しないよう、リクエスト数にばらつきを持たせる
+max_requests = env_int("GUNICORN_MAX_REQUESTS", 1000)
+max_requests_jitter = env_int("GUNICORN_MAX_REQUESTS_JITTER", 100)
+
+# nginxとの接続を使い回す時間
+keepalive = env_int("GUNICORN_KEEPALIVE", 5)
+timeout = env_int("GUNICORN_TIMEOUT", 30)
+graceful_timeout = env_int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+
+# コンテナの/tmpはディスク上にあることがあるので、ハートビートのファイルはメモリ上に置く
+worker_tmp_dir = os.environ.get("GUNICORN_WORKER_TMP_DIR") or "/dev/shm"
+
+
+def pre_fork(server, worker):
+    # preload_appで親プロセスが開いたデータベースの接続を、子プロセスと共有しないよう閉じる
+    if not server.cfg.preload_app:
+        return
+    from django.db import connections
+
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    # 最初のリクエストを待たせないよう、ワーカーごとにテンプレートなどを用意し、データベースへの接続を確かめる
+    from hosnakpub.warmup import warm_up
+
+    warm_up()
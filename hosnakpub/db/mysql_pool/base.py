@@ -0,0 +1,9 @@
+from django.db.backends.mysql import base
+
+from hosnakpub.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    # 接続プールを使うMySQLのバックエンド
+    def ping_connection(self, connection):
+        connection.ping()
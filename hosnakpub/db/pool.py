@@ -0,0 +1,190 @@
+import os
+import threading
+import time
+from functools import partial
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    # スレッド間で共有する接続プール
+    # 返された接続を使い回し、しばらく使われていなかった接続は渡す前に生きているかを確かめる
+    def __init__(
+        self, connect, max_size=10, timeout=10, max_idle=300, ping_after=5, ping=None
+    ):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.ping_after = ping_after
+        self.ping = ping
+        self._idle = []
+        self._size = 0
+        self._condition = threading.Condition()
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def acquire(self):
+        start = time.monotonic()
+        while True:
+            connection, idle_for = self._checkout(start)
+            if connection is None:
+                break
+            if idle_for > self.max_idle or (
+                idle_for > self.ping_after and not self.is_usable(connection)
+            ):
+                self.release(connection, discard=True)
+                continue
+            self._record_wait(start, reused=True)
+            return connection
+
+        # 上限に達していなければ新しく接続する。接続中は他のスレッドを待たせない
+        try:
+            connection = self.connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        self._record_wait(start, reused=False)
+        return connection
+
+    def _checkout(self, start):
+        # 空いている接続と使われていなかった秒数を返す。新しく接続する時は(None, 0)を返す
+        with self._condition:
+            while True:
+                if self._idle:
+                    connection, released_at = self._idle.pop()
+                    return connection, time.monotonic() - released_at
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None, 0
+                remaining = self.timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f"{self.timeout}秒待っても接続を取得できませんでした。"
+                    )
+                self.waits += 1
+                self._condition.wait(remaining)
+
+    def _record_wait(self, start, reused):
+        waited = time.monotonic() - start
+        with self._condition:
+            if reused:
+                self.reused += 1
+            else:
+                self.created += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def is_usable(self, connection):
+        if self.ping is None:
+            return True
+        try:
+            return self.ping(connection) is not False
+        except Exception:
+            return False
+
+    def release(self, connection, discard=False):
+        with self._condition:
+            if discard:
+                self._size -= 1
+                self.discarded += 1
+            else:
+                self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+        if discard:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def close(self):
+        with self._condition:
+            idle = self._idle
+            self._idle = []
+            self._size -= len(idle)
+        for connection, _ in idle:
+            connection.close()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "created": self.created,
+                "reused": self.reused,
+                "discarded": self.discarded,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "wait_seconds": self.wait_seconds,
+                "max_wait_seconds": self.max_wait_seconds,
+                "in_use": self._size - len(self._idle),
+                "idle": len(self._idle),
+                "max_size": self.max_size,
+            }
+
+
+# 接続先ごとのプール
+pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, connect, **options):
+    with _pools_lock:
+        if key not in pools:
+            pools[key] = ConnectionPool(connect, **options)
+        return pools[key]
+
+
+def stats():
+    with _pools_lock:
+        return {key[0]: pool.stats() for key, pool in pools.items()}
+
+
+# gunicornのpreload_appなどで親プロセスのプールを引き継いだ時は、子プロセスで作り直す
+# 親プロセスの接続を閉じてしまわないよう、closeは呼ばずに捨てる
+os.register_at_fork(after_in_child=pools.clear)
+
+
+class PooledDatabaseWrapperMixin:
+    # 接続を閉じる代わりにプールへ返し、同じプロセスのスレッド間で使い回す
+    # CONN_MAX_AGEを0にして、リクエストが終わるたびにプールへ返させる
+    def get_pool(self, conn_params):
+        # テスト用のデータベースに切り替えた時などに別のプールを使うよう、接続先もキーに含める
+        key = (self.alias, repr(sorted(conn_params.items())))
+        options = {
+            name.lower(): value
+            for name, value in self.settings_dict.get("POOL_OPTIONS", {}).items()
+        }
+        return get_pool(
+            key,
+            partial(super().get_new_connection, conn_params),
+            ping=self.ping_connection,
+            **options,
+        )
+
+    def get_new_connection(self, conn_params):
+        self._pool = self.get_pool(conn_params)
+        return self._pool.acquire()
+
+    def ping_connection(self, connection):
+        return True
+
+    def _close(self):
+        if self.connection is None:
+            return
+        discard = self.errors_occurred
+        if not discard and not self.get_autocommit():
+            # トランザクションの途中の状態を次に使うスレッドに引き継がない
+            try:
+                self.connection.rollback()
+            except Exception:
+                discard = True
+        self._pool.release(self.connection, discard=discard)
@@ -0,0 +1,136 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# リクエストごとの計測結果を1行のJSONで出力する
+logger = logging.getLogger(__name__)
+
+# リクエストの処理時間を数えるヒストグラムの区切り(秒)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# 処理中のリクエストで、処理の種類ごとにかかった秒数と回数
+_timings = ContextVar("timings", default=None)
+
+
+class Registry:
+    # プロセス内で集計した値。gunicornのワーカーごとに別の値になる
+    # 同じ系列が重ならないよう、出力する時にpidのラベルをつける
+    # pidを省略した時は、フォークした後のプロセスのpidを使う
+    def __init__(self, pid=None):
+        self.pid = pid
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {
+                    "buckets": [0] * len(BUCKETS),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def increment(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def clear(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def render(self):
+        # Prometheusのテキスト形式で出力する
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+        pid = self.pid or os.getpid()
+        lines = []
+        types = set()
+        for (name, labels), histogram in histograms:
+            if name not in types:
+                lines.append(f"# TYPE {name} histogram")
+                types.add(name)
+            labels = {"pid": pid, **dict(labels)}
+            for bound, count in zip(BUCKETS, histogram["buckets"]):
+                lines.append(sample(f"{name}_bucket", {**labels, "le": bound}, count))
+            bucket_labels = {**labels, "le": "+Inf"}
+            lines.append(sample(f"{name}_bucket", bucket_labels, histogram["count"]))
+            lines.append(sample(f"{name}_sum", labels, histogram["sum"]))
+            lines.append(sample(f"{name}_count", labels, histogram["count"]))
+        for (name, labels), value in counters:
+            if name not in types:
+                lines.append(f"# TYPE {name} counter")
+                types.add(name)
+            lines.append(sample(name, {"pid": pid, **dict(labels)}, value))
+        return lines
+
+
+registry = Registry()
+
+
+def sample(name, labels, value):
+    if not labels:
+        return f"{name} {value}"
+    pairs = ",".join(
+        '{}="{}"'.format(key, str(label).replace("\\", "\\\\").replace('"', '\\"'))
+        for key, label in labels.items()
+    )
+    return f"{name}{{{pairs}}} {value}"
+
+
+def gauges(prefix, rows, pid=None):
+    # 接続プールやキャッシュなどの統計をゲージとして出力する
+    # rowsはラベルと統計の値の組のリスト。Registryと同じくpidのラベルをつける
+    samples = {}
+    for labels, values in rows:
+        labels = {"pid": pid or os.getpid(), **labels}
+        for key, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                name = f"{prefix}_{key}"
+                samples.setdefault(name, []).append(sample(name, labels, value))
+    lines = []
+    for name, metric_lines in samples.items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(metric_lines)
+    return lines
+
+
+@contextmanager
+def collect():
+    # このブロックの中で計測した時間をまとめる
+    timings = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def add(name, seconds, count=1):
+    timings = _timings.get()
+    if timings is None:
+        return
+    total, calls = timings.get(name, (0.0, 0))
+    timings[name] = (total + seconds, calls + count)
+
+
+@contextmanager
+def measure(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(name, time.perf_counter() - start)
@@ -0,0 +1,162 @@
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import metrics
+from .routers import ahas_recent_write, has_recent_write, use_primary
+
+# 書き込んだ直後の閲覧者を、レプリカの遅延がなくなるまでプライマリに送るためのクッキー
+PRIMARY_COOKIE = "use_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class ReplicaRoutingMiddleware:
+    # ログイン中(管理画面や下書きのプレビュー)、書き込み、書き込んだ直後のリクエストは
+    # 読み込みもプライマリに送る。それ以外の匿名の閲覧はレプリカから読む
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        if self.should_use_primary(request) or has_recent_write():
+            with use_primary():
+                response = self.get_response(request)
+        else:
+            response = self.get_response(request)
+        return self.stick_to_primary(request, response)
+
+    async def __acall__(self, request):
+        # 非同期のビューがsync_to_asyncで実行するクエリにも、コンテキスト変数の固定が引き継がれる
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+
+        if self.should_use_primary(request) or await ahas_recent_write():
+            with use_primary():
+                response = await self.get_response(request)
+        else:
+            response = await self.get_response(request)
+        return self.stick_to_primary(request, response)
+
+    def stick_to_primary(self, request, response):
+        if request.method not in SAFE_METHODS:
+            response.set_cookie(
+                PRIMARY_COOKIE,
+                "1",
+                max_age=settings.DB_REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def should_use_primary(self, request):
+        # request.userはセッションをデータベースから読むので、クッキーの有無で判断する
+        return (
+            request.method not in SAFE_METHODS
+            or settings.SESSION_COOKIE_NAME in request.COOKIES
+            or PRIMARY_COOKIE in request.COOKIES
+        )
+
+
+def record_query(execute, sql, params, many, context):
+    with metrics.measure("db"):
+        return execute(sql, params, many, context)
+
+
+def watch_queries(connection, **kwargs):
+    # 計測中でない時のmetrics.addは何もしないので、接続ごとに一度だけ登録したままにする
+    # 非同期のビューのクエリはsync_to_asyncのスレッドの接続で実行されるので、接続した時にも登録する
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(watch_queries)
+
+
+def server_timing(timings, duration):
+    # ブラウザの開発者ツールで、どの処理に時間がかかったかを確認できる
+    entries = [
+        f'{name};dur={seconds * 1000:.2f};desc="{count} calls"'
+        for name, (seconds, count) in sorted(timings.items())
+    ]
+    entries.append(f"total;dur={duration * 1000:.2f}")
+    return ", ".join(entries)
+
+
+class MetricsMiddleware:
+    # ビューごとの処理時間、クエリの回数と時間、テンプレートとマークダウンの変換時間を記録する
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with metrics.collect() as timings:
+            for connection in connections.all():
+                watch_queries(connection)
+            response = self.get_response(request)
+        self.record(request, response, timings, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with metrics.collect() as timings:
+            response = await self.get_response(request)
+        self.record(request, response, timings, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, timings, duration):
+        match = request.resolver_match
+        view = match.view_name if match else "unresolved"
+        labels = {"view": view}
+        registry = metrics.registry
+        registry.observe("hosnakpub_request_duration_seconds", labels, duration)
+        registry.increment(
+            "hosnakpub_requests_total",
+            {**labels, "method": request.method, "status": response.status_code},
+        )
+        for name, (seconds, count) in timings.items():
+            registry.increment(f"hosnakpub_{name}_seconds_total", labels, seconds)
+            registry.increment(f"hosnakpub_{name}_calls_total", labels, count)
+
+        if settings.SERVER_TIMING:
+            response["Server-Timing"] = server_timing(timings, duration)
+        if metrics.logger.isEnabledFor(logging.INFO):
+            fields = {
+                "view": view,
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "duration_ms": round(duration * 1000, 2),
+            }
+            for name, (seconds, count) in timings.items():
+                fields[f"{name}_ms"] = round(seconds * 1000, 2)
+                fields[f"{name}_calls"] = count
+            metrics.logger.info(json.dumps(fields, ensure_ascii=False))
+
+    def process_template_response(self, request, response):
+        # TemplateResponseはミドルウェアを通った後に描画されるので、描画後に時間を記録する
+        start = time.perf_counter()
+        response.add_post_render_callback(
+            lambda response: metrics.add("template", time.perf_counter() - start)
+        )
+        return response
@@ -0,0 +1,61 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Trueの間は読み込みもプライマリに送る
+_pinned = ContextVar("pinned_to_primary", default=False)
+# 誰かが書き込んだ直後であることを、全てのプロセスに知らせるキー
+RECENT_WRITE_KEY = "db:recent_write"
+
+
+@contextmanager
+def use_primary():
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+def mark_recent_write():
+    # キャッシュを破棄した直後に遅れたレプリカから読むと、古い行が新しいバージョンでキャッシュされる
+    # 書き込んだ閲覧者だけでなく、全てのリクエストの読み込みをしばらくプライマリに送る
+    if settings.DATABASE_REPLICAS:
+        cache.set(RECENT_WRITE_KEY, True, settings.DB_REPLICA_STICKY_SECONDS)
+
+
+def has_recent_write():
+    return cache.get(RECENT_WRITE_KEY, False)
+
+
+async def ahas_recent_write():
+    return await cache.aget(RECENT_WRITE_KEY, False)
+
+
+class ReplicaRouter:
+    # 書き込みはプライマリ、読み込みはDATABASE_REPLICASのいずれかに送る
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS or _pinned.get():
+            return DEFAULT_DB_ALIAS
+        # 取得したインスタンスの関連は、インスタンスと同じデータベースから読む
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        # トランザクションの中では、書き込んだ内容が見えるようプライマリから読む
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # レプリカはプライマリと同じデータを持つ
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
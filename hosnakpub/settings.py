@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 import os
+import tempfile
 from datetime import datetime
 from pathlib import Path
 from uuid import uuid4
@@ -44,12 +45,17 @@ INSTALLED_APPS = [
     "markdownx",
     "accounts.apps.AccountsConfig",
     "articles.apps.ArticlesConfig",
+    "tasks.apps.TasksConfig",
     # NOTE: https://pypi.org/project/django-cleanup/ より、以下は最後に書く
     "django_cleanup.apps.CleanupConfig",
 ]
 
 MIDDLEWARE = [
+    # 他のミドルウェアの処理時間も含めて計測する
+    "hosnakpub.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    # セッションの読み書きより先に、読み込み先のデータベースを決める
+    "hosnakpub.middleware.ReplicaRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -64,36 +70,150 @@ TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [os.path.join(BASE_DIR, "contents", "templates")],
-        "APP_DIRS": True,
         "OPTIONS": {
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "articles.context_processors.fragment_cache",
+            ],
+            # 読み込んだテンプレートをプロセス内に保持する
+            # runserverではテンプレートを変更すると自動で読み込み直される
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                )
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = "hosnakpub.wsgi.application"
+ASGI_APPLICATION = "hosnakpub.asgi.application"
+
+# uvicornのワーカーでASGIとして動かす時はTrueにする。公開ページに非同期のビューを使う
+ASGI = os.environ.get("ASGI") == "True"
 
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# DB_POOL=Trueの時は、gthreadやASGIのスレッド間で接続を共有するプールを使う
+DB_POOL = os.environ.get("DB_POOL") == "True"
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.mysql",
+        "ENGINE": "hosnakpub.db.mysql_pool" if DB_POOL else "django.db.backends.mysql",
         # コンテナ内の環境変数をDATABASESのパラメータに反映
         "NAME": os.environ.get("MYSQL_DATABASE"),
         "USER": os.environ.get("MYSQL_USER"),
         "PASSWORD": os.environ.get("MYSQL_PASSWORD"),
         "HOST": "db",
         "PORT": os.environ.get("MYSQL_PORT"),
+        # リクエストごとに接続し直さないよう、接続を使い回す秒数
+        # プールを使う時は、リクエストが終わるたびに接続をプールへ返す
+        "CONN_MAX_AGE": 0 if DB_POOL else int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+        # 使い回す接続が切れていないかを、リクエストの最初に確かめる
+        "CONN_HEALTH_CHECKS": os.environ.get("DB_CONN_HEALTH_CHECKS", "True") == "True",
+        "POOL_OPTIONS": {
+            "MAX_SIZE": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+            # 接続が空くのを待つ秒数
+            "TIMEOUT": int(os.environ.get("DB_POOL_TIMEOUT", 10)),
+            # この秒数より長く使われていない接続は閉じる
+            "MAX_IDLE": int(os.environ.get("DB_POOL_MAX_IDLE", 300)),
+            # この秒数より長く使われていない接続は、渡す前にpingで確かめる
+            "PING_AFTER": int(os.environ.get("DB_POOL_PING_AFTER", 5)),
+        },
+    }
+}
+
+# 読み込み専用のレプリカ。DB_REPLICA_HOSTSに空白区切りでホスト名を指定する
+# テストではプライマリのテスト用データベースをそのまま使う
+DATABASE_REPLICAS = []
+for number, host in enumerate(os.environ.get("DB_REPLICA_HOSTS", "").split(), 1):
+    DATABASES[f"replica{number}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "TEST": {"MIRROR": "default"},
     }
+    DATABASE_REPLICAS.append(f"replica{number}")
+
+DATABASE_ROUTERS = ["hosnakpub.routers.ReplicaRouter"]
+# 書き込んだ閲覧者の読み込みをプライマリに送る秒数。レプリカの遅延より長くする
+DB_REPLICA_STICKY_SECONDS = int(os.environ.get("DB_REPLICA_STICKY_SECONDS", 5))
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# 環境変数CACHE_BACKENDでキャッシュの保存先を切り替える
+# file, databaseは外部のサービスなしでgunicornのワーカー間で共有できる
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "file")
+# fileの時にキャッシュを書き込むディレクトリ
+# コンテナではappとworkerで共有するボリュームを/cacheにマウントし、ワーカーが破棄したキャッシュをappにも反映させる
+CACHE_DIR = os.environ.get(
+    "CACHE_DIR", os.path.join(tempfile.gettempdir(), "hosnakpub_cache")
+)
+
+CACHE_BACKENDS = {
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", ""),
+    "file": ("django.core.cache.backends.filebased.FileBasedCache", CACHE_DIR),
+    "database": ("django.core.cache.backends.db.DatabaseCache", "hosnakpub_cache"),
+    "redis": ("django.core.cache.backends.redis.RedisCache", "redis://redis:6379/1"),
+    "memcached": (
+        "django.core.cache.backends.memcached.PyMemcacheCache",
+        "memcached:11211",
+    ),
 }
 
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKENDS[CACHE_BACKEND][0],
+        "LOCATION": os.environ.get("CACHE_LOCATION")
+        or CACHE_BACKENDS[CACHE_BACKEND][1],
+        "TIMEOUT": int(os.environ.get("CACHE_TIMEOUT", 60 * 60 * 24)),
+        "KEY_PREFIX": os.environ.get("CACHE_KEY_PREFIX", "hosnakpub"),
+    }
+}
+
+if CACHE_BACKEND in ("locmem", "file", "database"):
+    CACHES["default"]["OPTIONS"] = {
+        "MAX_ENTRIES": int(os.environ.get("CACHE_MAX_ENTRIES", 10000)),
+    }
+
+# 公開ページのキャッシュ
+# 開発中はテンプレートの変更をすぐに確認できるよう無効にする
+PAGE_CACHE_ALIAS = "default"
+PAGE_CACHE_TIMEOUT = int(
+    os.environ.get("PAGE_CACHE_TIMEOUT", 0 if DEBUG else 60 * 10)
+)
+# テンプレートを変更してデプロイした時は値を変えて、キャッシュとETagを作り直させる
+PAGE_VERSION = os.environ.get("PAGE_VERSION", "1")
+# フィードに載せる記事の数と、作ったフィードをキャッシュする秒数
+# フィードは記事が変わった時に作り直すので、キャッシュは長くてよい。0でキャッシュしない
+FEED_ITEMS = int(os.environ.get("FEED_ITEMS", 20))
+FEED_CACHE_TIMEOUT = int(
+    os.environ.get("FEED_CACHE_TIMEOUT", 0 if DEBUG else 60 * 60 * 24)
+)
+# テンプレートの共通部分や局の一覧を断片としてキャッシュする秒数。0でキャッシュしない
+TEMPLATE_FRAGMENT_TIMEOUT = int(
+    os.environ.get("TEMPLATE_FRAGMENT_TIMEOUT", 0 if DEBUG else 60 * 60 * 24)
+)
+# サイトマップの1ファイルに載せるURLの上限(プロトコルの上限は50000)と、キャッシュする秒数
+SITEMAP_LIMIT = int(os.environ.get("SITEMAP_LIMIT", 50000))
+SITEMAP_CACHE_TIMEOUT = int(
+    os.environ.get("SITEMAP_CACHE_TIMEOUT", 0 if DEBUG else 60 * 60 * 24)
+)
+# export_static_siteで公開ページを書き出すディレクトリ。nginxはここにあるページを直接返す
+STATIC_SITE_ROOT = os.environ.get(
+    "STATIC_SITE_ROOT", os.path.join(BASE_DIR, "static_site")
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -131,7 +251,22 @@ USE_TZ = True
 
 STATIC_ROOT = "static/"
 STATIC_URL = "static/"
+# 本番ではハッシュ値つきのファイル名と圧縮済みのファイルを書き出し、nginxで長期間キャッシュさせる
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": (
+            "django.contrib.staticfiles.storage.StaticFilesStorage"
+            if DEBUG
+            else "contents.storage.CompressedManifestStaticFilesStorage"
+        )
+    },
+}
 STATICFILES_DIRS = [os.path.join(BASE_DIR, "contents", "static")]
+# build_cssでコンパイルしたCSSの置き場所。コンテナではイメージのビルド時に/buildに書き出す
+CSS_BUILD_DIR = os.environ.get("CSS_BUILD_DIR", os.path.join(BASE_DIR, "build"))
+if os.path.isdir(os.path.join(CSS_BUILD_DIR, "static")):
+    STATICFILES_DIRS.append(os.path.join(CSS_BUILD_DIR, "static"))
 STATICFILES_FINDERS = [
     "django.contrib.staticfiles.finders.FileSystemFinder",
     "django.contrib.staticfiles.finders.AppDirectoriesFinder",
@@ -140,6 +275,7 @@ STATICFILES_FINDERS = [
 
 SASS_OUTPUT_STYLE = "compressed"
 SASS_PRECISION = 8
+# Trueの時(開発環境)はSCSSを表示する時にコンパイルし、Falseの時はbuild_cssで作ったCSSを使う
 SASS_PROCESSOR_ENABLED = os.environ.get("DEBUG") == "True"
 
 
@@ -152,6 +288,10 @@ AUTH_USER_MODEL = "accounts.HPServiceUser"
 
 CSRF_TRUSTED_ORIGINS = os.environ.get("CSRF_TRUSTED_ORIGINS").split(" ")
 
+# https-portalがhttpsで受けたリクエストも、nginxを経由するとhttpで届く
+# nginxが渡すX-Forwarded-Protoで判断し、サイトマップやフィードの絶対URLをhttpsにする
+SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
+
 MEDIA_URL = "media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
@@ -160,7 +300,68 @@ MARKDOWNX_MEDIA_PATH = datetime.now().strftime("%Y/%m/%d/%H")
 
 MARKDOWNX_MARKDOWN_EXTENSIONS = ["extra", "nl2br", "sane_lists"]
 
+# プレビューも公開ページと同じ変換・サニタイズを通す。入力途中の本文はキャッシュしない
+MARKDOWNX_MARKDOWNIFY_FUNCTION = "contents.utils.markdown_preview"
+
 MARKDOWNX_IMAGE_MAX_SIZE = {
     "size": (1920, 1080),
     "quality": 10,
 }
+
+# アップロードされた画像から作る幅(px)と、本文の画像の表示幅
+# 本文は幅90%、最大800pxなので、高解像度の画面向けに1600pxまで作る
+CONTENT_IMAGE_WIDTHS = (480, 800, 1200, 1600)
+CONTENT_IMAGE_SIZES = "(max-width: 888px) 90vw, 800px"
+
+# 計測
+# Trueの時はレスポンスにServer-Timingのヘッダをつける
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "True") == "True"
+# /metrics/をログインせずに読む時に、Authorization: Bearerで送るトークン
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+# Trueの時はリクエストごとの計測結果を1行のJSONでログに出力する
+METRICS_LOG = os.environ.get("METRICS_LOG", "False") == "True"
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {"message": {"format": "%(message)s"}},
+    "handlers": {
+        "metrics": {"class": "logging.StreamHandler", "formatter": "message"},
+    },
+    "loggers": {
+        "hosnakpub.metrics": {
+            "handlers": ["metrics"],
+            "level": "INFO" if METRICS_LOG else "WARNING",
+            "propagate": False,
+        },
+    },
+}
+
+# タスクキュー
+# Trueの時はキューに入れずにその場で実行し、Falseの時はrun_task_workerで実行する
+# 既定はFalse。テスト用の設定(hosnakpub/test_settings.py)ではその場で実行する
+TASKS_ALWAYS_EAGER = os.environ.get("TASKS_ALWAYS_EAGER", "False") == "True"
+# タスクがない時に、ワーカーが次にキューを確かめるまでの秒数
+TASKS_POLL_INTERVAL = float(os.environ.get("TASKS_POLL_INTERVAL", 1))
+# 実行中のまま止まったタスクを、実行し直すまでの秒数
+TASKS_LOCK_TIMEOUT = 60 * 10
+# ワーカーが定期的にキューに入れるタスクと、その間隔(秒)
+TASKS_SCHEDULE = {
+    "articles.tasks.export_static_site": 60 * 10,
+}
+
+# 管理画面の一括操作で、これより多くの記事を選んだ時はキューに入れてワーカーで実行する
+ADMIN_BULK_QUEUE_THRESHOLD = int(os.environ.get("ADMIN_BULK_QUEUE_THRESHOLD", 1000))
+# 管理画面の記事一覧で数える件数の上限。これを超えるとページ送りはここまでになる
+ADMIN_COUNT_LIMIT = int(os.environ.get("ADMIN_COUNT_LIMIT", 10000))
+
+# マークダウンの変換結果を共有するキャッシュ
+CONTENT_RENDER_CACHE_ALIAS = "default"
+
+# マークダウンの変換結果を保持するプロセス内キャッシュの上限
+CONTENT_RENDER_CACHE_MAX_ENTRIES = int(
+    os.environ.get("CONTENT_RENDER_CACHE_MAX_ENTRIES", 1000)
+)
+CONTENT_RENDER_CACHE_MAX_BYTES = int(
+    os.environ.get("CONTENT_RENDER_CACHE_MAX_BYTES", 32 * 1024 * 1024)
+)
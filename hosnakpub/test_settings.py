@@ -0,0 +1,27 @@
+# テスト用の設定。python manage.py test --settings=hosnakpub.test_settings で使う
+# DEBUGや環境変数の値に関わらず、テストが同じ設定で動くようにする
+from .settings import *  # noqa: F401,F403
+from .settings import STORAGES
+
+# プロセス内のキャッシュを使い、共有のキャッシュやCACHE_DIRに書き込まない
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "hosnakpub-tests",
+    }
+}
+
+# 前のテストでキャッシュしたページを返さないよう無効にする。確かめるテストで上書きする
+PAGE_CACHE_TIMEOUT = 0
+FEED_CACHE_TIMEOUT = 0
+TEMPLATE_FRAGMENT_TIMEOUT = 0
+SITEMAP_CACHE_TIMEOUT = 0
+
+# collectstaticをせずに実行するので、ハッシュ値なしのストレージを使う
+STORAGES = {
+    **STORAGES,
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+# キューを確かめるテストで上書きし、それ以外はその場で実行する
+TASKS_ALWAYS_EAGER = True
@@ -20,11 +20,25 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
+from markdownx.views import ImageUploadView
+
+from contents.forms import ImageForm
+
+from . import views
 
 urlpatterns = [
     path(os.environ.get("ADMIN_URL"), admin.site.urls),
     path("", include("articles.urls")),
+    # アップロードされた画像から幅ごとの画像を作るため、markdownxのフォームを差し替える
+    path(
+        "markdownx/upload/",
+        ImageUploadView.as_view(form_class=ImageForm),
+        name="markdownx_upload",
+    ),
     path("markdownx/", include("markdownx.urls")),
+    path("stats/database/", views.database_stats, name="database_stats"),
+    path("stats/tasks/", views.task_stats, name="task_stats"),
+    path("metrics/", views.prometheus_metrics, name="metrics"),
 ]
 
 if os.environ.get("DEBUG") == "True":
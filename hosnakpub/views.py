@@ -0,0 +1,48 @@
+import os
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.utils.crypto import constant_time_compare
+
+from contents.utils import render_cache
+from hosnakpub import metrics
+from hosnakpub.db import pool
+from tasks import queue
+
+
+@staff_member_required
+def database_stats(request):
+    # 接続プールの値はワーカーのプロセスごとなので、pidも返す
+    return JsonResponse({"pid": os.getpid(), "pools": pool.stats()})
+
+
+@staff_member_required
+def task_stats(request):
+    # 実行した件数はワーカーのプロセスごとなので、このプロセスの値だけになる
+    return JsonResponse({"pid": os.getpid(), "tasks": queue.stats()})
+
+
+def prometheus_metrics(request):
+    # Prometheusからはトークンで、ブラウザからはスタッフでログインして読む
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get("Authorization", "")
+    if not (token and constant_time_compare(authorization, f"Bearer {token}")) and not (
+        request.user.is_active and request.user.is_staff
+    ):
+        return HttpResponseForbidden()
+    # 値はワーカーのプロセスごとなので、どの系列にもpidのラベルをつけて区別する
+    lines = metrics.registry.render()
+    lines += metrics.gauges("hosnakpub_render_cache", [({}, render_cache.stats())])
+    lines += metrics.gauges(
+        "hosnakpub_db_pool",
+        [({"alias": alias}, values) for alias, values in pool.stats().items()],
+    )
+    task_stats = queue.stats()
+    lines += metrics.gauges("hosnakpub_tasks", [({}, task_stats)])
+    lines += metrics.gauges(
+        "hosnakpub_tasks_processed", [({}, task_stats["processed"])]
+    )
+    return HttpResponse(
+        "\n".join(lines) + "\n", content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
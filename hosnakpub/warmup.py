@@ -0,0 +1,29 @@
+from django.db import connections
+from django.template.loader import get_template
+
+from contents import css, sanitizer
+
+# 公開ページで使うテンプレート
+TEMPLATES = [
+    "articles/index.html",
+    "articles/list.html",
+    "articles/detail.html",
+    "articles/bureau.html",
+    "articles/search.html",
+]
+
+
+def warm_up():
+    # 読み込んだテンプレートはローダーにキャッシュされ、プロセス内で共有される
+    for template_name in TEMPLATES:
+        get_template(template_name)
+    # ビルドしたCSSの対応表を読み込んでおく
+    css.load()
+    # MarkdownとCleanerはスレッドごとに作られるので、呼び出したスレッドの分を作る
+    sanitizer.sanitize(sanitizer.markdown_to_html(""))
+    # データベースに接続できることを確かめてから閉じる
+    # このスレッドはリクエストを処理しないので、接続を持ったままにしない
+    # DB_POOL=Trueの時は、閉じた接続がプールに返り、リクエストのスレッドで使われる
+    for conn in connections.all(initialized_only=False):
+        conn.ensure_connection()
+        conn.close()
@@ -0,0 +1,20 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ["name", "status", "attempts", "run_at", "created_at"]
+    list_filter = ["status", "name"]
+    actions = ["retry"]
+
+    @admin.action(description="選択したタスクを実行し直す")
+    def retry(self, request, queryset):
+        queryset.update(
+            status=Task.Status.QUEUED,
+            attempts=0,
+            run_at=timezone.now(),
+            locked_at=None,
+        )
@@ -0,0 +1,42 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.core import checks
+
+LOCMEM_BACKEND = "django.core.cache.backends.locmem.LocMemCache"
+FILE_BACKEND = "django.core.cache.backends.filebased.FileBasedCache"
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    # タスクをワーカーで実行する時は、ワーカーが破棄したキャッシュをアプリからも見えるようにする
+    # 共有されていないと、記事を更新してもアプリは古いページを返し続ける
+    if settings.TASKS_ALWAYS_EAGER:
+        return []
+    messages = []
+    for alias, config in settings.CACHES.items():
+        if config["BACKEND"] == LOCMEM_BACKEND:
+            messages.append(
+                checks.Error(
+                    f"キャッシュ'{alias}'はプロセスごとのメモリに保存するので、"
+                    "ワーカーと共有できません。",
+                    hint="TASKS_ALWAYS_EAGER=Trueにするか、CACHE_BACKENDを変更してください。",
+                    id="tasks.E001",
+                )
+            )
+        elif config["BACKEND"] == FILE_BACKEND and is_temp_dir(config["LOCATION"]):
+            messages.append(
+                checks.Warning(
+                    f"キャッシュ'{alias}'は一時ディレクトリに保存するので、"
+                    "コンテナで動かすとワーカーと共有できません。",
+                    hint="appとworkerで共有するディレクトリをCACHE_DIRに指定してください。",
+                    id="tasks.W001",
+                )
+            )
+    return messages
+
+
+def is_temp_dir(path):
+    temp_dir = os.path.realpath(tempfile.gettempdir())
+    return os.path.commonpath([temp_dir, os.path.realpath(path)]) == temp_dir
@@ -0,0 +1,70 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+
+from hosnakpub.routers import use_primary
+from tasks import queue
+from tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = "キューに入れられたタスクを実行します。"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="実行できるタスクがなくなったら終了します。",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.TASKS_POLL_INTERVAL,
+            help="タスクがない時に、次にキューを確かめるまでの秒数です。",
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        # 実行中のタスクを終えてから止まる
+        handlers = {
+            signum: signal.signal(signum, self.stop)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        try:
+            # 書き込んだばかりのタスクを読むので、レプリカは使わない
+            with use_primary():
+                self.run(options["once"], options["interval"])
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+    def run(self, once, interval):
+        last_run = {}
+        while not self.stopping:
+            self.enqueue_scheduled(last_run)
+            executed = queue.run_pending(limit=100)
+            # 長く動き続けるので、リクエストの区切りの代わりに古い接続を閉じる
+            close_old_connections()
+            if not executed:
+                if once:
+                    break
+                time.sleep(interval)
+
+    def stop(self, signum, frame):
+        self.stopping = True
+
+    def enqueue_scheduled(self, last_run):
+        # TASKS_SCHEDULEのタスクを、指定された秒数ごとにキューに入れる
+        now = time.monotonic()
+        for name, interval in settings.TASKS_SCHEDULE.items():
+            if name in last_run and now - last_run[name] < interval:
+                continue
+            last_run[name] = now
+            # 他のワーカーが入れたタスクが残っていれば入れない
+            pending = Task.objects.filter(name=name).exclude(status=Task.Status.FAILED)
+            if not pending.exists():
+                queue.enqueue(import_string(name))
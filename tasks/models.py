@@ -0,0 +1,37 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    # ワーカーで実行するタスク。成功したタスクは削除し、失敗したタスクは残しておく
+    class Status(models.TextChoices):
+        QUEUED = "queued", "待機中"
+        RUNNING = "running", "実行中"
+        FAILED = "failed", "失敗"
+
+    name = models.CharField(verbose_name="タスク名", max_length=255)
+    args = models.JSONField(verbose_name="引数", default=list)
+    kwargs = models.JSONField(verbose_name="キーワード引数", default=dict)
+    status = models.CharField(
+        verbose_name="状態",
+        max_length=10,
+        choices=Status.choices,
+        default=Status.QUEUED,
+    )
+    attempts = models.PositiveIntegerField(verbose_name="実行回数", default=0)
+    max_attempts = models.PositiveIntegerField(verbose_name="最大実行回数", default=3)
+    run_at = models.DateTimeField(verbose_name="実行予定日時", default=timezone.now)
+    locked_at = models.DateTimeField(verbose_name="実行開始日時", null=True, blank=True)
+    last_error = models.TextField(verbose_name="最後のエラー", blank=True)
+    created_at = models.DateTimeField(verbose_name="作成日時", auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = "タスク"
+        verbose_name_plural = "タスク"
+        # ワーカーが実行予定日時を過ぎたタスクを探す索引
+        indexes = [
+            models.Index(fields=["status", "run_at"], name="task_status_run_at_idx"),
+        ]
@@ -0,0 +1,144 @@
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import F, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+# @taskで登録した関数とその設定。ワーカーは登録された関数だけを実行する
+registry = {}
+
+# このプロセスで実行したタスクの件数
+counters = {"succeeded": 0, "retried": 0, "failed": 0}
+_counters_lock = threading.Lock()
+
+DEFAULT_OPTIONS = {"max_attempts": 3, "retry_delay": 10}
+
+
+def task(func=None, **options):
+    # 失敗した時はretry_delay秒、その2倍、4倍…と待ってから、max_attempts回まで実行する
+    def decorator(func):
+        func.task_name = f"{func.__module__}.{func.__qualname__}"
+        registry[func.task_name] = {**DEFAULT_OPTIONS, **options}
+        return func
+
+    return decorator(func) if func is not None else decorator
+
+
+def enqueue(func, *args, delay=0, **kwargs):
+    # TASKS_ALWAYS_EAGERの時はキューに入れず、その場で実行する
+    # キューに入れる時は呼び出し元のトランザクションの中で保存するので、
+    # ロールバックされたタスクは実行されない
+    if settings.TASKS_ALWAYS_EAGER:
+        return func(*args, **kwargs)
+    return Task.objects.create(
+        name=func.task_name,
+        args=list(args),
+        kwargs=kwargs,
+        max_attempts=registry[func.task_name]["max_attempts"],
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def count(key):
+    with _counters_lock:
+        counters[key] += 1
+
+
+def ready_filter(now):
+    # 実行中のまま止まったタスクも、ロックの期限を過ぎたら実行し直す
+    expired = now - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+    return Q(status=Task.Status.QUEUED, run_at__lte=now) | Q(
+        status=Task.Status.RUNNING, locked_at__lt=expired
+    )
+
+
+def claim():
+    # 実行予定日時を過ぎたタスクを1件取り出して、実行中にする
+    now = timezone.now()
+    ready = ready_filter(now)
+    using = router.db_for_write(Task)
+    queryset = Task.objects.using(using).filter(ready).order_by("run_at", "id")
+    with transaction.atomic(using=using):
+        # 他のワーカーがロックしている行は飛ばす。SQLiteなどでは使えないので、
+        # 下の条件つきの更新だけで取り合いを防ぐ
+        if connections[using].features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        for pk in queryset.values_list("pk", flat=True)[:10]:
+            updated = (
+                Task.objects.using(using)
+                .filter(ready, pk=pk)
+                .update(
+                    status=Task.Status.RUNNING,
+                    locked_at=now,
+                    attempts=F("attempts") + 1,
+                )
+            )
+            if updated:
+                return Task.objects.using(using).get(pk=pk)
+    return None
+
+
+def execute(task_obj):
+    try:
+        # モジュールを読み込むと@taskで登録される
+        func = import_string(task_obj.name)
+        if task_obj.name not in registry:
+            raise LookupError(f"{task_obj.name} is not registered as a task.")
+        func(*task_obj.args, **task_obj.kwargs)
+    except Exception:
+        fail(task_obj, traceback.format_exc())
+        return False
+    Task.objects.filter(pk=task_obj.pk).delete()
+    count("succeeded")
+    return True
+
+
+def fail(task_obj, error):
+    tasks = Task.objects.filter(pk=task_obj.pk)
+    if task_obj.attempts < task_obj.max_attempts:
+        options = registry.get(task_obj.name, DEFAULT_OPTIONS)
+        delay = options["retry_delay"] * 2 ** (task_obj.attempts - 1)
+        tasks.update(
+            status=Task.Status.QUEUED,
+            run_at=timezone.now() + timedelta(seconds=delay),
+            locked_at=None,
+            last_error=error,
+        )
+        count("retried")
+    else:
+        tasks.update(status=Task.Status.FAILED, locked_at=None, last_error=error)
+        count("failed")
+
+
+def run_pending(limit=None):
+    # 実行できるタスクがなくなるまで実行し、実行した件数を返す
+    executed = 0
+    while limit is None or executed < limit:
+        task_obj = claim()
+        if task_obj is None:
+            break
+        execute(task_obj)
+        executed += 1
+    return executed
+
+
+def stats():
+    now = timezone.now()
+    queued = Task.objects.filter(status=Task.Status.QUEUED)
+    oldest = queued.filter(run_at__lte=now).aggregate(oldest=Min("run_at"))["oldest"]
+    with _counters_lock:
+        processed = dict(counters)
+    return {
+        "queued": queued.count(),
+        "running": Task.objects.filter(status=Task.Status.RUNNING).count(),
+        "failed": Task.objects.filter(status=Task.Status.FAILED).count(),
+        # 実行予定日時を過ぎてから待っている秒数
+        "lag": (now - oldest).total_seconds() if oldest else 0,
+        "processed": processed,
+    }
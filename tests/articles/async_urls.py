@@ -0,0 +1,7 @@
+from django.urls import include, path
+
+from articles import async_views
+from articles.urls import public_urlpatterns
+
+# ASGI=Trueの時と同じく、公開ページに非同期のビューを使うURL設定
+urlpatterns = [path("", include((public_urlpatterns(async_views), "articles")))]
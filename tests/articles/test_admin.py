@@ -0,0 +1,115 @@
+from django.contrib.admin import helpers
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from articles import caches
+from articles.factories import ArticleFactory, BureauFactory
+from articles.models import Article, SearchToken
+from tasks import queue
+from tasks.models import Task
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+)
+class ArticleAdminTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser("admin")
+        cls.bureau = BureauFactory(slug="koho")
+        cls.other_bureau = BureauFactory(slug="somu")
+        cls.drafts = ArticleFactory.create_batch(3, title="下書き", bureau=cls.bureau)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.url = reverse("admin:articles_article_changelist")
+
+    def run_action(self, action, articles):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                self.url,
+                {
+                    "action": action,
+                    helpers.ACTION_CHECKBOX_NAME: [article.pk for article in articles],
+                },
+            )
+
+    def run_pending(self):
+        # ワーカーのトランザクションのコミット後に破棄する
+        with self.captureOnCommitCallbacks(execute=True):
+            queue.run_pending()
+
+    def updates(self, queries):
+        return [query for query in queries if query["sql"].startswith("UPDATE")]
+
+    def test_publish_runs_one_update_and_one_invalidation(self):
+        versions = caches.get_tag_versions([caches.ARTICLES_TAG, "bureau:koho"])
+        with CaptureQueriesContext(connection) as queries:
+            self.run_action("publish", self.drafts)
+        self.assertEqual(len(self.updates(queries)), 1)
+        self.assertEqual(Article.objects.published().count(), 3)
+        self.assertTrue(SearchToken.objects.filter(article=self.drafts[0]).exists())
+        self.assertNotEqual(
+            caches.get_tag_versions([caches.ARTICLES_TAG, "bureau:koho"]), versions
+        )
+        self.run_action("unpublish", self.drafts[:2])
+        self.assertEqual(Article.objects.published().count(), 1)
+        self.assertFalse(SearchToken.objects.filter(article=self.drafts[0]).exists())
+
+    def test_moves_articles_to_bureau(self):
+        self.run_action("publish", self.drafts)
+        versions = caches.get_tag_versions(["bureau:somu"])
+        with CaptureQueriesContext(connection) as queries:
+            self.run_action(f"move_to_bureau_{self.other_bureau.pk}", self.drafts)
+        self.assertEqual(len(self.updates(queries)), 1)
+        self.assertEqual(Article.objects.filter(bureau=self.other_bureau).count(), 3)
+        self.assertNotEqual(caches.get_tag_versions(["bureau:somu"]), versions)
+        response = self.client.get(reverse("articles:bureau", kwargs={"slug": "somu"}))
+        self.assertContains(response, "下書き", count=3)
+
+    def test_rerender_keeps_updated_at(self):
+        article = self.drafts[0]
+        Article.objects.filter(pk=article.pk).update(content_html="", content_hash="")
+        self.run_action("rerender", [article])
+        rerendered = Article.objects.get(pk=article.pk)
+        self.assertTrue(rerendered.is_rendered())
+        self.assertEqual(rerendered.updated_at, article.updated_at)
+
+    @override_settings(ADMIN_BULK_QUEUE_THRESHOLD=2, TASKS_ALWAYS_EAGER=False)
+    def test_queues_large_selection(self):
+        versions = caches.get_tag_versions([caches.ARTICLES_TAG, "bureau:koho"])
+        self.run_action("publish", self.drafts)
+        self.assertFalse(Article.objects.published().exists())
+        # 記事はまだ変わっていないので、リクエストではキャッシュを破棄しない
+        self.assertEqual(
+            caches.get_tag_versions([caches.ARTICLES_TAG, "bureau:koho"]), versions
+        )
+        task = Task.objects.get()
+        self.assertEqual(task.args[1], True)
+        self.run_pending()
+        self.assertEqual(Article.objects.published().count(), 3)
+        self.assertNotEqual(
+            caches.get_tag_versions([caches.ARTICLES_TAG, "bureau:koho"]), versions
+        )
+
+    @override_settings(ADMIN_BULK_QUEUE_THRESHOLD=2, TASKS_ALWAYS_EAGER=False)
+    def test_queued_move_invalidates_destination_bureau(self):
+        self.run_action("publish", self.drafts)
+        versions = caches.get_tag_versions(["bureau:somu"])
+        self.run_action(f"move_to_bureau_{self.other_bureau.pk}", self.drafts)
+        self.assertFalse(Article.objects.filter(bureau=self.other_bureau).exists())
+        self.run_pending()
+        self.assertEqual(Article.objects.filter(bureau=self.other_bureau).count(), 3)
+        self.assertNotEqual(caches.get_tag_versions(["bureau:somu"]), versions)
+
+    @override_settings(ADMIN_COUNT_LIMIT=2)
+    def test_caps_result_count(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.context["cl"].result_count, 2)
+        response = self.client.get(self.url, {"is_published__exact": "0"})
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,122 @@
+import freezegun
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from articles import async_views
+from articles.factories import ArticleFactory, BureauFactory
+from articles.pagination import encode_cursor
+
+
+@override_settings(ROOT_URLCONF="tests.articles.async_urls", PAGE_CACHE_TIMEOUT=0)
+class AsyncViewTest(TestCase):
+    @classmethod
+    @freezegun.freeze_time("2023-02-01 01:23:45")
+    def setUpTestData(cls):
+        cls.bureau = BureauFactory(name="広報局")
+        cls.articles = [
+            ArticleFactory(title=f"公開記事{i}", is_published=True, bureau=cls.bureau)
+            for i in range(25)
+        ]
+        cls.draft = ArticleFactory(title="非公開記事", bureau=cls.bureau)
+        cls.staff = get_user_model().objects.create_user(
+            username="Test Staff", password="password", is_staff=True
+        )
+
+    def test_urls_use_async_views(self):
+        response = self.client.get(reverse("articles:index"))
+        self.assertIs(response.resolver_match.func.view_class, async_views.IndexView)
+
+    async def test_index(self):
+        response = await self.async_client.get(reverse("articles:index"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "articles/index.html")
+        self.assertEqual(response.context["new_articles"], self.articles[::-1][:5])
+        self.assertEqual(response.context["bureaus"], [self.bureau])
+
+    async def test_list_paginates_by_cursor(self):
+        response = await self.async_client.get(reverse("articles:list"))
+        self.assertEqual(response.context["articles"], self.articles[::-1][:20])
+        self.assertTrue(response.context["is_paginated"])
+        cursor = encode_cursor(self.articles[5])
+        response = await self.async_client.get(
+            reverse("articles:list"), {"after": cursor}
+        )
+        self.assertEqual(response.context["articles"], self.articles[::-1][20:])
+        response = await self.async_client.get(
+            reverse("articles:list"), {"after": "invalid"}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    async def test_detail(self):
+        article = self.articles[0]
+        response = await self.async_client.get(
+            reverse("articles:detail", kwargs={"article_id": article.id})
+        )
+        self.assertEqual(response.context["article"], article)
+        self.assertContains(response, "広報局")
+
+    async def test_detail_draft_not_found(self):
+        response = await self.async_client.get(
+            reverse("articles:detail", kwargs={"article_id": self.draft.id})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_detail_draft_with_staff(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(
+            reverse("articles:detail", kwargs={"article_id": self.draft.id})
+        )
+        self.assertContains(response, "（下書き）")
+
+    async def test_bureau(self):
+        response = await self.async_client.get(
+            reverse("articles:bureau", kwargs={"slug": self.bureau.slug})
+        )
+        self.assertEqual(response.context["bureau"], self.bureau)
+        self.assertEqual(response.context["articles"], self.articles[::-1])
+        response = await self.async_client.get(
+            reverse("articles:bureau", kwargs={"slug": "missing"})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_same_validators_as_sync_views(self):
+        urls = [
+            reverse("articles:index"),
+            reverse("articles:list"),
+            reverse("articles:detail", kwargs={"article_id": self.articles[0].id}),
+            reverse("articles:bureau", kwargs={"slug": self.bureau.slug}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                with override_settings(ROOT_URLCONF="hosnakpub.urls"):
+                    sync_response = self.client.get(url)
+                self.assertEqual(response["ETag"], sync_response["ETag"])
+                self.assertEqual(
+                    response["Last-Modified"], sync_response["Last-Modified"]
+                )
+                self.assertEqual(
+                    self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response["ETag"]
+                    ).status_code,
+                    304,
+                )
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        },
+        PAGE_CACHE_TIMEOUT=600,
+    )
+    def test_cached_response_does_not_query_database(self):
+        cache.clear()
+        url = reverse("articles:index")
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            cached_response = self.client.get(url)
+        self.assertEqual(cached_response.content, response.content)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,132 @@
+import factory
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from articles.factories import ArticleFactory, BureauFactory
+from articles.models import Article, Bureau
+from articles.pagination import encode_cursor
+from tests.performance import PerformanceBudgetMixin
+
+BODY = (
+    "## 見出し\n\n本文です。**強調**も含みます。\n\n|head|head|\n|----|----|\n|value|value|\n\n"
+    * 20
+)
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0, FEED_CACHE_TIMEOUT=0, SITEMAP_CACHE_TIMEOUT=0)
+class PublicViewBudgetTest(PerformanceBudgetMixin, TestCase):
+    max_seconds = 0.5
+
+    @classmethod
+    def setUpTestData(cls):
+        bureaus = BureauFactory.create_batch(10, content_with_markdown=BODY)
+        ArticleFactory.create_batch(
+            500,
+            title=factory.Sequence(lambda n: f"記事{n}"),
+            content_with_markdown=BODY,
+            bureau=factory.Iterator(bureaus),
+            is_published=factory.Iterator([True, True, True, True, False]),
+        )
+        get_user_model().objects.create_user(
+            username="Test Staff", password="password", is_staff=True
+        )
+
+    def setUp(self):
+        published = Article.objects.published().order_by("-updated_at", "-id")
+        self.article = published.first()
+        self.cursor = encode_cursor(published[100])
+        self.draft = Article.objects.filter(is_published=False).first()
+        self.bureau = Bureau.objects.first()
+
+    def test_index(self):
+        self.assertWithinBudget("index", reverse("articles:index"), 4, self.max_seconds)
+
+    def test_list(self):
+        self.assertWithinBudget("list", reverse("articles:list"), 2, self.max_seconds)
+
+    def test_list_after_cursor(self):
+        self.assertWithinBudget(
+            "list_after_cursor",
+            reverse("articles:list") + f"?after={self.cursor}",
+            2,
+            self.max_seconds,
+        )
+
+    def test_detail(self):
+        self.assertWithinBudget(
+            "detail",
+            reverse("articles:detail", kwargs={"article_id": self.article.id}),
+            2,
+            self.max_seconds,
+        )
+
+    def test_detail_not_found(self):
+        self.assertWithinBudget(
+            "detail_not_found",
+            reverse("articles:detail", kwargs={"article_id": self.draft.id}),
+            2,
+            self.max_seconds,
+            status=404,
+        )
+
+    def test_detail_draft_with_staff(self):
+        self.client.force_login(get_user_model().objects.get(username="Test Staff"))
+        # セッションとユーザーの取得を含む
+        self.assertWithinBudget(
+            "detail_draft_with_staff",
+            reverse("articles:detail", kwargs={"article_id": self.draft.id}),
+            4,
+            self.max_seconds,
+        )
+
+    def test_search(self):
+        # トークンごとの件数、検索結果の件数、検索結果、記事の取得
+        self.assertWithinBudget(
+            "search", reverse("articles:search") + "?q=記事1", 5, self.max_seconds
+        )
+
+    def test_bureau(self):
+        self.assertWithinBudget(
+            "bureau",
+            reverse("articles:bureau", kwargs={"slug": self.bureau.slug}),
+            3,
+            self.max_seconds,
+        )
+
+    def test_feed(self):
+        # 記事と局を1つのクエリで取得する
+        for name in ("rss", "atom"):
+            with self.subTest(name=name):
+                self.assertWithinBudget(
+                    f"feed_{name}", reverse(f"articles:{name}"), 1, self.max_seconds
+                )
+
+    def test_bureau_feed(self):
+        for name in ("bureau_rss", "bureau_atom"):
+            with self.subTest(name=name):
+                self.assertWithinBudget(
+                    f"feed_{name}",
+                    reverse(f"articles:{name}", kwargs={"slug": self.bureau.slug}),
+                    2,
+                    self.max_seconds,
+                )
+
+    def test_sitemap(self):
+        self.assertWithinBudget(
+            "sitemap", reverse("articles:sitemap"), 1, self.max_seconds
+        )
+
+    def test_sitemap_bureaus(self):
+        self.assertWithinBudget(
+            "sitemap_bureaus", reverse("articles:sitemap_bureaus"), 1, self.max_seconds
+        )
+
+    def test_sitemap_articles(self):
+        # 区切りの計算と、そのファイルの記事の取得
+        self.assertWithinBudget(
+            "sitemap_articles",
+            reverse("articles:sitemap_articles", kwargs={"page": 1}),
+            2,
+            self.max_seconds,
+        )
@@ -0,0 +1,149 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from articles import caches
+from articles.factories import ArticleFactory, BureauFactory
+from articles.models import Article, Bureau
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    PAGE_CACHE_TIMEOUT=600,
+)
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.bureau = BureauFactory()
+        cls.article = ArticleFactory(
+            title="公開記事", is_published=True, bureau=cls.bureau
+        )
+        cls.draft = ArticleFactory(title="非公開記事", bureau=cls.bureau)
+        get_user_model().objects.create_user(
+            username="Test Staff", password="password", is_staff=True
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.urls = [
+            reverse("articles:index"),
+            reverse("articles:list"),
+            reverse("articles:detail", kwargs={"article_id": self.article.id}),
+            reverse("articles:bureau", kwargs={"slug": self.bureau.slug}),
+        ]
+
+    def test_cached_response_does_not_query_database(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                with self.assertNumQueries(0):
+                    cached_response = self.client.get(url)
+                self.assertEqual(response.content, cached_response.content)
+
+    def test_does_not_cache_not_found(self):
+        url = reverse("articles:detail", kwargs={"article_id": self.draft.id})
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.draft.is_published = True
+        self.draft.save()
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_evicted_tag_does_not_restore_old_pages(self):
+        tags = [caches.article_tag(self.article.pk)]
+        key = caches.page_cache_key(self.urls[2], tags)
+        caches.bump_tags(tags)
+        bumped_key = caches.page_cache_key(self.urls[2], tags)
+        # キャッシュの上限を超えてタグが消されても、前のどのバージョンにも戻らない
+        cache.delete(f"tag:{tags[0]}")
+        evicted_key = caches.page_cache_key(self.urls[2], tags)
+        self.assertNotIn(evicted_key, (key, bumped_key))
+        self.assertNotEqual(caches.make_page_cache_key(self.urls[2], [0]), evicted_key)
+        self.assertEqual(caches.page_cache_key(self.urls[2], tags), evicted_key)
+
+    def test_tags_expire_after_longest_cache(self):
+        with self.settings(
+            FEED_CACHE_TIMEOUT=3600,
+            SITEMAP_CACHE_TIMEOUT=7200,
+            TEMPLATE_FRAGMENT_TIMEOUT=0,
+        ):
+            self.assertEqual(caches.tag_timeout(), 7200)
+
+    def test_invalidates_pages_when_article_is_updated(self):
+        for url in self.urls:
+            self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.title = "更新した公開記事"
+            self.article.save()
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), "更新した公開記事")
+
+    def test_invalidates_pages_when_article_is_unpublished(self):
+        for url in self.urls:
+            self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.is_published = False
+            self.article.save()
+        self.assertNotContains(self.client.get(self.urls[1]), "公開記事")
+        self.assertNotContains(self.client.get(self.urls[3]), "公開記事")
+        self.assertEqual(self.client.get(self.urls[2]).status_code, 404)
+
+    def test_invalidates_old_bureau_page_when_article_moves(self):
+        other_bureau = BureauFactory(name="別の局", slug="other")
+        self.client.get(self.urls[3])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.bureau = other_bureau
+            self.article.save()
+        self.assertNotContains(self.client.get(self.urls[3]), "公開記事")
+        self.assertContains(
+            self.client.get(
+                reverse("articles:bureau", kwargs={"slug": other_bureau.slug})
+            ),
+            "公開記事",
+        )
+
+    def test_invalidates_pages_when_article_is_deleted(self):
+        self.client.get(self.urls[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            Article.objects.get(pk=self.article.pk).delete()
+        self.assertNotContains(self.client.get(self.urls[1]), "公開記事")
+
+    def test_invalidates_pages_when_bureau_is_updated(self):
+        for url in self.urls:
+            self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bureau.name = "更新した局"
+            self.bureau.save()
+        for url in [self.urls[0], self.urls[2], self.urls[3]]:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), "更新した局")
+
+    def test_invalidates_pages_after_commit(self):
+        tags = [caches.article_tag(self.article.pk), caches.ARTICLES_TAG]
+        versions = caches.get_tag_versions(tags)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.article.title = "更新した公開記事"
+            self.article.save()
+        # コミットするまでは、他のリクエストが古い行を新しいバージョンでキャッシュしないよう破棄しない
+        self.assertEqual(caches.get_tag_versions(tags), versions)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(caches.get_tag_versions(tags), versions)
+
+    def test_keeps_pages_when_draft_is_updated(self):
+        for url in self.urls:
+            self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.draft.title = "更新した非公開記事"
+            self.draft.save()
+        for url in self.urls:
+            with self.subTest(url=url), self.assertNumQueries(0):
+                self.client.get(url)
+
+    def test_does_not_use_cache_for_staff(self):
+        url = reverse("articles:detail", kwargs={"article_id": self.draft.id})
+        self.client.get(self.urls[2])
+        self.client.force_login(get_user_model().objects.get(username="Test Staff"))
+        self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.get(self.urls[2])
+        self.assertIsNotNone(response.context)
@@ -0,0 +1,92 @@
+import freezegun
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from articles.factories import ArticleFactory, BureauFactory
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class ConditionalGetTest(TestCase):
+    @classmethod
+    @freezegun.freeze_time("2023-02-01 01:23:45")
+    def setUpTestData(cls):
+        cls.bureau = BureauFactory()
+        cls.article = ArticleFactory(is_published=True, bureau=cls.bureau)
+        cls.draft = ArticleFactory(bureau=cls.bureau)
+
+    def setUp(self):
+        self.urls = [
+            reverse("articles:index"),
+            reverse("articles:list"),
+            reverse("articles:detail", kwargs={"article_id": self.article.id}),
+            reverse("articles:bureau", kwargs={"slug": self.bureau.slug}),
+        ]
+
+    def test_has_validators(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn("ETag", response)
+                self.assertEqual(
+                    response["Last-Modified"], "Wed, 01 Feb 2023 01:23:45 GMT"
+                )
+
+    def test_not_modified_with_if_none_match(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)["ETag"]
+                with self.assertNumQueries(2 if url == self.urls[0] else 1):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertTemplateNotUsed(response, "base.html")
+
+    def test_not_modified_with_if_modified_since(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE="Wed, 01 Feb 2023 01:23:45 GMT"
+                )
+                self.assertEqual(response.status_code, 304)
+
+    @freezegun.freeze_time("2023-02-01 12:34:56")
+    def test_modified_after_article_is_updated(self):
+        etags = [self.client.get(url)["ETag"] for url in self.urls]
+        self.article.title = "更新した記事"
+        self.article.save()
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response["Last-Modified"], "Wed, 01 Feb 2023 12:34:56 GMT"
+                )
+
+    def test_modified_after_bureau_is_updated(self):
+        url = self.urls[2]
+        etag = self.client.get(url)["ETag"]
+        self.bureau.name = "更新した局"
+        self.bureau.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_draft_is_not_found_without_login(self):
+        response = self.client.get(
+            reverse("articles:detail", kwargs={"article_id": self.draft.id}),
+            HTTP_IF_MODIFIED_SINCE="Wed, 01 Feb 2023 01:23:45 GMT",
+        )
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        },
+        PAGE_CACHE_TIMEOUT=600,
+    )
+    def test_not_modified_from_page_cache_without_queries(self):
+        cache.clear()
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)["ETag"]
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
@@ -0,0 +1,112 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from articles.factories import ArticleFactory, BureauFactory
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    FEED_CACHE_TIMEOUT=600,
+)
+class FeedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.bureau = BureauFactory(name="広報局", slug="koho")
+        cls.other_bureau = BureauFactory(slug="other")
+        cls.article = ArticleFactory(
+            title="公開記事",
+            content_with_markdown="**本文**",
+            is_published=True,
+            bureau=cls.bureau,
+        )
+        ArticleFactory(title="非公開記事", bureau=cls.bureau)
+        ArticleFactory(title="他の局の記事", is_published=True, bureau=cls.other_bureau)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_site_feeds(self):
+        for name, content_type in (
+            ("articles:atom", "application/atom+xml"),
+            ("articles:rss", "application/rss+xml"),
+        ):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name))
+                self.assertTrue(response["Content-Type"].startswith(content_type))
+                body = response.content.decode()
+                self.assertIn("公開記事", body)
+                self.assertIn("他の局の記事", body)
+                self.assertNotIn("非公開記事", body)
+                self.assertIn("&lt;strong&gt;本文&lt;/strong&gt;", body)
+
+    def test_bureau_feeds(self):
+        for name in ("articles:bureau_atom", "articles:bureau_rss"):
+            with self.subTest(name=name):
+                url = reverse(name, kwargs={"slug": "koho"})
+                body = self.client.get(url).content.decode()
+                self.assertIn("広報局", body)
+                self.assertIn("公開記事", body)
+                self.assertNotIn("他の局の記事", body)
+        url = reverse("articles:bureau_atom", kwargs={"slug": "missing"})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_cached_feed_returns_not_modified_without_queries(self):
+        url = reverse("articles:bureau_atom", kwargs={"slug": "koho"})
+        response = self.client.get(url)
+        self.assertTrue(response.has_header("Last-Modified"))
+        with self.assertNumQueries(0):
+            cached_response = self.client.get(url)
+            not_modified = self.client.get(
+                url, headers={"if-none-match": response["ETag"]}
+            )
+        self.assertEqual(cached_response.content, response.content)
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_regenerates_only_feeds_of_changed_article(self):
+        urls = {
+            slug: reverse("articles:bureau_atom", kwargs={"slug": slug})
+            for slug in ("koho", "other")
+        }
+        etags = {slug: self.client.get(url)["ETag"] for slug, url in urls.items()}
+        site_etag = self.client.get(reverse("articles:atom"))["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.title = "更新した記事"
+            self.article.save()
+        response = self.client.get(
+            urls["koho"], headers={"if-none-match": etags["koho"]}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("更新した記事", response.content.decode())
+        response = self.client.get(
+            urls["other"], headers={"if-none-match": etags["other"]}
+        )
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            reverse("articles:atom"), headers={"if-none-match": site_etag}
+        )
+        self.assertIn("更新した記事", response.content.decode())
+
+    def test_pages_link_to_feeds(self):
+        response = self.client.get(reverse("articles:bureau", kwargs={"slug": "koho"}))
+        self.assertContains(response, reverse("articles:atom"))
+        self.assertContains(
+            response, reverse("articles:bureau_atom", kwargs={"slug": "koho"})
+        )
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+    )
+    def test_returns_feed_when_cache_does_not_keep_it(self):
+        response = self.client.get(reverse("articles:atom"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("公開記事", response.content.decode())
+        self.assertIn("ETag", response)
+
+    @override_settings(ALLOWED_HOSTS=["a.example", "b.example"])
+    def test_caches_links_per_host(self):
+        url = reverse("articles:atom")
+        self.client.get(url, HTTP_HOST="a.example")
+        body = self.client.get(url, HTTP_HOST="b.example").content.decode()
+        self.assertIn("http://b.example/", body)
+        self.assertNotIn("a.example", body)
@@ -1,9 +1,13 @@
 from datetime import datetime, timezone
+from io import StringIO
+from unittest import mock
 
 import freezegun
+from django.core.management import call_command
 from django.db import DataError, IntegrityError, transaction
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
+from articles import tasks
 from articles.factories import ArticleFactory, BureauFactory
 from articles.models import Article, Bureau
 
@@ -72,6 +76,48 @@ class ArticleModelTest(TestCase):
         article = ArticleFactory.build(content_with_markdown="<script>main()</script>")
         self.assertNotEqual(article.get_content(), "<script>main()</script>")
 
+    def test_save_stores_rendered_content(self):
+        article = ArticleFactory(content_with_markdown="## 見出し2")
+        article.refresh_from_db()
+        self.assertEqual(article.content_html, "<h2>見出し2</h2>")
+        self.assertNotEqual(article.content_hash, "")
+
+    @override_settings(TASKS_ALWAYS_EAGER=False)
+    def test_render_content_task_saves_rendered_at(self):
+        with freezegun.freeze_time("2023-02-01 12:34:56"):
+            article = ArticleFactory(content_with_markdown="## 見出し2")
+        self.assertIsNone(article.rendered_at)
+        with freezegun.freeze_time("2023-02-02 00:00:00"):
+            tasks.render_content("articles.Article", article.pk)
+        article.refresh_from_db()
+        self.assertEqual(article.content_html, "<h2>見出し2</h2>")
+        self.assertEqual(
+            datetime(2023, 2, 2, 0, 0, 0, tzinfo=timezone.utc), article.rendered_at
+        )
+
+    def test_get_content_uses_stored_content(self):
+        article = Article.objects.get(pk=self.article.pk)
+        with mock.patch("articles.models.markdown_to_content") as markdown_to_content:
+            self.assertEqual(article.get_content(), "<p>テスト用記事</p>")
+        markdown_to_content.assert_not_called()
+
+    def test_update_content_rerenders(self):
+        self.article.content_with_markdown = "**太字**"
+        self.article.save(update_fields=["content_with_markdown"])
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.content_html, "<p><strong>太字</strong></p>")
+
+    def test_update_without_content_change_does_not_rerender(self):
+        with mock.patch("articles.models.markdown_to_content") as markdown_to_content:
+            self.article.title = "テスト記事2"
+            self.article.save()
+        markdown_to_content.assert_not_called()
+
+    def test_get_content_renders_when_renderer_changes(self):
+        with mock.patch("contents.utils.CONTENT_RENDERER_VERSION", -1):
+            self.assertEqual(self.article.get_content(), "<p>テスト用記事</p>")
+            self.assertTrue(self.article.render_content())
+
     def test_valid_article_relates_bureau(self):
         BureauFactory.create()
         article = ArticleFactory.build(bureau=Bureau.objects.first())
@@ -137,3 +183,27 @@ class BureauModelTest(TestCase):
     def test_escape_script_tag_in_content(self):
         bureau = BureauFactory.build(content_with_markdown="<script>main()</script>")
         self.assertNotEqual(bureau.get_content(), "<script>main()</script>")
+
+
+class RenderContentsCommandTest(TestCase):
+    def setUp(self):
+        BureauFactory()
+        ArticleFactory.create_batch(3)
+        Article.objects.update(content_html="", content_hash="")
+
+    def test_render_only_outdated_contents(self):
+        out = StringIO()
+        call_command("render_contents", stdout=out)
+        self.assertIn("記事: 3件", out.getvalue())
+        self.assertIn("局: 0件", out.getvalue())
+        self.assertFalse(Article.objects.filter(content_hash="").exists())
+        self.assertEqual(Article.objects.first().content_html, "<p>テスト用記事</p>")
+
+    @freezegun.freeze_time("2023-02-01 12:34:56")
+    def test_render_with_force_keeps_updated_at(self):
+        updated_at = Bureau.objects.get().updated_at
+        out = StringIO()
+        call_command("render_contents", "--force", "--batch-size", "2", stdout=out)
+        self.assertIn("記事: 3件", out.getvalue())
+        self.assertIn("局: 1件", out.getvalue())
+        self.assertEqual(updated_at, Bureau.objects.get().updated_at)
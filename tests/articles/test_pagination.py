@@ -0,0 +1,85 @@
+import re
+
+import freezegun
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from articles.factories import ArticleFactory
+from articles.models import Article
+from articles.pagination import decode_cursor, encode_cursor
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class ArticleListPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # 同じ更新日時の記事が並ぶ場合も含めて確かめる
+        for hour in range(5):
+            with freezegun.freeze_time(f"2023-02-01 {hour:02}:00:00"):
+                ArticleFactory.create_batch(50, is_published=True)
+                ArticleFactory.create_batch(10)
+        cls.expected = list(
+            Article.objects.filter(is_published=True)
+            .order_by("-updated_at", "-id")
+            .values_list("id", flat=True)
+        )
+
+    def walk(self, url, link):
+        ids = []
+        query_counts = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            for query in queries.captured_queries:
+                self.assertNotIn("OFFSET", query["sql"].upper())
+            query_counts.append(len(queries))
+            ids.append([article.id for article in response.context["articles"]])
+            match = re.search(rf'href="(\?{link}=[0-9-]+)">', response.content.decode())
+            url = reverse("articles:list") + match.group(1) if match else None
+        return ids, query_counts
+
+    def test_walks_all_pages_forward(self):
+        pages, query_counts = self.walk(reverse("articles:list"), "after")
+        self.assertEqual(len(pages), 13)
+        self.assertTrue(all(len(page) == 20 for page in pages[:-1]))
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertEqual(len(set(query_counts)), 1)
+
+    def test_walks_all_pages_backward(self):
+        last = Article.objects.get(pk=self.expected[-1])
+        url = reverse("articles:list") + f"?before={encode_cursor(last)}"
+        pages, _ = self.walk(url, "before")
+        self.assertEqual(sum(reversed(pages), []), self.expected[:-1])
+
+    def test_first_page_has_only_next_link(self):
+        response = self.client.get(reverse("articles:list"))
+        self.assertContains(response, "次のページ")
+        self.assertNotContains(response, "前のページ")
+        self.assertNotContains(response, "最新の記事へ")
+
+    def test_middle_page_has_links(self):
+        article = Article.objects.get(pk=self.expected[99])
+        response = self.client.get(
+            reverse("articles:list") + f"?after={encode_cursor(article)}"
+        )
+        self.assertEqual(response.context["articles"][0].id, self.expected[100])
+        self.assertContains(response, "前のページ")
+        self.assertContains(response, "最新の記事へ")
+        self.assertContains(response, "次のページ")
+
+    def test_invalid_cursor_is_not_found(self):
+        for cursor in ["abc", "1-2-3", "99999999999999999999999-1"]:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(
+                    reverse("articles:list") + f"?after={cursor}"
+                )
+                self.assertEqual(response.status_code, 404)
+
+    def test_cursor_round_trip(self):
+        article = Article.objects.first()
+        self.assertEqual(
+            decode_cursor(encode_cursor(article)), (article.updated_at, article.id)
+        )
@@ -0,0 +1,30 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from articles.models import Article
+
+
+class BenchmarkQueryPlansCommandTest(TestCase):
+    def test_public_queries_use_indexes(self):
+        out = StringIO()
+        call_command("benchmark_query_plans", rows=300, repeat=1, stdout=out)
+        self.assertIn("article_published_updated_idx", out.getvalue())
+        self.assertIn("article_bureau_published_idx", out.getvalue())
+        self.assertIn("searchtoken_article_idx", out.getvalue())
+        self.assertIn("article_updated_idx", out.getvalue())
+        self.assertNotIn("FULL SCAN", out.getvalue())
+
+    def test_rolls_back_seeded_articles(self):
+        call_command("benchmark_query_plans", rows=10, repeat=1, stdout=StringIO())
+        self.assertFalse(Article.objects.exists())
+
+    def test_does_not_touch_shared_cache_or_static_site(self):
+        with mock.patch("articles.bulk.invalidate_articles") as invalidate, mock.patch(
+            "articles.static_site.discard"
+        ) as discard:
+            call_command("benchmark_query_plans", rows=10, repeat=1, stdout=StringIO())
+        invalidate.assert_not_called()
+        discard.assert_not_called()
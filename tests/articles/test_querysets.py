@@ -0,0 +1,72 @@
+import factory
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from articles.factories import ArticleFactory, BureauFactory
+from articles.models import Article
+
+BODY_COLUMNS = ["content_with_markdown", "content_html"]
+
+
+class ArticleQuerySetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        ArticleFactory.create_batch(3, is_published=True)
+        ArticleFactory.create_batch(2)
+
+    def test_published(self):
+        self.assertEqual(Article.objects.published().count(), 3)
+        self.assertFalse(
+            Article.objects.published().filter(is_published=False).exists()
+        )
+
+    def test_summaries_defers_body(self):
+        article = Article.objects.summaries().first()
+        self.assertLessEqual(set(BODY_COLUMNS), article.get_deferred_fields())
+        self.assertNotIn("title", article.get_deferred_fields())
+        self.assertNotIn("updated_at", article.get_deferred_fields())
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class ListViewColumnsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.bureau = BureauFactory()
+        ArticleFactory.create_batch(
+            5,
+            title=factory.Sequence(lambda n: f"公開記事{n}"),
+            content_with_markdown="長い本文" * 1000,
+            is_published=True,
+            bureau=cls.bureau,
+        )
+
+    def assertBodyNotSelected(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, "公開記事")
+        for query in queries.captured_queries:
+            for column in BODY_COLUMNS:
+                self.assertNotIn(column, query["sql"])
+
+    def test_index_does_not_select_body(self):
+        self.assertBodyNotSelected(reverse("articles:index"))
+
+    def test_list_does_not_select_body(self):
+        self.assertBodyNotSelected(reverse("articles:list"))
+
+    def test_bureau_articles_do_not_select_article_body(self):
+        url = reverse("articles:bureau", kwargs={"slug": self.bureau.slug})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, "公開記事")
+        article_queries = [
+            query["sql"]
+            for query in queries.captured_queries
+            if 'FROM "articles_article"' in query["sql"]
+        ]
+        self.assertTrue(article_queries)
+        for sql in article_queries:
+            for column in BODY_COLUMNS:
+                self.assertNotIn(f'"articles_article"."{column}"', sql)
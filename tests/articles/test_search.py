@@ -0,0 +1,190 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from articles import search
+from articles.factories import ArticleFactory
+from articles.models import SearchToken
+
+
+class TokenizeTest(TestCase):
+    def test_tokenize_japanese(self):
+        self.assertEqual(
+            list(search.tokenize("検索機能")), ["検索", "索機", "機能", "能"]
+        )
+
+    def test_tokenize_normalizes_text(self):
+        self.assertEqual(
+            list(search.tokenize("ＡＢｃ ｶﾅ")), ["ab", "bc", "c", "カナ", "ナ"]
+        )
+
+    def test_tokenize_ignores_symbols(self):
+        self.assertEqual(list(search.tokenize("「あ」、！")), ["あ"])
+
+
+class SearchIndexTest(TestCase):
+    def test_index_only_published_articles(self):
+        article = ArticleFactory(title="下書き", is_published=False)
+        self.assertFalse(SearchToken.objects.filter(article=article).exists())
+        article.is_published = True
+        article.save()
+        self.assertTrue(SearchToken.objects.filter(article=article).exists())
+        article.is_published = False
+        article.save()
+        self.assertFalse(SearchToken.objects.filter(article=article).exists())
+
+    def test_update_index_on_save(self):
+        article = ArticleFactory(title="古いタイトル", is_published=True)
+        article.title = "新しい見出し"
+        article.save()
+        self.assertEqual(list(self.search_ids("見出し")), [article.id])
+        self.assertEqual(list(self.search_ids("古い")), [])
+
+    def test_delete_tokens_with_article(self):
+        article = ArticleFactory(is_published=True)
+        article.delete()
+        self.assertFalse(SearchToken.objects.exists())
+
+    def test_search_requires_all_tokens(self):
+        hit = ArticleFactory(title="予算の審議", is_published=True)
+        ArticleFactory(title="予算の報告", is_published=True)
+        self.assertEqual(list(self.search_ids("予算 審議")), [hit.id])
+
+    def test_rank_title_over_content(self):
+        in_content = ArticleFactory(
+            title="お知らせ", content_with_markdown="選挙の結果", is_published=True
+        )
+        in_title = ArticleFactory(title="選挙の結果", is_published=True)
+        self.assertEqual(list(self.search_ids("選挙")), [in_title.id, in_content.id])
+
+    def test_search_single_character(self):
+        hit = ArticleFactory(title="局長", is_published=True)
+        ArticleFactory(title="お知らせ", is_published=True)
+        self.assertEqual(list(self.search_ids("長")), [hit.id])
+
+    def test_search_markdown_as_plain_text(self):
+        hit = ArticleFactory(
+            content_with_markdown="**重要**な*お知らせ*", is_published=True
+        )
+        self.assertEqual(list(self.search_ids("重要なお知らせ")), [hit.id])
+
+    def test_search_without_words(self):
+        ArticleFactory(is_published=True)
+        self.assertEqual(list(self.search_ids("、。！")), [])
+
+    def test_search_does_not_scan_articles(self):
+        ArticleFactory(title="予算の審議", is_published=True)
+        sql = str(search.search("予算").query)
+        self.assertNotIn("LIKE", sql)
+        self.assertNotIn("articles_article", sql)
+
+    def test_limit_candidates_of_common_tokens(self):
+        ArticleFactory.create_batch(5, title="予算の審議", is_published=True)
+        with mock.patch.object(search, "MAX_CANDIDATES", 2), mock.patch.object(
+            search, "MAX_RESULTS", 3
+        ):
+            self.assertEqual(len(self.search_ids("予算の審議")), 3)
+
+    def search_ids(self, query):
+        return search.search(query).values_list("article", flat=True)
+
+
+class HighlightTest(TestCase):
+    def test_highlight_escapes_text(self):
+        self.assertEqual(
+            search.highlight("<b>予算</b>の審議", "予算"),
+            "&lt;b&gt;<mark>予算</mark>&lt;/b&gt;の審議",
+        )
+
+    def test_highlight_ignores_case(self):
+        self.assertEqual(search.highlight("Django", "django"), "<mark>Django</mark>")
+
+    def test_snippet_around_match(self):
+        text = "あ" * 200 + "予算" + "い" * 200
+        result = search.snippet(text, "予算", length=40)
+        self.assertEqual(result, "…" + "あ" * 10 + "予算" + "い" * 28 + "…")
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class SearchViewTest(TestCase):
+    def test_search_view(self):
+        article = ArticleFactory(
+            title="予算の審議",
+            content_with_markdown="来年度の予算を審議しました。",
+            is_published=True,
+        )
+        ArticleFactory(title="予算の審議（下書き）", is_published=False)
+        response = self.client.get(reverse("articles:search"), {"q": "予算"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "articles/search.html")
+        self.assertEqual([r["article"] for r in response.context["results"]], [article])
+        self.assertContains(response, "<mark>予算</mark>の審議")
+        self.assertContains(response, "来年度の<mark>予算</mark>を審議しました。")
+
+    def test_search_view_paginates(self):
+        ArticleFactory.create_batch(25, title="予算", is_published=True)
+        response = self.client.get(reverse("articles:search"), {"q": "予算", "page": 2})
+        self.assertEqual(len(response.context["results"]), 5)
+        self.assertContains(response, "?q=%E4%BA%88%E7%AE%97&page=1")
+
+    def test_search_view_without_query(self):
+        response = self.client.get(reverse("articles:search"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["results"], [])
+        self.assertContains(response, "検索する語句を入力してください。")
+
+    def test_search_view_escapes_query(self):
+        response = self.client.get(reverse("articles:search"), {"q": "<script>"})
+        self.assertNotContains(response, "<script>")
+
+
+@override_settings(
+    PAGE_CACHE_TIMEOUT=60,
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+)
+class SearchViewCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        ArticleFactory(title="予算の審議", is_published=True)
+
+    def is_cached(self, params):
+        # キャッシュから返したレスポンスは描画しないので、コンテキストがない
+        return self.client.get(reverse("articles:search"), params).context is None
+
+    def test_caches_normalized_query(self):
+        self.assertFalse(self.is_cached({"q": "予算"}))
+        self.assertTrue(self.is_cached({"q": " 予算 ", "page": "1", "utm": "x"}))
+
+    def test_does_not_cache_query_without_results(self):
+        self.assertFalse(self.is_cached({"q": "決算"}))
+        self.assertFalse(self.is_cached({"q": "決算"}))
+
+    def test_does_not_cache_long_query(self):
+        query = " ".join(["予算の審議"] * 5)
+        self.assertFalse(self.is_cached({"q": query}))
+        self.assertFalse(self.is_cached({"q": query}))
+
+
+class RebuildSearchIndexCommandTest(TestCase):
+    def test_index_missing_articles(self):
+        article = ArticleFactory(title="予算", is_published=True)
+        SearchToken.objects.all().delete()
+        out = StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn("記事: 1件を索引に登録しました。", out.getvalue())
+        self.assertEqual(
+            list(search.search("予算").values_list("article", flat=True)), [article.id]
+        )
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn("記事: 0件を索引に登録しました。", out.getvalue())
+
+    def test_force_rebuilds_index(self):
+        ArticleFactory.create_batch(3, is_published=True)
+        out = StringIO()
+        call_command("rebuild_search_index", force=True, batch_size=2, stdout=out)
+        self.assertIn("記事: 3件を索引に登録しました。", out.getvalue())
+        self.assertEqual(SearchToken.objects.values("article").distinct().count(), 3)
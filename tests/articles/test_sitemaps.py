@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from freezegun import freeze_time
+
+from articles.factories import ArticleFactory, BureauFactory
+from articles.sitemaps import XMLNS
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    SITEMAP_LIMIT=2,
+    SITEMAP_CACHE_TIMEOUT=600,
+)
+class SitemapTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.bureau = BureauFactory(slug="koho")
+        cls.articles = [
+            ArticleFactory(is_published=True, bureau=cls.bureau) for _ in range(3)
+        ]
+        cls.draft = ArticleFactory(bureau=cls.bureau)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, name, **kwargs):
+        response = self.client.get(reverse(name, kwargs=kwargs))
+        return response, b"".join(response.streaming_content).decode()
+
+    def detail_url(self, article):
+        return "http://testserver" + reverse(
+            "articles:detail", kwargs={"article_id": article.id}
+        )
+
+    def test_index_splits_articles(self):
+        response, body = self.get("articles:sitemap")
+        self.assertEqual(response["Content-Type"], "application/xml; charset=utf-8")
+        self.assertIn("<sitemapindex", body)
+        self.assertIn("<loc>http://testserver/sitemap-bureaus.xml</loc>", body)
+        self.assertIn("<loc>http://testserver/sitemap-articles-1.xml</loc>", body)
+        self.assertIn("<loc>http://testserver/sitemap-articles-2.xml</loc>", body)
+        self.assertNotIn("sitemap-articles-3.xml", body)
+
+    def test_article_sitemaps(self):
+        _, first = self.get("articles:sitemap_articles", page=1)
+        _, second = self.get("articles:sitemap_articles", page=2)
+        for article in self.articles[:2]:
+            self.assertIn(f"<loc>{self.detail_url(article)}</loc>", first)
+        self.assertIn(f"<loc>{self.detail_url(self.articles[2])}</loc>", second)
+        self.assertIn(
+            f"<lastmod>{self.articles[2].updated_at.isoformat(timespec='seconds')}"
+            "</lastmod>",
+            second,
+        )
+        self.assertNotIn(self.detail_url(self.draft), first + second)
+        response = self.client.get(
+            reverse("articles:sitemap_articles", kwargs={"page": 3})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_bureau_sitemap(self):
+        _, body = self.get("articles:sitemap_bureaus")
+        self.assertIn("<loc>http://testserver/bureaus/koho</loc>", body)
+        self.assertIn("<loc>http://testserver/articles/</loc>", body)
+
+    def test_uses_https_behind_proxy(self):
+        response = self.client.get(
+            reverse("articles:sitemap"),
+            HTTP_HOST="testserver",
+            HTTP_X_FORWARDED_PROTO="https",
+        )
+        body = response.getvalue().decode()
+        self.assertIn("<loc>https://testserver/sitemap-bureaus.xml</loc>", body)
+        self.assertNotIn("http://", body.replace(XMLNS, ""))
+
+    @override_settings(ALLOWED_HOSTS=["a.example", "b.example"])
+    def test_caches_each_host_separately(self):
+        url = reverse("articles:sitemap_bureaus")
+        self.client.get(url, HTTP_HOST="a.example").getvalue()
+        body = self.client.get(url, HTTP_HOST="b.example").getvalue().decode()
+        self.assertIn("<loc>http://b.example/bureaus/koho</loc>", body)
+        self.assertNotIn("a.example", body)
+
+    def test_cached_sitemap_does_not_query_database(self):
+        _, body = self.get("articles:sitemap_articles", page=1)
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                reverse("articles:sitemap_articles", kwargs={"page": 1})
+            )
+        self.assertEqual(response.content.decode(), body)
+
+    def test_regenerates_when_article_is_published(self):
+        _, index = self.get("articles:sitemap")
+        self.get("articles:sitemap_articles", page=2)
+        self.draft.is_published = True
+        with self.captureOnCommitCallbacks(execute=True):
+            with freeze_time(timezone.now() + timedelta(hours=1)):
+                self.draft.save()
+        _, body = self.get("articles:sitemap")
+        # 2つ目のファイルの最終更新日時が変わる
+        self.assertNotEqual(body, index)
+        _, body = self.get("articles:sitemap_articles", page=2)
+        self.assertIn(self.detail_url(self.draft), body)
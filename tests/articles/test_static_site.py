@@ -0,0 +1,137 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from articles import static_site
+from articles.factories import ArticleFactory, BureauFactory
+
+
+class StaticSiteTest(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.root = temp_dir.name
+        settings_override = override_settings(
+            STATIC_SITE_ROOT=self.root, PAGE_CACHE_TIMEOUT=0
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.bureau = BureauFactory(name="広報局", slug="koho")
+        self.article = ArticleFactory(
+            title="公開記事", bureau=self.bureau, is_published=True
+        )
+        self.draft = ArticleFactory(title="下書き", bureau=self.bureau)
+
+    def export(self, **options):
+        out = StringIO()
+        call_command("export_static_site", stdout=out, **options)
+        return out.getvalue()
+
+    def read(self, path):
+        with open(os.path.join(self.root, path), encoding="utf-8") as f:
+            return f.read()
+
+    def exists(self, path):
+        return os.path.exists(os.path.join(self.root, path))
+
+    def test_page_file(self):
+        self.assertEqual(static_site.page_file("/"), f"{self.root}/index.html")
+        self.assertEqual(
+            static_site.page_file("/articles/"), f"{self.root}/articles/index.html"
+        )
+        self.assertEqual(
+            static_site.page_file("/articles/1"), f"{self.root}/articles/1.html"
+        )
+
+    def test_export_public_pages(self):
+        self.assertIn("4件を書き出し、0件を削除しました。", self.export())
+        self.assertIn("公開記事", self.read("index.html"))
+        self.assertIn("公開記事", self.read("articles/index.html"))
+        self.assertIn("広報局", self.read(f"articles/{self.article.id}.html"))
+        self.assertIn("公開記事", self.read("bureaus/koho.html"))
+        self.assertFalse(self.exists(f"articles/{self.draft.id}.html"))
+
+    @override_settings(ROOT_URLCONF="tests.articles.async_urls")
+    def test_export_with_async_views(self):
+        # ASGI=Trueの時は公開ページのURLが非同期のビューを指している
+        self.assertIn("4件を書き出し、0件を削除しました。", self.export())
+        self.assertIn("公開記事", self.read("bureaus/koho.html"))
+
+    def test_export_only_changed_pages(self):
+        self.export()
+        self.assertIn("0件を書き出し", self.export())
+        self.article.title = "更新した記事"
+        self.article.save()
+        # 記事のページと、記事を表示している一覧、トップ、局のページだけを書き出す
+        self.assertIn("4件を書き出し", self.export())
+        self.draft.content_with_markdown = "下書きの更新"
+        self.draft.save()
+        self.assertIn("0件を書き出し", self.export())
+        self.assertIn("更新した記事", self.read(f"articles/{self.article.id}.html"))
+
+    def test_export_unchanged_other_articles(self):
+        other = ArticleFactory(title="別の記事", is_published=True)
+        self.export()
+        other.title = "別の記事の更新"
+        other.save()
+        self.export()
+        manifest = json.loads(self.read(static_site.MANIFEST_NAME))
+        self.assertIn(f"/articles/{self.article.id}", manifest["pages"])
+        self.assertIn("別の記事の更新", self.read(f"articles/{other.id}.html"))
+
+    def test_remove_unpublished_pages(self):
+        self.export()
+        self.article.is_published = False
+        self.article.save()
+        self.assertIn("1件を削除しました。", self.export())
+        self.assertFalse(self.exists(f"articles/{self.article.id}.html"))
+        self.assertNotIn("公開記事", self.read("articles/index.html"))
+
+    def test_discard_pages_on_save(self):
+        self.export()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.title = "更新した記事"
+            self.article.save()
+        for path in [
+            "index.html",
+            "articles/index.html",
+            f"articles/{self.article.id}.html",
+            "bureaus/koho.html",
+        ]:
+            self.assertFalse(self.exists(path), path)
+
+    def test_discard_pages_on_bureau_save(self):
+        other = ArticleFactory(is_published=True)
+        self.export()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bureau.name = "報道局"
+            self.bureau.save()
+        self.assertFalse(self.exists("index.html"))
+        self.assertFalse(self.exists("bureaus/koho.html"))
+        self.assertFalse(self.exists(f"articles/{self.article.id}.html"))
+        self.assertTrue(self.exists(f"articles/{other.id}.html"))
+        self.assertTrue(self.exists("articles/index.html"))
+
+    def test_rewrite_missing_pages(self):
+        self.export()
+        os.remove(os.path.join(self.root, "index.html"))
+        self.assertIn("1件を書き出し", self.export())
+        self.assertTrue(self.exists("index.html"))
+
+    def test_rewrite_all_pages_on_page_version_change(self):
+        self.export()
+        with override_settings(PAGE_VERSION="2"):
+            self.assertIn("4件を書き出し", self.export())
+        self.assertIn("4件を書き出し", self.export(force=True))
+
+    def test_rewrite_all_pages_on_static_files_change(self):
+        self.export()
+        with mock.patch.object(
+            static_site.staticfiles_storage, "manifest_hash", "new", create=True
+        ):
+            self.assertIn("4件を書き出し", self.export())
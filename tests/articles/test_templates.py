@@ -0,0 +1,80 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.template import engines
+from django.template.loaders.cached import Loader
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from articles.factories import BureauFactory
+
+
+class TemplateLoaderTest(TestCase):
+    def test_uses_cached_loader(self):
+        (loader,) = engines["django"].engine.template_loaders
+        self.assertIsInstance(loader, Loader)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    PAGE_CACHE_TIMEOUT=0,
+    TEMPLATE_FRAGMENT_TIMEOUT=600,
+)
+class FragmentCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.bureau = BureauFactory(name="広報局")
+
+    def test_caches_bureau_list_until_bureau_is_saved(self):
+        url = reverse("articles:index")
+        self.assertContains(self.client.get(url), "広報局")
+        # 局の一覧を読み込むクエリを実行しない
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse(
+            any('"articles_bureau"."name"' in query["sql"] for query in queries)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bureau.name = "総務局"
+            self.bureau.save()
+        response = self.client.get(url)
+        self.assertContains(response, "総務局")
+        self.assertNotContains(response, "広報局")
+
+    def test_caches_chrome(self):
+        url = reverse("articles:list")
+        response = self.client.get(url)
+        self.assertContains(response, reverse("articles:atom"))
+        self.assertContains(response, "Hoshinonaka/Snak")
+        self.assertEqual(self.client.get(url).content, response.content)
+        self.assertTrue(
+            any("template.cache.chrome_footer" in key for key in cache._cache)
+        )
+
+
+class BenchmarkTemplatesCommandTest(TestCase):
+    def test_reports_template_time(self):
+        out = StringIO()
+        call_command("benchmark_templates", repeat=1, bureaus=1, stdout=out)
+        output = out.getvalue()
+        self.assertIn("before:", output)
+        self.assertIn("after:", output)
+        self.assertIn(f"{reverse('articles:index')}: ", output)
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_does_not_touch_shared_cache_or_static_site(self):
+        cache.clear()
+        with mock.patch("articles.bulk.invalidate_articles") as invalidate, mock.patch(
+            "articles.static_site.discard"
+        ) as discard:
+            call_command("benchmark_templates", repeat=1, bureaus=1, stdout=StringIO())
+        invalidate.assert_not_called()
+        discard.assert_not_called()
+        # ページや断片、タグのバージョンは一時的なキャッシュに保存する
+        self.assertFalse(cache._cache)
@@ -64,7 +64,9 @@ class IndexViewTest(TestCase):
         self.assertEqual(self.response.context["new_articles"].count(), 5)
         self.assertQuerysetEqual(
             self.response.context["new_articles"],
-            Article.objects.filter(is_published=True).order_by("-updated_at")[:5],
+            Article.objects.filter(is_published=True).order_by("-updated_at", "-id")[
+                :5
+            ],
         )
 
     def test_has_link_to_article_detail(self):
@@ -137,13 +139,14 @@ class ArticleListViewTest(TestCase):
 
     def test_has_all_published_articles_in_order_of_new_updated(self):
         self.assertEqual(
-            self.response.context["articles"].count(),
+            len(self.response.context["articles"]),
             Article.objects.filter(is_published=True).count(),
         )
         self.assertQuerysetEqual(
             self.response.context["articles"],
-            Article.objects.filter(is_published=True).order_by("-updated_at"),
+            Article.objects.filter(is_published=True).order_by("-updated_at", "-id"),
         )
+        self.assertNotContains(self.response, 'class="pagination"')
 
     def test_has_link_to_article_detail(self):
         self.assertContains(
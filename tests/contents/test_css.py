@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from articles.factories import ArticleFactory
+from contents import css
+
+
+class CssTestCase(SimpleTestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        settings_override = override_settings(
+            CSS_BUILD_DIR=temp_dir.name, SASS_PROCESSOR_ENABLED=False
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        css.load.cache_clear()
+        self.addCleanup(css.load.cache_clear)
+        self.build_dir = temp_dir.name
+
+
+class BuildCssTest(CssTestCase):
+    def test_writes_fingerprinted_css_and_manifest(self):
+        out = StringIO()
+        call_command("build_css", stdout=out)
+        with open(os.path.join(self.build_dir, css.MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        self.assertEqual(
+            sorted(manifest),
+            [
+                "css/articles/detail.critical.scss",
+                "css/articles/detail.scss",
+                "css/base.scss",
+            ],
+        )
+        self.assertRegex(manifest["css/base.scss"], r"^css/base\.[0-9a-f]{12}\.css$")
+        with open(os.path.join(css.static_dir(), manifest["css/base.scss"])) as f:
+            self.assertIn(".headerNavigation", f.read())
+        self.assertIn("3件", out.getvalue())
+
+
+class CssTagsTest(CssTestCase):
+    def render(self, source):
+        return Template("{% load css_tags %}" + source).render(Context())
+
+    def test_resolves_urls_from_manifest_without_compiling(self):
+        css.build()
+        with mock.patch.object(css, "compile_file") as compile_file:
+            url = self.render("{% css_src 'css/base.scss' %}")
+            inline = self.render("{% inline_css 'css/articles/detail.critical.scss' %}")
+        compile_file.assert_not_called()
+        self.assertRegex(url, r"^/static/css/base\.[0-9a-f]{12}\.css$")
+        self.assertIn(".headerNavigation", inline)
+
+    def test_compiles_when_not_built(self):
+        self.assertIn(
+            ".headerNavigation",
+            self.render("{% inline_css 'css/articles/detail.critical.scss' %}"),
+        )
+        self.assertEqual(
+            self.render("{% css_src 'css/base.scss' %}"), "/static/css/base.css"
+        )
+
+
+class DetailCriticalCssTest(CssTestCase, TestCase):
+    def test_inlines_critical_css(self):
+        css.build()
+        article = ArticleFactory(is_published=True)
+        response = self.client.get(
+            reverse("articles:detail", kwargs={"article_id": article.id})
+        )
+        self.assertContains(response, "<style>")
+        self.assertContains(response, 'rel="preload"', count=2)
+        self.assertContains(response, css.load()["css/base.scss"]["url"])
@@ -0,0 +1,196 @@
+import json
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from articles.factories import ArticleFactory
+from articles.models import Article
+from contents import images, utils
+from contents.utils import markdown_to_content
+from tasks import queue
+from tasks.models import Task
+
+
+def make_image(width, height, image_format="JPEG"):
+    output = BytesIO()
+    Image.new("RGB", (width, height), "orange").save(output, image_format)
+    return output.getvalue()
+
+
+class ImagesTestCase(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        settings_override = override_settings(
+            MEDIA_ROOT=temp_dir.name, CONTENT_IMAGE_WIDTHS=(480, 800)
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+        utils.render_cache.clear()
+
+    def upload(self, name, content):
+        return default_storage.save(name, ContentFile(content))
+
+
+class BuildVariantsTest(ImagesTestCase):
+    def test_builds_smaller_widths_and_modern_formats(self):
+        name = self.upload("2023/photo.jpg", make_image(1000, 500))
+        info = images.build_variants(name)
+        self.assertEqual(info["widths"], [480, 800])
+        self.assertEqual(info["formats"], images.modern_formats())
+        for width in (480, 800):
+            for image_format in ["JPEG", *info["formats"]]:
+                variant = images.variant_name(name, width, image_format)
+                with default_storage.open(variant) as f, Image.open(f) as image:
+                    self.assertEqual(image.size, (width, width // 2))
+                    self.assertEqual(image.format, image_format)
+        for image_format in info["formats"]:
+            variant = images.variant_name(name, 1000, image_format)
+            self.assertTrue(default_storage.exists(variant))
+        self.assertEqual(images.load_info(name), info)
+
+    def test_small_image_only_gets_modern_formats(self):
+        name = self.upload("2023/icon.png", make_image(300, 300, "PNG"))
+        info = images.build_variants(name)
+        self.assertEqual(info["widths"], [])
+        self.assertFalse(default_storage.exists("2023/icon.480w.png"))
+
+    def test_unreadable_image_is_recorded(self):
+        name = self.upload("2023/broken.jpg", b"not an image")
+        info = images.build_variants(name)
+        self.assertIsNone(info["width"])
+        self.assertEqual(images.load_info(name), info)
+
+
+class ResponsiveImagesTest(ImagesTestCase):
+    def test_rewrites_uploaded_image_to_picture(self):
+        name = self.upload("2023/photo.jpg", make_image(1000, 500))
+        images.build_variants(name)
+        html, pending = images.responsive_images(
+            '<p><img alt="写真" src="/media/2023/photo.jpg"></p>'
+        )
+        self.assertFalse(pending)
+        self.assertTrue(html.startswith("<p><picture>"))
+        self.assertIn(
+            'srcset="/media/2023/photo.480w.jpg 480w, /media/2023/photo.800w.jpg 800w,'
+            ' /media/2023/photo.jpg 1000w"',
+            html,
+        )
+        self.assertIn('sizes="(max-width: 888px) 90vw, 800px"', html)
+        self.assertIn('loading="lazy"', html)
+        self.assertIn('width="1000" height="500"', html)
+        for image_format in images.modern_formats():
+            extension = images.EXTENSIONS[image_format]
+            self.assertIn(
+                f'<source type="{images.MODERN_FORMATS[image_format]}" '
+                f'srcset="/media/2023/photo.480w.{extension} 480w',
+                html,
+            )
+
+    def test_external_image_is_only_lazy_loaded(self):
+        html, pending = images.responsive_images(
+            '<img alt="" src="https://example.com/a.jpg">'
+        )
+        self.assertFalse(pending)
+        self.assertEqual(
+            html,
+            '<img alt="" src="https://example.com/a.jpg" loading="lazy"'
+            ' decoding="async">',
+        )
+
+    def test_does_not_cache_content_while_variants_are_pending(self):
+        name = self.upload("2023/photo.jpg", make_image(1000, 500))
+        markdown_text = f"![写真](/media/{name})"
+        self.assertNotIn("<picture>", markdown_to_content(markdown_text))
+        self.assertEqual(utils.render_cache.stats()["entries"], 0)
+        images.build_variants(name)
+        self.assertIn("<picture>", markdown_to_content(markdown_text))
+        self.assertEqual(utils.render_cache.stats()["entries"], 1)
+
+    def test_rerenders_article_when_variants_are_ready(self):
+        name = self.upload("2023/photo.jpg", make_image(1000, 500))
+        article = ArticleFactory(content_with_markdown=f"![写真](/media/{name})")
+        self.assertNotIn("<picture>", article.content_html)
+        images.build_variants(name)
+        rerendered = Article.objects.get(pk=article.pk)
+        self.assertIn("<picture>", rerendered.content_html)
+        self.assertEqual(rerendered.updated_at, article.updated_at)
+        self.assertGreater(rerendered.rendered_at, article.rendered_at)
+
+    def test_finds_contents_from_image_references(self):
+        name = self.upload("2023/photo.jpg", make_image(1000, 500))
+        article = ArticleFactory(content_with_markdown=f"![写真](/media/{name})")
+        ArticleFactory(content_with_markdown="画像なし")
+        self.assertEqual(list(article.images.values_list("name", flat=True)), [name])
+        with CaptureQueriesContext(connection) as queries:
+            images.build_variants(name)
+        # 本文を検索せず、記録した画像の索引から変換し直す記事を探す
+        self.assertFalse(any("LIKE" in query["sql"] for query in queries))
+        article.content_with_markdown = "画像を消した"
+        article.save()
+        self.assertFalse(article.images.exists())
+
+    def test_rerender_changes_etag_of_detail_page(self):
+        name = self.upload("2023/photo.jpg", make_image(1000, 500))
+        article = ArticleFactory(
+            is_published=True, content_with_markdown=f"![写真](/media/{name})"
+        )
+        url = reverse("articles:detail", kwargs={"article_id": article.pk})
+        etag = self.client.get(url)["ETag"]
+        images.build_variants(name)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "<picture>")
+
+
+class ImageUploadTest(ImagesTestCase):
+    def upload_image(self):
+        upload = SimpleUploadedFile(
+            "photo.jpg", make_image(1000, 500), content_type="image/jpeg"
+        )
+        response = self.client.post(
+            "/markdownx/upload/",
+            {"image": upload},
+            headers={"x-requested-with": "XMLHttpRequest"},
+        )
+        return images.media_name(json.loads(response.content)["image_code"][4:-1])
+
+    def test_builds_variants_after_upload(self):
+        name = self.upload_image()
+        self.assertEqual(images.load_info(name)["widths"], [480, 800])
+
+    @override_settings(TASKS_ALWAYS_EAGER=False)
+    def test_enqueues_variants_after_upload(self):
+        name = self.upload_image()
+        self.assertIsNone(images.load_info(name))
+        task = Task.objects.get()
+        self.assertEqual(
+            (task.name, task.args), (images.build_variants.task_name, [name])
+        )
+        queue.run_pending()
+        self.assertEqual(images.load_info(name)["widths"], [480, 800])
+
+
+class BuildImageVariantsCommandTest(ImagesTestCase):
+    def build(self, **options):
+        out = StringIO()
+        call_command("build_image_variants", stdout=out, **options)
+        return out.getvalue()
+
+    def test_builds_only_missing_variants(self):
+        self.upload("2023/a.jpg", make_image(1000, 500))
+        self.upload("2023/b.png", make_image(600, 300, "PNG"))
+        self.assertIn("2件", self.build())
+        self.assertIn("0件", self.build())
+        self.assertIn("2件", self.build(force=True))
@@ -0,0 +1,81 @@
+import gc
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bleach_allowlist import markdown_attrs, markdown_tags
+from django.test import SimpleTestCase, tag
+
+from contents import sanitizer
+from contents.utils import markdown_to_content
+
+TABLE_MARKDOWN = "|head|head|\n|----|----|\n|value|value|"
+TABLE_HTML = "<table>\n<thead>\n<tr>\n<th>head</th>\n<th>head</th>\n</tr>\n</thead>\n<tbody>\n<tr>\n<td>value</td>\n<td>value</td>\n</tr>\n</tbody>\n</table>"
+
+
+class SanitizerTest(SimpleTestCase):
+    def test_does_not_modify_bleach_allowlist(self):
+        tags = list(markdown_tags)
+        attrs = {tag: list(values) for tag, values in markdown_attrs.items()}
+        for _ in range(3):
+            markdown_to_content(TABLE_MARKDOWN)
+        self.assertEqual(tags, markdown_tags)
+        self.assertEqual(attrs, markdown_attrs)
+
+    def test_policy_is_frozen(self):
+        with self.assertRaises(TypeError):
+            sanitizer.ALLOWED_ATTRIBUTES["script"] = ("src",)
+        with self.assertRaises(AttributeError):
+            sanitizer.ALLOWED_TAGS.add("script")
+
+    def test_reuses_instances_in_same_thread(self):
+        markdown_to_content("テスト")
+        markdown = sanitizer._get_markdown()
+        cleaner = sanitizer._get_cleaner()
+        markdown_to_content("テスト")
+        self.assertIs(markdown, sanitizer._get_markdown())
+        self.assertIs(cleaner, sanitizer._get_cleaner())
+
+    def test_markdown_state_does_not_leak_between_renders(self):
+        self.assertEqual(markdown_to_content("脚注[^1]\n\n[^1]: 注釈").count("注釈"), 1)
+        self.assertNotIn("注釈", markdown_to_content("本文"))
+
+    def test_renders_same_result_in_threads(self):
+        sources = [f"## 見出し{n}\n\n{TABLE_MARKDOWN}" for n in range(200)]
+        expected = [markdown_to_content(source) for source in sources]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(markdown_to_content, sources))
+        self.assertEqual(expected, results)
+
+
+def render(markdown_text):
+    return sanitizer.sanitize(sanitizer.markdown_to_html(markdown_text))
+
+
+@tag("slow")
+class SanitizerRegressionTest(SimpleTestCase):
+    renders = 100_000
+    sample = 1_000
+
+    def measure(self):
+        durations = []
+        for _ in range(self.sample):
+            start = time.perf_counter()
+            render(TABLE_MARKDOWN)
+            durations.append(time.perf_counter() - start)
+        return statistics.median(durations)
+
+    def test_memory_and_latency_stay_flat(self):
+        self.assertEqual(render(TABLE_MARKDOWN), TABLE_HTML)
+        gc.collect()
+        objects_before = len(gc.get_objects())
+        latency_before = self.measure()
+        for n in range(self.renders):
+            render(f"**{n}**")
+        latency_after = self.measure()
+        gc.collect()
+        objects_after = len(gc.get_objects())
+
+        self.assertEqual(render(TABLE_MARKDOWN), TABLE_HTML)
+        self.assertLess(objects_after - objects_before, 1_000)
+        self.assertLess(latency_after, latency_before * 2)
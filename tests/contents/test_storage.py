@@ -0,0 +1,85 @@
+import gzip
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from contents import storage
+
+CSS = "body { color: #333; }\n" * 100
+
+
+class CompressedManifestStaticFilesStorageTest(SimpleTestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source)
+        self.addCleanup(shutil.rmtree, self.root)
+        self.write("css/base.css", CSS.encode())
+        self.write("css/small.css", b"a{}")
+        self.write("image/logo.png", os.urandom(1024))
+        settings = override_settings(
+            STATIC_ROOT=self.root,
+            STATICFILES_DIRS=[self.source],
+            STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+            STORAGES={
+                "staticfiles": {
+                    "BACKEND": "contents.storage.CompressedManifestStaticFilesStorage"
+                },
+            },
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def write(self, name, content):
+        path = os.path.join(self.source, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+
+    def collectstatic(self):
+        call_command("collectstatic", interactive=False, stdout=StringIO())
+        staticfiles_storage._setup()
+
+    def test_writes_hashed_and_compressed_files(self):
+        self.collectstatic()
+        name = staticfiles_storage.stored_name("css/base.css")
+        self.assertRegex(name, r"^css/base\.[0-9a-f]{12}\.css$")
+        self.assertEqual(staticfiles_storage.url("css/base.css"), f"/static/{name}")
+        with open(staticfiles_storage.path(name) + ".gz", "rb") as f:
+            self.assertEqual(gzip.decompress(f.read()).decode(), CSS)
+
+    def test_skips_small_and_already_compressed_files(self):
+        self.collectstatic()
+        for name in ("css/small.css", "image/logo.png"):
+            path = staticfiles_storage.path(staticfiles_storage.stored_name(name))
+            self.assertFalse(os.path.exists(path + ".gz"))
+
+    def test_does_not_rewrite_existing_compressed_files(self):
+        self.collectstatic()
+        name = staticfiles_storage.stored_name("css/base.css")
+        with mock.patch.object(storage, "write_file") as write_file:
+            self.collectstatic()
+        write_file.assert_not_called()
+        self.assertEqual(staticfiles_storage.stored_name("css/base.css"), name)
+
+    def test_writes_brotli_files_when_available(self):
+        fake_brotli = mock.Mock()
+        fake_brotli.compress.return_value = b"br"
+        with mock.patch.object(storage, "brotli", fake_brotli):
+            self.collectstatic()
+        path = staticfiles_storage.path(staticfiles_storage.stored_name("css/base.css"))
+        with open(path + ".br", "rb") as f:
+            self.assertEqual(f.read(), b"br")
+
+    def test_skips_brotli_files_without_module(self):
+        with mock.patch.object(storage, "brotli", None):
+            self.collectstatic()
+        path = staticfiles_storage.path(staticfiles_storage.stored_name("css/base.css"))
+        self.assertTrue(os.path.exists(path + ".gz"))
+        self.assertFalse(os.path.exists(path + ".br"))
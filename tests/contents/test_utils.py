@@ -0,0 +1,100 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from contents import utils
+from contents.utils import RenderCache, markdown_to_content
+
+
+class RenderCacheTest(SimpleTestCase):
+    def test_evicts_least_recently_used_entry(self):
+        cache = RenderCache(max_entries=2, max_bytes=1024 * 1024)
+        cache.set("a", "A")
+        cache.set("b", "B")
+        self.assertEqual(cache.get("a"), "A")
+        cache.set("c", "C")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "A")
+        self.assertEqual(cache.get("c"), "C")
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_evicts_by_total_bytes(self):
+        value = "あ" * 100
+        cache = RenderCache(max_entries=100, max_bytes=utils.sys.getsizeof(value) * 2)
+        for key in "abc":
+            cache.set(key, value)
+        stats = cache.stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["evictions"], 1)
+        self.assertLessEqual(stats["bytes"], stats["max_bytes"])
+
+    def test_does_not_store_value_larger_than_max_bytes(self):
+        cache = RenderCache(max_entries=100, max_bytes=10)
+        cache.set("a", "too large value")
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["bytes"], 0)
+
+    def test_counts_hits_and_misses(self):
+        cache = RenderCache(max_entries=10, max_bytes=1024 * 1024)
+        cache.get("a")
+        cache.set("a", "A")
+        cache.get("a")
+        cache.get("a")
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_replaces_same_key(self):
+        cache = RenderCache(max_entries=10, max_bytes=1024 * 1024)
+        cache.set("a", "A")
+        cache.set("a", "AA")
+        self.assertEqual(cache.get("a"), "AA")
+        self.assertEqual(cache.stats()["entries"], 1)
+        self.assertEqual(cache.stats()["bytes"], utils.sys.getsizeof("AA"))
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class MarkdownToContentTest(SimpleTestCase):
+    def setUp(self):
+        utils.render_cache.clear()
+        cache.clear()
+
+    def test_renders_same_markdown_once(self):
+        with mock.patch(
+            "contents.sanitizer.markdown_to_html",
+            wraps=utils.sanitizer.markdown_to_html,
+        ) as markdown_to_html:
+            self.assertEqual(markdown_to_content("## 見出し2"), "<h2>見出し2</h2>")
+            self.assertEqual(markdown_to_content("## 見出し2"), "<h2>見出し2</h2>")
+        markdown_to_html.assert_called_once()
+
+    def test_uses_content_rendered_by_other_worker(self):
+        markdown_to_content("## 見出し2")
+        # 別のワーカーを想定して、プロセス内のキャッシュだけを空にする
+        utils.render_cache.clear()
+        with mock.patch("contents.sanitizer.markdown_to_html") as markdown_to_html:
+            self.assertEqual(markdown_to_content("## 見出し2"), "<h2>見出し2</h2>")
+        markdown_to_html.assert_not_called()
+        self.assertEqual(utils.render_cache.stats()["entries"], 1)
+
+    def test_renders_again_when_renderer_changes(self):
+        markdown_to_content("## 見出し2")
+        with mock.patch("contents.utils.CONTENT_RENDERER_VERSION", -1), mock.patch(
+            "contents.sanitizer.sanitize", return_value="changed"
+        ):
+            self.assertEqual(markdown_to_content("## 見出し2"), "changed")
+
+    def test_markdownx_preview_does_not_cache(self):
+        response = self.client.post(
+            reverse("markdownx_markdownify"), {"content": "<script>main()</script>"}
+        )
+        self.assertEqual(
+            response.content.decode(), "&lt;script&gt;main()&lt;/script&gt;"
+        )
+        # 入力途中の本文で、共有キャッシュとプロセス内のキャッシュを埋めない
+        self.assertEqual(utils.render_cache.stats()["entries"], 0)
+        key = utils.content_hash("<script>main()</script>")
+        self.assertIsNone(cache.get(f"content:{key}"))
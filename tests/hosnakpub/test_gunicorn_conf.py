@@ -0,0 +1,73 @@
+import os
+import runpy
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.template import engines
+from django.test import SimpleTestCase, TestCase
+
+from contents import sanitizer
+from hosnakpub.warmup import warm_up
+
+CONF_PATH = os.path.join(settings.BASE_DIR, "gunicorn.conf.py")
+
+
+def load_conf(**environ):
+    with mock.patch.dict(os.environ, environ):
+        return runpy.run_path(CONF_PATH)
+
+
+class GunicornConfTest(TestCase):
+    def test_defaults(self):
+        with mock.patch("multiprocessing.cpu_count", return_value=4):
+            conf = load_conf(ASGI="False", GUNICORN_WORKER_CLASS="")
+        self.assertEqual(conf["workers"], 9)
+        self.assertEqual(conf["worker_class"], "sync")
+        self.assertEqual(conf["wsgi_app"], "hosnakpub.wsgi:application")
+        self.assertEqual(conf["threads"], 1)
+        self.assertTrue(conf["preload_app"])
+        self.assertEqual(conf["max_requests"], 1000)
+        self.assertEqual(conf["max_requests_jitter"], 100)
+
+    def test_from_environment(self):
+        conf = load_conf(
+            GUNICORN_WORKER_CLASS="gthread",
+            GUNICORN_WORKERS="3",
+            GUNICORN_PRELOAD="False",
+            GUNICORN_KEEPALIVE="10",
+        )
+        self.assertEqual(conf["worker_class"], "gthread")
+        self.assertEqual(conf["workers"], 3)
+        self.assertEqual(conf["threads"], 4)
+        self.assertFalse(conf["preload_app"])
+        self.assertEqual(conf["keepalive"], 10)
+
+    def test_uvicorn_worker_with_asgi(self):
+        conf = load_conf(ASGI="True", GUNICORN_WORKER_CLASS="")
+        self.assertEqual(conf["worker_class"], "uvicorn.workers.UvicornWorker")
+        self.assertEqual(conf["wsgi_app"], "hosnakpub.asgi:application")
+
+    def test_post_worker_init_warms_up(self):
+        conf = load_conf()
+        with mock.patch("hosnakpub.warmup.warm_up") as warm_up_mock:
+            conf["post_worker_init"](mock.Mock())
+        warm_up_mock.assert_called_once_with()
+
+
+class WarmUpTest(SimpleTestCase):
+    databases = {"default"}
+
+    def test_warm_up(self):
+        loader = engines["django"].engine.template_loaders[0]
+        loader.reset()
+        with mock.patch.object(sanitizer, "_local", new=type(sanitizer._local)()):
+            warm_up()
+            self.assertTrue(hasattr(sanitizer._local, "markdown"))
+            self.assertTrue(hasattr(sanitizer._local, "cleaner"))
+        self.assertIn("articles/index.html", loader.get_template_cache)
+
+    def test_warm_up_closes_connection(self):
+        with mock.patch.object(connection, "close") as close:
+            warm_up()
+        close.assert_called_once_with()
@@ -0,0 +1,171 @@
+import json
+import os
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.client import RequestFactory
+from django.urls import reverse
+
+from articles.factories import ArticleFactory, BureauFactory
+from articles.models import Article
+from contents.utils import markdown_to_content
+from hosnakpub import metrics
+from hosnakpub.middleware import MetricsMiddleware, record_query
+
+# 出力する系列にはすべて、このプロセスのpidのラベルがつく
+PID = f'pid="{os.getpid()}"'
+
+
+class RegistryTest(SimpleTestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        registry = metrics.Registry(pid=1)
+        registry.observe("duration", {"view": "a"}, 0.02)
+        registry.observe("duration", {"view": "a"}, 3)
+        lines = registry.render()
+        self.assertIn("# TYPE duration histogram", lines)
+        self.assertIn('duration_bucket{pid="1",view="a",le="0.01"} 0', lines)
+        self.assertIn('duration_bucket{pid="1",view="a",le="0.025"} 1', lines)
+        self.assertIn('duration_bucket{pid="1",view="a",le="5"} 2', lines)
+        self.assertIn('duration_bucket{pid="1",view="a",le="+Inf"} 2', lines)
+        self.assertIn('duration_count{pid="1",view="a"} 2', lines)
+
+    def test_workers_export_separate_series(self):
+        # gunicornのワーカーごとの値を、同じ系列として上書きし合わない
+        lines = []
+        for pid in (1, 2):
+            registry = metrics.Registry(pid=pid)
+            registry.increment("requests", {"view": "a"})
+            lines += registry.render()
+        samples = [line for line in lines if not line.startswith("#")]
+        self.assertEqual(
+            samples, ['requests{pid="1",view="a"} 1', 'requests{pid="2",view="a"} 1']
+        )
+
+    def test_escapes_label_values(self):
+        self.assertEqual(
+            metrics.sample("requests", {"path": 'a"b'}, 1), 'requests{path="a\\"b"} 1'
+        )
+
+    def test_gauges_skip_non_numbers(self):
+        lines = metrics.gauges(
+            "pool", [({"alias": "default"}, {"idle": 2, "name": "x"})], pid=1
+        )
+        self.assertEqual(
+            lines, ["# TYPE pool_idle gauge", 'pool_idle{pid="1",alias="default"} 2']
+        )
+
+    def test_measures_markdown_only_while_collecting(self):
+        markdown_to_content("本文")
+        with metrics.collect() as timings:
+            markdown_to_content("本文")
+            markdown_to_content("本文")
+        self.assertEqual(timings["markdown"][1], 2)
+
+
+class MetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        metrics.registry.clear()
+        self.bureau = BureauFactory(slug="koho")
+        self.article = ArticleFactory(bureau=self.bureau, is_published=True)
+
+    def test_server_timing_header(self):
+        for url in (
+            reverse("articles:detail", kwargs={"article_id": self.article.pk}),
+            reverse("articles:bureau", kwargs={"slug": "koho"}),
+        ):
+            with self.subTest(url=url):
+                timing = self.client.get(url)["Server-Timing"]
+                self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ calls"')
+                self.assertRegex(timing, r"template;dur=[\d.]+")
+                self.assertRegex(timing, r"total;dur=[\d.]+$")
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_can_be_disabled(self):
+        self.assertNotIn("Server-Timing", self.client.get(reverse("articles:index")))
+
+    def test_records_metrics_per_view(self):
+        self.client.get(
+            reverse("articles:detail", kwargs={"article_id": self.article.pk})
+        )
+        self.client.get(reverse("articles:detail", kwargs={"article_id": 0}))
+        lines = metrics.registry.render()
+        self.assertIn(
+            f'hosnakpub_request_duration_seconds_count{{{PID},view="articles:detail"}} 2',
+            lines,
+        )
+        self.assertIn(
+            f'hosnakpub_requests_total{{{PID},method="GET",status="404",view="articles:detail"}} 1',
+            lines,
+        )
+        self.assertTrue(
+            any(
+                line.startswith(
+                    f'hosnakpub_db_calls_total{{{PID},view="articles:detail"}}'
+                )
+                for line in lines
+            )
+        )
+
+    def test_logs_structured_line(self):
+        url = reverse("articles:detail", kwargs={"article_id": self.article.pk})
+        with self.assertLogs("hosnakpub.metrics", "INFO") as logs:
+            self.client.get(url)
+        fields = json.loads(logs.records[0].getMessage())
+        self.assertEqual(fields["view"], "articles:detail")
+        self.assertEqual(fields["path"], url)
+        self.assertEqual(fields["status"], 200)
+        self.assertGreater(fields["db_calls"], 0)
+
+
+class AsyncMetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        metrics.registry.clear()
+
+        async def get_response(request):
+            await Article.objects.acount()
+            return HttpResponse()
+
+        self.middleware = MetricsMiddleware(get_response)
+
+    def test_records_queries_on_new_connections(self):
+        # 非同期のビューのクエリを実行するスレッドで、新しく接続した時と同じ状態にする
+        if record_query in connection.execute_wrappers:
+            connection.execute_wrappers.remove(record_query)
+        connection_created.send(sender=connection.__class__, connection=connection)
+        self.assertIn(record_query, connection.execute_wrappers)
+        self.assertTrue(iscoroutinefunction(self.middleware))
+        response = async_to_sync(self.middleware)(RequestFactory().get("/"))
+        self.assertRegex(response["Server-Timing"], r'db;dur=[\d.]+;desc="1 calls"')
+        self.assertIn(
+            f'hosnakpub_requests_total{{{PID},method="GET",status="200",view="unresolved"}} 1',
+            metrics.registry.render(),
+        )
+
+
+@override_settings(METRICS_TOKEN="secret")
+class PrometheusMetricsViewTest(TestCase):
+    def test_requires_token_or_staff(self):
+        url = reverse("metrics")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        response = self.client.get(url, headers={"Authorization": "Bearer wrong"})
+        self.assertEqual(response.status_code, 403)
+        user = get_user_model().objects.create_user("staff", is_staff=True)
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_exports_registry_and_stats(self):
+        self.client.get(reverse("articles:index"))
+        response = self.client.get(
+            reverse("metrics"), headers={"Authorization": "Bearer secret"}
+        )
+        body = response.content.decode()
+        self.assertIn(
+            f'hosnakpub_request_duration_seconds_bucket{{{PID},view="articles:index",le="+Inf"}} 1',
+            body,
+        )
+        self.assertIn(f"hosnakpub_render_cache_hits{{{PID}}} ", body)
+        self.assertIn(f"hosnakpub_tasks_queued{{{PID}}} 0", body)
@@ -0,0 +1,147 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.backends.sqlite3 import base
+from django.test import TestCase
+from django.urls import reverse
+
+from hosnakpub.db import pool
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTest(TestCase):
+    def test_reuse_released_connection(self):
+        connection_pool = pool.ConnectionPool(FakeConnection)
+        first = connection_pool.acquire()
+        connection_pool.release(first)
+        self.assertIs(connection_pool.acquire(), first)
+        stats = connection_pool.stats()
+        self.assertEqual(stats["created"], 1)
+        self.assertEqual(stats["reused"], 1)
+        self.assertEqual(stats["in_use"], 1)
+        self.assertEqual(stats["idle"], 0)
+
+    def test_timeout_when_exhausted(self):
+        connection_pool = pool.ConnectionPool(FakeConnection, max_size=1, timeout=0.01)
+        connection_pool.acquire()
+        with self.assertRaises(pool.PoolTimeout):
+            connection_pool.acquire()
+        self.assertEqual(connection_pool.stats()["timeouts"], 1)
+
+    def test_wait_for_released_connection(self):
+        connection_pool = pool.ConnectionPool(FakeConnection, max_size=1, timeout=5)
+        first = connection_pool.acquire()
+        acquired = []
+        thread = threading.Thread(
+            target=lambda: acquired.append(connection_pool.acquire())
+        )
+        thread.start()
+        time.sleep(0.05)
+        connection_pool.release(first)
+        thread.join()
+        self.assertEqual(acquired, [first])
+        stats = connection_pool.stats()
+        self.assertEqual(stats["created"], 1)
+        self.assertGreaterEqual(stats["waits"], 1)
+        self.assertGreater(stats["max_wait_seconds"], 0)
+
+    def test_discard_connection_failing_ping(self):
+        connection_pool = pool.ConnectionPool(
+            FakeConnection, ping_after=0, ping=lambda connection: False
+        )
+        first = connection_pool.acquire()
+        connection_pool.release(first)
+        second = connection_pool.acquire()
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        self.assertEqual(connection_pool.stats()["discarded"], 1)
+
+    def test_ping_only_after_idle(self):
+        pinged = []
+        connection_pool = pool.ConnectionPool(
+            FakeConnection, ping_after=60, ping=pinged.append
+        )
+        connection_pool.release(connection_pool.acquire())
+        connection_pool.acquire()
+        self.assertEqual(pinged, [])
+
+    def test_discard_connection_idle_too_long(self):
+        connection_pool = pool.ConnectionPool(FakeConnection, max_idle=0)
+        first = connection_pool.acquire()
+        connection_pool.release(first)
+        self.assertIsNot(connection_pool.acquire(), first)
+        self.assertTrue(first.closed)
+
+    def test_failed_connect_frees_slot(self):
+        def connect():
+            raise OSError
+
+        connection_pool = pool.ConnectionPool(connect, max_size=1, timeout=0.01)
+        for _ in range(2):
+            with self.assertRaises(OSError):
+                connection_pool.acquire()
+        self.assertEqual(connection_pool.stats()["in_use"], 0)
+
+
+class PooledSQLiteWrapper(pool.PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    pass
+
+
+class PooledDatabaseWrapperTest(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.settings_dict = {
+            **connection.settings_dict,
+            "NAME": os.path.join(temp_dir.name, "pooled.sqlite3"),
+            "POOL_OPTIONS": {"MAX_SIZE": 2},
+        }
+
+    def tearDown(self):
+        for pooled in list(pool.pools.values()):
+            pooled.close()
+        pool.pools.clear()
+
+    def test_return_connection_to_pool_on_close(self):
+        first = PooledSQLiteWrapper(self.settings_dict, alias="pooled")
+        first.cursor().execute("SELECT 1")
+        raw_connection = first.connection
+        first.close()
+        second = PooledSQLiteWrapper(self.settings_dict, alias="pooled")
+        second.ensure_connection()
+        self.assertIs(second.connection, raw_connection)
+        second.close()
+        self.assertEqual(pool.stats()["pooled"]["reused"], 1)
+        self.assertEqual(pool.stats()["pooled"]["max_size"], 2)
+
+    def test_discard_connection_after_errors(self):
+        wrapper = PooledSQLiteWrapper(self.settings_dict, alias="pooled")
+        wrapper.ensure_connection()
+        wrapper.errors_occurred = True
+        wrapper.close()
+        self.assertEqual(pool.stats()["pooled"]["discarded"], 1)
+        self.assertEqual(pool.stats()["pooled"]["idle"], 0)
+
+
+class DatabaseStatsViewTest(TestCase):
+    def test_staff_only(self):
+        url = reverse("database_stats")
+        self.assertEqual(self.client.get(url).status_code, 302)
+        staff = get_user_model().objects.create_user(
+            username="Test Staff", password="password", is_staff=True
+        )
+        self.client.force_login(staff)
+        response = self.client.get(url)
+        self.assertEqual(response.json()["pid"], os.getpid())
+        self.assertIn("pools", response.json())
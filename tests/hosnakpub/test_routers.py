@@ -0,0 +1,149 @@
+from contextlib import contextmanager
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from articles import caches
+from articles.factories import ArticleFactory
+from articles.models import Article
+from hosnakpub.middleware import PRIMARY_COOKIE, ReplicaRoutingMiddleware
+from hosnakpub.routers import RECENT_WRITE_KEY, ReplicaRouter, use_primary
+
+
+@contextmanager
+def outside_transaction():
+    # TestCaseは各テストをトランザクションで囲むので、その外にいるものとして扱う
+    in_atomic_block = connection.in_atomic_block
+    connection.in_atomic_block = False
+    try:
+        yield
+    finally:
+        connection.in_atomic_block = in_atomic_block
+
+
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_without_replicas(self):
+        with outside_transaction():
+            self.assertEqual(self.router.db_for_read(Article), "default")
+
+    @override_settings(DATABASE_REPLICAS=["replica1", "replica2"])
+    def test_read_from_replicas(self):
+        with outside_transaction():
+            self.assertIn(self.router.db_for_read(Article), ["replica1", "replica2"])
+        self.assertEqual(self.router.db_for_write(Article), "default")
+
+    @override_settings(DATABASE_REPLICAS=["replica1"])
+    def test_read_from_primary_when_pinned(self):
+        with outside_transaction():
+            with use_primary():
+                self.assertEqual(self.router.db_for_read(Article), "default")
+            self.assertEqual(self.router.db_for_read(Article), "replica1")
+
+    @override_settings(DATABASE_REPLICAS=["replica1"])
+    def test_read_from_primary_in_transaction(self):
+        # TestCaseのトランザクションの中にいる
+        with transaction.atomic():
+            self.assertEqual(self.router.db_for_read(Article), "default")
+
+    @override_settings(DATABASE_REPLICAS=["replica1"])
+    def test_read_related_from_same_database(self):
+        article = ArticleFactory()
+        with outside_transaction():
+            self.assertEqual(
+                self.router.db_for_read(Article, instance=article), "default"
+            )
+
+    def test_migrate_only_primary(self):
+        self.assertTrue(self.router.allow_migrate("default", "articles"))
+        self.assertFalse(self.router.allow_migrate("replica1", "articles"))
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"])
+class ReplicaRoutingMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.delete(RECENT_WRITE_KEY)
+        self.factory = RequestFactory()
+        self.routed = []
+
+        def get_response(request):
+            self.routed.append(ReplicaRouter().db_for_read(Article))
+            return HttpResponse()
+
+        self.middleware = ReplicaRoutingMiddleware(get_response)
+
+    def route(self, request):
+        with outside_transaction():
+            return self.middleware(request)
+
+    def test_anonymous_read_goes_to_replica(self):
+        response = self.route(self.factory.get("/"))
+        self.assertEqual(self.routed, ["replica1"])
+        self.assertNotIn(PRIMARY_COOKIE, response.cookies)
+
+    def test_logged_in_read_goes_to_primary(self):
+        request = self.factory.get("/")
+        request.COOKIES["sessionid"] = "session"
+        self.route(request)
+        self.assertEqual(self.routed, ["default"])
+
+    def test_write_goes_to_primary_and_sticks(self):
+        response = self.route(self.factory.post("/"))
+        self.assertEqual(self.routed, ["default"])
+        self.assertEqual(response.cookies[PRIMARY_COOKIE]["max-age"], 5)
+        request = self.factory.get("/")
+        request.COOKIES[PRIMARY_COOKIE] = response.cookies[PRIMARY_COOKIE].value
+        self.route(request)
+        self.assertEqual(self.routed, ["default", "default"])
+
+    def test_reads_go_to_primary_after_cache_is_invalidated(self):
+        # 書き込んだ閲覧者以外も、キャッシュを作り直す間はプライマリから読む
+        caches.bump_tags([caches.ARTICLES_TAG])
+        self.route(self.factory.get("/"))
+        self.assertEqual(self.routed, ["default"])
+        cache.delete(RECENT_WRITE_KEY)
+        self.route(self.factory.get("/"))
+        self.assertEqual(self.routed, ["default", "replica1"])
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"])
+class AsyncReplicaRoutingMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.delete(RECENT_WRITE_KEY)
+        self.factory = RequestFactory()
+        self.routed = []
+
+        async def get_response(request):
+            # 非同期のビューと同じく、ORMはsync_to_asyncのスレッドで呼ばれる
+            routed = await sync_to_async(ReplicaRouter().db_for_read)(Article)
+            self.routed.append(routed)
+            return HttpResponse()
+
+        self.middleware = ReplicaRoutingMiddleware(get_response)
+
+    def route(self, request):
+        with outside_transaction():
+            return async_to_sync(self.middleware)(request)
+
+    def test_async_capable(self):
+        self.assertTrue(iscoroutinefunction(self.middleware))
+
+    def test_anonymous_read_goes_to_replica(self):
+        response = self.route(self.factory.get("/"))
+        self.assertEqual(self.routed, ["replica1"])
+        self.assertNotIn(PRIMARY_COOKIE, response.cookies)
+
+    def test_write_goes_to_primary_and_sticks(self):
+        response = self.route(self.factory.post("/"))
+        self.assertEqual(self.routed, ["default"])
+        self.assertIn(PRIMARY_COOKIE, response.cookies)
+
+    def test_reads_go_to_primary_after_cache_is_invalidated(self):
+        caches.bump_tags([caches.ARTICLES_TAG])
+        self.route(self.factory.get("/"))
+        self.assertEqual(self.routed, ["default"])
@@ -0,0 +1,75 @@
+import json
+import os
+import sys
+import tempfile
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# 計測結果の出力先。コミット間で比較する時は環境変数で指定する
+REPORT_PATH = os.environ.get(
+    "PERFORMANCE_REPORT",
+    os.path.join(tempfile.gettempdir(), "hosnakpub_performance.json"),
+)
+
+results = {}
+
+
+class PerformanceBudgetMixin:
+    # URLごとにクエリ数と応答時間の上限を確かめ、結果をJSONで出力する
+    def assertWithinBudget(self, name, url, max_queries, max_seconds, status=200):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = self.client.get(url)
+            if response.streaming:
+                # サイトマップなどは書き出しながらクエリを実行するので、最後まで読む
+                b"".join(response.streaming_content)
+            seconds = time.perf_counter() - start
+        results[name] = {
+            "url": url,
+            "status": response.status_code,
+            "queries": len(queries),
+            "max_queries": max_queries,
+            "seconds": round(seconds, 6),
+            "max_seconds": max_seconds,
+        }
+        self.assertEqual(response.status_code, status)
+        self.assertLessEqual(
+            len(queries),
+            max_queries,
+            "\n".join(query["sql"] for query in queries.captured_queries),
+        )
+        self.assertLessEqual(seconds, max_seconds)
+        return response
+
+    @classmethod
+    def tearDownClass(cls):
+        write_report()
+        super().tearDownClass()
+
+
+def write_report(path=REPORT_PATH):
+    with open(path, "w") as f:
+        json.dump({"results": results}, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)["results"]
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+    lines = []
+    for name in sorted(old.keys() | new.keys()):
+        before = old.get(name, {})
+        after = new.get(name, {})
+        lines.append(
+            f"{name}: queries {before.get('queries')} -> {after.get('queries')}, "
+            f"seconds {before.get('seconds')} -> {after.get('seconds')}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # python -m tests.performance 変更前.json 変更後.json
+    print(compare(sys.argv[1], sys.argv[2]))
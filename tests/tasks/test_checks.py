@@ -0,0 +1,25 @@
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from tasks.checks import FILE_BACKEND, LOCMEM_BACKEND, check_shared_cache
+
+
+@override_settings(TASKS_ALWAYS_EAGER=False)
+class SharedCacheCheckTest(SimpleTestCase):
+    def check(self, backend, location=""):
+        caches = {"default": {"BACKEND": backend, "LOCATION": location}}
+        with self.settings(CACHES=caches):
+            return [message.id for message in check_shared_cache(None)]
+
+    def test_locmem_is_not_shared_with_worker(self):
+        self.assertEqual(self.check(LOCMEM_BACKEND), ["tasks.E001"])
+
+    def test_file_in_temp_dir_is_not_shared_between_containers(self):
+        location = f"{tempfile.gettempdir()}/hosnakpub_cache"
+        self.assertEqual(self.check(FILE_BACKEND, location), ["tasks.W001"])
+        self.assertEqual(self.check(FILE_BACKEND, "/cache"), [])
+
+    def test_eager_tasks_use_request_cache(self):
+        with self.settings(TASKS_ALWAYS_EAGER=True):
+            self.assertEqual(self.check(LOCMEM_BACKEND), [])
@@ -0,0 +1,154 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from freezegun import freeze_time
+
+from articles.factories import ArticleFactory
+from articles.models import Article, SearchToken
+from tasks import queue
+from tasks.models import Task
+
+calls = []
+
+
+@queue.task
+def record(value, suffix=""):
+    calls.append(f"{value}{suffix}")
+
+
+@queue.task
+def tick():
+    calls.append("tick")
+
+
+@queue.task(max_attempts=2, retry_delay=30)
+def broken():
+    raise ValueError("壊れています")
+
+
+def not_registered():
+    pass
+
+
+@override_settings(TASKS_ALWAYS_EAGER=False)
+class QueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_runs_immediately_when_eager(self):
+        with self.settings(TASKS_ALWAYS_EAGER=True):
+            queue.enqueue(record, "a", suffix="!")
+        self.assertEqual(calls, ["a!"])
+        self.assertFalse(Task.objects.exists())
+
+    def test_runs_queued_tasks_in_order(self):
+        queue.enqueue(record, "a")
+        queue.enqueue(record, "b", suffix="!")
+        self.assertEqual(calls, [])
+        self.assertEqual(queue.run_pending(), 2)
+        self.assertEqual(calls, ["a", "b!"])
+        self.assertFalse(Task.objects.exists())
+
+    def test_rolled_back_task_is_not_queued(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            queue.enqueue(record, "a")
+            raise RuntimeError
+        self.assertFalse(Task.objects.exists())
+
+    def test_delayed_task_runs_when_due(self):
+        queue.enqueue(record, "a", delay=60)
+        self.assertEqual(queue.run_pending(), 0)
+        with freeze_time(timezone.now() + timedelta(seconds=61)):
+            self.assertEqual(queue.run_pending(), 1)
+        self.assertEqual(calls, ["a"])
+
+    def test_retries_with_backoff_then_fails(self):
+        queue.enqueue(broken)
+        now = timezone.now()
+        with freeze_time(now):
+            self.assertEqual(queue.run_pending(), 1)
+        task = Task.objects.get()
+        self.assertEqual(task.status, Task.Status.QUEUED)
+        self.assertEqual(task.run_at, now + timedelta(seconds=30))
+        self.assertIn("壊れています", task.last_error)
+        with freeze_time(now + timedelta(seconds=31)):
+            self.assertEqual(queue.run_pending(), 1)
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.Status.FAILED)
+        self.assertEqual(task.attempts, 2)
+
+    def test_does_not_run_unregistered_function(self):
+        Task.objects.create(name=f"{__name__}.not_registered", max_attempts=1)
+        queue.run_pending()
+        task = Task.objects.get()
+        self.assertEqual(task.status, Task.Status.FAILED)
+        self.assertIn("is not registered", task.last_error)
+
+    def test_reclaims_task_of_stopped_worker(self):
+        queue.enqueue(record, "a")
+        self.assertIsNotNone(queue.claim())
+        self.assertIsNone(queue.claim())
+        with freeze_time(timezone.now() + timedelta(minutes=11)):
+            task = queue.claim()
+        self.assertEqual(task.attempts, 2)
+
+    def test_stats(self):
+        queue.enqueue(record, "a")
+        queue.enqueue(record, "b", delay=60)
+        Task.objects.create(name="failed", status=Task.Status.FAILED)
+        stats = queue.stats()
+        self.assertEqual(stats["queued"], 2)
+        self.assertEqual(stats["failed"], 1)
+        self.assertEqual(stats["running"], 0)
+
+
+@override_settings(TASKS_ALWAYS_EAGER=False)
+class ArticleTasksTest(TestCase):
+    def test_renders_and_indexes_article_in_worker(self):
+        article = ArticleFactory(
+            title="記事", content_with_markdown="**太字**", is_published=True
+        )
+        article.refresh_from_db()
+        self.assertEqual(article.content_html, "")
+        # 変換するまでは表示する時に変換する
+        self.assertIn("<strong>太字</strong>", article.get_content())
+        self.assertFalse(SearchToken.objects.exists())
+        queue.run_pending()
+        article = Article.objects.get(pk=article.pk)
+        self.assertTrue(article.is_rendered())
+        self.assertIn("<strong>太字</strong>", article.content_html)
+        self.assertTrue(SearchToken.objects.filter(article=article).exists())
+
+
+@override_settings(TASKS_ALWAYS_EAGER=False)
+class RunTaskWorkerTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_runs_queued_and_scheduled_tasks(self):
+        queue.enqueue(record, "queued")
+        with self.settings(TASKS_SCHEDULE={tick.task_name: 60}):
+            call_command("run_task_worker", once=True, stdout=StringIO())
+        self.assertEqual(sorted(calls), ["queued", "tick"])
+        self.assertFalse(Task.objects.exists())
+
+    def test_enqueues_scheduled_task_once(self):
+        with self.settings(TASKS_SCHEDULE={broken.task_name: 60}):
+            call_command("run_task_worker", once=True, stdout=StringIO())
+            call_command("run_task_worker", once=True, stdout=StringIO())
+        self.assertEqual(Task.objects.filter(name=broken.task_name).count(), 1)
+
+
+class TaskStatsViewTest(TestCase):
+    def test_staff_only(self):
+        url = reverse("task_stats")
+        self.assertEqual(self.client.get(url).status_code, 302)
+        user = get_user_model().objects.create_user("staff", is_staff=True)
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(url).json()["tasks"]["queued"], 0)